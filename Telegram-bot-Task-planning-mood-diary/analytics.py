@@ -0,0 +1,92 @@
+from collections import OrderedDict
+from datetime import datetime
+
+from clock import get_clock
+from metrics import metrics
+
+
+class AnalyticsSnapshot:
+    """Все данные аналитики пользователя за период, прочитанные одной транзакцией"""
+
+    def __init__(
+        self,
+        user_id: int,
+        start_date: datetime,
+        end_date: datetime,
+        tasks: dict,
+        daily_counts: list,
+        tasks_with_tags: int,
+        tag_rows: list,
+        moods: list,
+        series_stats: list,
+        version: int = 0,
+    ):
+        self.user_id = user_id
+        self.start_date = start_date
+        self.end_date = end_date
+        self.tasks = tasks
+        self.daily_counts = daily_counts
+        self.tasks_with_tags = tasks_with_tags
+        self.tag_rows = tag_rows
+        self.moods = moods
+        self.series_stats = series_stats
+        self.version = version
+        self.built_at = get_clock().monotonic()
+
+    @property
+    def key(self) -> tuple:
+        return self.user_id, self.start_date, self.end_date
+
+    def __repr__(self):
+        return (
+            f"AnalyticsSnapshot(user={self.user_id}, "
+            f"{self.start_date:%Y-%m-%d}..{self.end_date:%Y-%m-%d}, "
+            f"tasks={self.tasks['total']}, moods={len(self.moods)})"
+        )
+
+
+class AnalyticsCache:
+    """Снимки аналитики по (пользователь, период), годные, пока не изменилась версия данных в базе"""
+
+    def __init__(self, ttl: float = 300, max_size: int = 256):
+        self.ttl = ttl
+        self.max_size = max(1, max_size)
+        self._snapshots = OrderedDict()
+
+    def get(self, user_id: int, start_date: datetime, end_date: datetime, version: int):
+        """Снимок за период, построенный на той же версии данных, или None"""
+        key = (user_id, start_date, end_date)
+        snapshot = self._snapshots.get(key)
+        # TTL нужен из-за просрочки: она меняется со временем без записей в базу
+        if snapshot is not None and (
+            snapshot.version != version
+            or get_clock().monotonic() - snapshot.built_at > self.ttl
+        ):
+            del self._snapshots[key]
+            snapshot = None
+
+        if snapshot is None:
+            metrics.counter("analytics_snapshot_misses_total").inc()
+            return None
+        self._snapshots.move_to_end(key)
+        metrics.counter("analytics_snapshot_hits_total").inc()
+        return snapshot
+
+    def put(self, snapshot: AnalyticsSnapshot):
+        """Сохраняет снимок, вытесняя самые давно использованные"""
+        self._snapshots[snapshot.key] = snapshot
+        self._snapshots.move_to_end(snapshot.key)
+        while len(self._snapshots) > self.max_size:
+            self._snapshots.popitem(last=False)
+
+    def invalidate(self, user_id: int):
+        """Данные пользователя изменились в этом процессе: снимки освобождаются сразу"""
+        for key in [key for key in self._snapshots if key[0] == user_id]:
+            del self._snapshots[key]
+
+    def clear(self):
+        """Сбрасывает снимки всех пользователей (массовая очистка данных)"""
+        self._snapshots.clear()
+
+    def __len__(self):
+        return len(self._snapshots)
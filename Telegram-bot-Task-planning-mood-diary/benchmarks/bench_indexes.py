@@ -0,0 +1,218 @@
+"""Сравнение горячих запросов Database без индексов и с индексами
+
+Запуск из каталога проекта:
+    python benchmarks/bench_indexes.py --tasks 1000000
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+
+def generate_data(path: str, tasks: int, users: int, seed: int = 42):
+    """Заполняет базу синтетическими пользователями, задачами и напоминаниями"""
+    rnd = random.Random(seed)
+    now = datetime.now()
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode = WAL")
+    conn.execute("PRAGMA synchronous = OFF")
+
+    conn.executemany(
+        "INSERT INTO users (id, username, first_name) VALUES (?, ?, ?)",
+        ((uid, f"user{uid}", "Bench") for uid in range(1, users + 1)),
+    )
+    conn.executemany(
+        "INSERT INTO reminder_settings (user_id) VALUES (?)",
+        ((uid,) for uid in range(1, users + 1)),
+    )
+
+    def task_rows():
+        for task_id in range(1, tasks + 1):
+            due = now + timedelta(minutes=rnd.randint(-60 * 24 * 180, 60 * 24 * 30))
+            created = due - timedelta(days=rnd.randint(0, 30))
+            status = "completed" if rnd.random() < 0.9 else "pending"
+            completed = created if status == "completed" else None
+            yield (
+                task_id,
+                rnd.randint(1, users),
+                f"Задача {task_id}",
+                due.isoformat(),
+                int(due.timestamp()),
+                rnd.choice(("high", "medium", "low")),
+                status,
+                created.strftime("%Y-%m-%d %H:%M:%S"),
+                int(created.timestamp()),
+                completed.isoformat() if completed else None,
+                int(completed.timestamp()) if completed else None,
+                1 if rnd.random() < 0.02 else 0,
+            )
+
+    conn.executemany(
+        """
+        INSERT INTO tasks (id, user_id, content, due_date, due_ts, priority, status,
+                           created_at, created_ts, completed_at, completed_ts, is_deleted)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """,
+        task_rows(),
+    )
+
+    conn.execute(
+        """
+        INSERT INTO task_reminders (user_id, task_id, reminder_type, scheduled_time,
+                                    scheduled_ts, sent, sent_at)
+        SELECT user_id, id,
+               CASE WHEN due_date < ? THEN 'overdue_immediate' ELSE 'deadline' END,
+               strftime('%Y-%m-%d %H:%M:%S', due_date, '-1 hour'),
+               due_ts - 3600,
+               CASE WHEN status = 'completed' THEN 1 ELSE 0 END,
+               CASE WHEN status = 'completed' THEN completed_at END
+        FROM tasks
+        WHERE id % 3 = 0 OR status = 'pending'
+        """,
+        (now.isoformat(),),
+    )
+
+    moods = ("отлично", "хорошо", "нормально", "плохо", "ужасно")
+    conn.executemany(
+        "INSERT INTO moods (user_id, mood, date) VALUES (?, ?, ?)",
+        (
+            (uid, rnd.choice(moods), (now - timedelta(days=day)).date().isoformat())
+            for uid in range(1, users + 1)
+            for day in range(0, 60, 3)
+        ),
+    )
+    conn.commit()
+    conn.close()
+
+
+GLOBAL_CASES = {
+    "get_reminder_schedule",
+    "get_tasks_for_deadline_reminders",
+    "get_new_overdue_tasks_for_reminders",
+}
+
+
+async def measure(
+    database, user_ids, task_ids, repeats: int, skip_global: bool = False
+) -> dict:
+    """Замеряет медианное время каждого горячего запроса в миллисекундах"""
+    cases = {
+        "get_user_tasks": lambda i: database.get_user_tasks(user_ids[i]),
+        "get_overdue_tasks": lambda i: database.get_overdue_tasks(user_ids[i]),
+        "get_upcoming_tasks": lambda i: database.get_upcoming_tasks(user_ids[i]),
+        "get_mood_statistics": lambda i: database.get_mood_statistics(user_ids[i]),
+        "get_today_mood": lambda i: database.get_today_mood(user_ids[i]),
+        "get_reminder_schedule": lambda i: database.get_reminder_schedule(),
+        "get_active_reminder_for_task": lambda i: database.get_active_reminder_for_task(
+            task_ids[i], "deadline"
+        ),
+        "get_tasks_for_deadline_reminders": lambda i: database.get_tasks_for_deadline_reminders(),
+        "get_new_overdue_tasks_for_reminders": lambda i: database.get_new_overdue_tasks_for_reminders(),
+    }
+    results = {}
+    for name, call in cases.items():
+        if name in GLOBAL_CASES and skip_global:
+            results[name] = None
+            continue
+        runs = max(1, repeats // 10) if name in GLOBAL_CASES else repeats
+        timings = []
+        for i in range(runs):
+            started = time.perf_counter()
+            await call(i % len(user_ids))
+            timings.append((time.perf_counter() - started) * 1000)
+        results[name] = statistics.median(timings)
+    return results
+
+
+async def run(args):
+    workdir = tempfile.mkdtemp(prefix="bench_indexes_")
+    path = os.path.join(workdir, "bench.db")
+    os.environ["DATABASE_URL"] = f"sqlite:///{path}"
+
+    from database import Database
+    from migrations import INDEXES
+
+    database = Database()
+    await database.initialize()
+    await database.migrations.wait_online()
+
+    print(f"📦 Генерация данных: {args.tasks} задач, {args.users} пользователей")
+    raw = sqlite3.connect(path)
+    for name, _ in INDEXES:
+        raw.execute(f"DROP INDEX IF EXISTS {name}")
+    raw.commit()
+
+    started = time.perf_counter()
+    generate_data(path, args.tasks, args.users)
+    print(f"   готово за {time.perf_counter() - started:.1f} с")
+
+    rnd = random.Random(7)
+    user_ids = [rnd.randint(1, args.users) for _ in range(args.repeats)]
+    task_ids = [rnd.randint(1, args.tasks) for _ in range(args.repeats)]
+
+    try:
+        raw.execute("ANALYZE")
+        raw.commit()
+        before = await measure(
+            database,
+            user_ids,
+            task_ids,
+            args.repeats,
+            skip_global=not args.full_baseline,
+        )
+
+        started = time.perf_counter()
+        for _, index_sql in INDEXES:
+            raw.execute(index_sql)
+        raw.execute("ANALYZE")
+        raw.commit()
+        print(f"🔧 Индексы построены за {time.perf_counter() - started:.1f} с\n")
+
+        after = await measure(database, user_ids, task_ids, args.repeats)
+    finally:
+        raw.close()
+        await database.close()
+
+    print(
+        f"{'запрос':<40}{'без индексов, мс':>18}{'с индексами, мс':>18}{'ускорение':>12}"
+    )
+    for name in before:
+        if before[name] is None:
+            print(f"{name:<40}{'—':>18}{after[name]:>18.2f}{'—':>12}")
+            continue
+        speedup = before[name] / after[name] if after[name] else float("inf")
+        print(f"{name:<40}{before[name]:>18.2f}{after[name]:>18.2f}{speedup:>11.1f}x")
+
+    if not args.keep:
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+        os.rmdir(workdir)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tasks", type=int, default=1_000_000)
+    parser.add_argument("--users", type=int, default=5_000)
+    parser.add_argument("--repeats", type=int, default=50)
+    parser.add_argument("--keep", action="store_true", help="не удалять базу")
+    parser.add_argument(
+        "--full-baseline",
+        action="store_true",
+        help="замерять глобальные NOT EXISTS запросы и без индексов (квадратичны)",
+    )
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
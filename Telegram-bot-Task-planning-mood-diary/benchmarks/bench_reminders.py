@@ -0,0 +1,284 @@
+"""Симуляция суток работы ReminderManager на виртуальных часах с поддельным Bot
+
+Запуск из каталога проекта:
+    python benchmarks/bench_reminders.py --users 100 --tasks 1000 --hours 24
+"""
+
+import argparse
+import asyncio
+import contextlib
+import logging
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from clock import SimulatedClock, set_clock
+
+LAG_BUCKETS = (
+    0.001,
+    0.002,
+    0.005,
+    0.01,
+    0.02,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1,
+    2.5,
+    5,
+    10,
+    30,
+    60,
+    300,
+    900,
+    3600,
+)
+QUIET_EXTRA_SECONDS = 0.002
+
+
+class QueryCounter:
+    """Считает инструкции SQL через trace callback соединений"""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, sql):
+        self.count += 1
+
+
+async def seed(database, clock, rnd, args) -> list:
+    """Создает пользователей и задачи; возвращает (task_id, due_ts) для завершения"""
+    start = clock.time()
+    user_ids = list(range(1, args.users + 1))
+    await asyncio.gather(
+        *(database.add_user(uid, f"user{uid}", "Bench") for uid in user_ids)
+    )
+
+    async def add(index):
+        if rnd.random() < args.overdue_share:
+            due_ts = start - rnd.uniform(60, 6 * 3600)
+        else:
+            due_ts = start + rnd.uniform(600, args.hours * 3600)
+        due = clock.now() + timedelta(seconds=due_ts - start)
+        task_id = await database.add_task_with_priority(
+            rnd.choice(user_ids),
+            f"Задача {index}",
+            due.replace(microsecond=0),
+            rnd.choice(("high", "medium", "low")),
+        )
+        return task_id, due_ts
+
+    tasks = []
+    for chunk in range(0, args.tasks, 500):
+        tasks += await asyncio.gather(
+            *(add(i) for i in range(chunk, min(args.tasks, chunk + 500)))
+        )
+    return tasks
+
+
+async def complete_later(database, clock, task_id: int, at_ts: float):
+    """Пользователь выполняет задачу в заданный момент виртуального времени"""
+    await clock.sleep(at_ts - clock.time())
+    await database.complete_task(task_id)
+
+
+async def wait_quiet(clock, manager, bot, queries):
+    """Ждет, пока напоминания разосланы и база затихла, чтобы перевести часы"""
+    from config import Config
+    from metrics import metrics
+
+    inflight = metrics.gauge("reminder_batches_inflight")
+    queue = metrics.gauge("send_queue_depth")
+    # Писатель копит пачку до DB_WRITE_MAX_DELAY: тишина должна быть дольше
+    quiet = 2 * Config.DB_WRITE_MAX_DELAY + QUIET_EXTRA_SECONDS
+    while True:
+        seen = queries.count
+        await asyncio.sleep(quiet)
+        busy = inflight.value or queue.value or bot.pending or queries.count != seen
+        fire_ts = manager.scheduler.next_fire_ts()
+        if not busy and (fire_ts is None or fire_ts > clock.time()):
+            return
+
+
+async def drive(clock, manager, bot, queries, until_ts: float) -> int:
+    """Перескакивает к ближайшему пробуждению, пока не наступит until_ts"""
+    jumps = 0
+    while True:
+        await wait_quiet(clock, manager, bot, queries)
+        if clock.time() >= until_ts:
+            return jumps
+        # Расписание учитывается отдельно: цикл отправки мог еще не заснуть до него
+        wakeups = [clock.next_deadline(), manager.scheduler.next_fire_ts(), until_ts]
+        clock.advance_to(min(ts for ts in wakeups if ts is not None))
+        jumps += 1
+
+
+def lag_line(name: str, histogram) -> str:
+    if not histogram.count:
+        return f"{name:<22}{0:>8}{'—':>10}{'—':>10}{'—':>10}{'—':>10}"
+    values = [histogram.quantile(q) * 1000 for q in (0.5, 0.95, 0.99)]
+    values.append(histogram.max * 1000)
+    return f"{name:<22}{histogram.count:>8}" + "".join(f"{v:>10.1f}" for v in values)
+
+
+async def run(args):
+    workdir = tempfile.mkdtemp(prefix="bench_reminders_")
+    path = os.path.join(workdir, "bench.db")
+    os.environ["DATABASE_URL"] = f"sqlite:///{path}"
+
+    clock = SimulatedClock()
+    set_clock(clock)
+
+    from cleanup import scheduled_cleanup
+    from config import Config
+    from database import db
+    from fake_bot import FakeBot
+    from metrics import metrics
+    from reminders import TASK_REMINDER_TYPES, ReminderManager
+
+    logging.getLogger().setLevel(logging.INFO if args.verbose else logging.WARNING)
+    Config.SEND_GLOBAL_RATE = args.global_rate
+    Config.SEND_PER_CHAT_RATE = args.chat_rate
+
+    rnd = random.Random(args.seed)
+    queries = QueryCounter()
+    bot = FakeBot(
+        clock,
+        latency=args.latency / 1000,
+        jitter=args.jitter / 1000,
+        failure_rate=args.failure_rate,
+        flood_rate=args.flood_rate,
+        blocked_rate=args.blocked_rate,
+        seed=args.seed,
+    )
+    output = sys.stdout if args.verbose else open(os.devnull, "w")
+    background = []
+
+    await db.initialize()
+    try:
+        await db.migrations.wait_online()
+        await db.set_trace_callback(queries)
+
+        print(
+            f"📦 Пользователей: {args.users}, задач: {args.tasks}, часов: {args.hours}"
+        )
+        started = time.perf_counter()
+        tasks = await seed(db, clock, rnd, args)
+        seed_queries = queries.count
+        print(f"   данные созданы за {time.perf_counter() - started:.1f} с")
+
+        metrics.reset()
+        for reminder_type in TASK_REMINDER_TYPES:
+            metrics.histogram(
+                "reminder_delivery_lag_seconds", buckets=LAG_BUCKETS, type=reminder_type
+            )
+
+        until_ts = clock.time() + args.hours * 3600
+        manager = ReminderManager(bot, clock=clock)
+        with contextlib.redirect_stdout(output):
+            started = time.perf_counter()
+            before = queries.count
+            await manager.start()
+            startup_seconds = time.perf_counter() - started
+            startup_queries = queries.count - before
+
+            for task_id, due_ts in tasks:
+                if rnd.random() < args.complete_share:
+                    at_ts = rnd.uniform(clock.time(), max(clock.time(), due_ts))
+                    background.append(
+                        asyncio.create_task(complete_later(db, clock, task_id, at_ts))
+                    )
+            if not args.no_cleanup:
+                background.append(asyncio.create_task(scheduled_cleanup(clock)))
+
+            started = time.perf_counter()
+            before = queries.count
+            jumps = await drive(clock, manager, bot, queries, until_ts)
+            run_seconds = time.perf_counter() - started
+            run_queries = queries.count - before
+
+            await manager.stop()
+    finally:
+        for task in background:
+            task.cancel()
+        await asyncio.gather(*background, return_exceptions=True)
+        await db.close()
+        if output is not sys.stdout:
+            output.close()
+
+    histograms = {
+        reminder_type: metrics.histogram(
+            "reminder_delivery_lag_seconds", type=reminder_type
+        )
+        for reminder_type in TASK_REMINDER_TYPES
+    }
+    delivered = sum(histogram.count for histogram in histograms.values())
+    dead = metrics.counter("reminders_dead_lettered_total").value
+
+    print(
+        f"\n⏱️  Старт менеджера: {startup_seconds:.2f} с, {startup_queries} запросов SQL"
+    )
+    print(
+        f"🕒 Симуляция {args.hours} ч заняла {run_seconds:.1f} с, переводов часов: {jumps}"
+    )
+    print(
+        f"📨 Напоминаний доставлено: {delivered}, сообщений: {len(bot.sent)}, "
+        f"в dead-letter: {dead}"
+    )
+    if bot.failures:
+        failures = ", ".join(f"{name}={count}" for name, count in bot.failures.items())
+        print(f"💥 Внесенные ошибки: {failures}")
+    print(
+        f"🚀 Пропускная способность: {delivered / run_seconds:.1f} напоминаний/с "
+        f"реального времени"
+    )
+    print(
+        f"🗄️  Запросов SQL: наполнение {seed_queries}, симуляция {run_queries}"
+        + (f" ({run_queries / delivered:.1f} на напоминание)" if delivered else "")
+    )
+
+    print(
+        f"\n{'задержка, мс':<22}{'всего':>8}{'p50':>10}{'p95':>10}{'p99':>10}{'max':>10}"
+    )
+    for reminder_type, histogram in histograms.items():
+        print(lag_line(reminder_type, histogram))
+
+    if not args.keep:
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+        os.rmdir(workdir)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--tasks", type=int, default=1_000)
+    parser.add_argument("--hours", type=float, default=24)
+    parser.add_argument("--latency", type=float, default=20, help="мс на отправку")
+    parser.add_argument("--jitter", type=float, default=10, help="мс разброса")
+    parser.add_argument("--failure-rate", type=float, default=0.01)
+    parser.add_argument("--flood-rate", type=float, default=0.0)
+    parser.add_argument("--blocked-rate", type=float, default=0.01)
+    parser.add_argument("--complete-share", type=float, default=0.3)
+    parser.add_argument("--overdue-share", type=float, default=0.05)
+    parser.add_argument("--global-rate", type=float, default=30)
+    parser.add_argument("--chat-rate", type=float, default=1)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument(
+        "--no-cleanup", action="store_true", help="не запускать автоочистку"
+    )
+    parser.add_argument("--keep", action="store_true", help="не удалять базу")
+    parser.add_argument("--verbose", action="store_true", help="выводить логи бота")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
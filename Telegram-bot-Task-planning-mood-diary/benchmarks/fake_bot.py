@@ -0,0 +1,74 @@
+"""Поддельный Bot для бенчмарков: записывает отправки вместо обращений к Telegram"""
+
+import random
+from collections import Counter
+from types import SimpleNamespace
+
+from aiogram.exceptions import (
+    TelegramForbiddenError,
+    TelegramNetworkError,
+    TelegramRetryAfter,
+)
+from aiogram.methods import SendMessage
+
+from clock import get_clock
+
+
+class FakeBot:
+    """Отвечает с заданной задержкой и с заданной долей ошибок"""
+
+    def __init__(
+        self,
+        clock=None,
+        latency: float = 0.02,
+        jitter: float = 0.0,
+        failure_rate: float = 0.0,
+        flood_rate: float = 0.0,
+        blocked_rate: float = 0.0,
+        seed: int = 1,
+    ):
+        self.clock = clock or get_clock()
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.flood_rate = flood_rate
+        self.blocked_rate = blocked_rate
+        self.seed = seed
+        self._random = random.Random(seed)
+
+        self.sent = []
+        self.failures = Counter()
+        self.pending = 0
+
+    def is_blocked(self, chat_id: int) -> bool:
+        """Пользователь заблокировал бота; решение постоянно для чата"""
+        return random.Random(chat_id * 7919 + self.seed).random() < self.blocked_rate
+
+    async def send_message(self, chat_id: int, text: str, **kwargs):
+        method = SendMessage(chat_id=chat_id, text=text, **kwargs)
+        self.pending += 1
+        try:
+            await self.clock.sleep(self.latency + self._random.uniform(0, self.jitter))
+
+            if self.is_blocked(chat_id):
+                self.failures["forbidden"] += 1
+                raise TelegramForbiddenError(
+                    method=method, message="Forbidden: bot was blocked by the user"
+                )
+            roll = self._random.random()
+            if roll < self.flood_rate:
+                self.failures["retry_after"] += 1
+                raise TelegramRetryAfter(
+                    method=method, message="Too Many Requests", retry_after=1
+                )
+            if roll < self.flood_rate + self.failure_rate:
+                self.failures["network"] += 1
+                raise TelegramNetworkError(method=method, message="Connection reset")
+
+            self.sent.append((chat_id, text, self.clock.time()))
+            return SimpleNamespace(message_id=len(self.sent), chat_id=chat_id)
+        finally:
+            self.pending -= 1
+
+    async def close(self):
+        pass
@@ -0,0 +1,39 @@
+import logging
+from datetime import timedelta
+
+from clock import get_clock
+from database import db
+
+logger = logging.getLogger(__name__)
+
+
+async def scheduled_cleanup(clock=None):
+    """Ежедневная автоматическая очистка"""
+    clock = clock or get_clock()
+    while True:
+        try:
+            now = clock.now()
+            next_run = now.replace(hour=3, minute=0, second=0, microsecond=0)
+            if now >= next_run:
+                next_run += timedelta(days=1)
+
+            wait_seconds = (next_run - now).total_seconds()
+            await clock.sleep(wait_seconds)
+
+            deleted_tasks = await db.cleanup_old_completed_tasks(30)
+            deleted_moods = await db.cleanup_old_moods(90)
+            deleted_removed = await db.cleanup_old_deleted_tasks(30)
+
+            deleted_reminders = await db.cleanup_old_reminders(7)
+
+            logger.info(
+                f"✅ Автоочистка завершена: "
+                f"задач {deleted_tasks}, "
+                f"настроений {deleted_moods}, "
+                f"удаленных {deleted_removed}, "
+                f"напоминаний {deleted_reminders}"
+            )
+
+        except Exception as e:
+            logger.error(f"❌ Ошибка автоочистки: {e}")
+            await clock.sleep(3600)
@@ -0,0 +1,104 @@
+import asyncio
+import time
+from datetime import datetime
+
+
+class Clock:
+    """Системные часы: текущее время и ожидание по нему"""
+
+    def time(self) -> float:
+        """Секунды эпохи"""
+        return time.time()
+
+    def now(self) -> datetime:
+        """Текущее локальное время"""
+        return datetime.fromtimestamp(self.time())
+
+    def monotonic(self) -> float:
+        """Монотонные секунды для измерения интервалов"""
+        return time.monotonic()
+
+    async def sleep(self, seconds: float):
+        await asyncio.sleep(max(0.0, seconds))
+
+    async def wait_for(self, awaitable, timeout: float):
+        """Как asyncio.wait_for, но таймаут отсчитывается по этим часам"""
+        return await asyncio.wait_for(awaitable, timeout)
+
+
+class SimulatedClock(Clock):
+    """Виртуальные часы: идут вместе с реальными и умеют перескакивать вперед"""
+
+    def __init__(self, start: float = None):
+        start = time.time() if start is None else start
+        self._offset = start - time.monotonic()
+        self._jumped = asyncio.Event()
+        self._deadlines = {}
+
+    def time(self) -> float:
+        return time.monotonic() + self._offset
+
+    def monotonic(self) -> float:
+        return self.time()
+
+    def advance(self, seconds: float):
+        """Переводит часы вперед и будит тех, чье ожидание истекло"""
+        if seconds <= 0:
+            return
+        self._offset += seconds
+        jumped, self._jumped = self._jumped, asyncio.Event()
+        jumped.set()
+
+    def advance_to(self, ts: float):
+        """Переводит часы на момент ts, если он еще не наступил"""
+        self.advance(ts - self.time())
+
+    def next_deadline(self):
+        """Ближайший момент, до которого кто-то спит по этим часам, или None"""
+        return min(self._deadlines.values(), default=None)
+
+    async def sleep(self, seconds: float):
+        deadline = self.time() + seconds
+        token = object()
+        self._deadlines[token] = deadline
+        try:
+            while True:
+                remaining = deadline - self.time()
+                if remaining <= 0:
+                    return
+                try:
+                    await asyncio.wait_for(self._jumped.wait(), remaining)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            del self._deadlines[token]
+
+    async def wait_for(self, awaitable, timeout: float):
+        waiter = asyncio.ensure_future(awaitable)
+        timer = asyncio.ensure_future(self.sleep(timeout))
+        try:
+            await asyncio.wait({waiter, timer}, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            timer.cancel()
+            if not waiter.done():
+                waiter.cancel()
+            await asyncio.gather(timer, return_exceptions=True)
+        if waiter.cancelled():
+            await asyncio.gather(waiter, return_exceptions=True)
+            raise asyncio.TimeoutError()
+        return waiter.result()
+
+
+_clock = Clock()
+
+
+def get_clock() -> Clock:
+    """Часы, по которым работают база данных и фоновые задачи"""
+    return _clock
+
+
+def set_clock(clock: Clock) -> Clock:
+    """Подменяет часы процесса (бенчмарки, симуляция) и возвращает прежние"""
+    global _clock
+    previous, _clock = _clock, clock
+    return previous
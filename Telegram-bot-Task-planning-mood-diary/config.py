@@ -8,6 +8,23 @@ class Config:
     BOT_TOKEN = os.getenv("BOT_TOKEN")
     DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///task_mood_bot.db")
 
+    DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+    DB_POOL_ACQUIRE_TIMEOUT = float(os.getenv("DB_POOL_ACQUIRE_TIMEOUT", "10"))
+    DB_POOL_HEALTH_CHECK_INTERVAL = float(
+        os.getenv("DB_POOL_HEALTH_CHECK_INTERVAL", "30")
+    )
+
+    DB_WRITE_BATCH_SIZE = int(os.getenv("DB_WRITE_BATCH_SIZE", "50"))
+    DB_WRITE_MAX_DELAY = float(os.getenv("DB_WRITE_MAX_DELAY", "0.005"))
+
+    DB_JOURNAL_MODE = os.getenv("DB_JOURNAL_MODE", "WAL")
+    DB_SYNCHRONOUS = os.getenv("DB_SYNCHRONOUS", "NORMAL")
+    DB_CACHE_SIZE_KB = int(os.getenv("DB_CACHE_SIZE_KB", "20000"))
+    DB_MMAP_SIZE = int(os.getenv("DB_MMAP_SIZE", str(256 * 1024 * 1024)))
+    DB_TEMP_STORE = os.getenv("DB_TEMP_STORE", "MEMORY")
+    DB_BUSY_TIMEOUT_MS = int(os.getenv("DB_BUSY_TIMEOUT_MS", "5000"))
+    DB_FOREIGN_KEYS = os.getenv("DB_FOREIGN_KEYS", "1") == "1"
+
     ADMIN_IDS = (
         list(map(int, os.getenv("ADMIN_IDS", "").split(",")))
         if os.getenv("ADMIN_IDS")
@@ -15,6 +32,26 @@ class Config:
     )
 
     REMINDER_HOURS_BEFORE = 1
+    REMINDER_RECONCILE_INTERVAL = int(os.getenv("REMINDER_RECONCILE_INTERVAL", "1800"))
+    DIGEST_MAX_CATCHUP_MINUTES = int(os.getenv("DIGEST_MAX_CATCHUP_MINUTES", "180"))
+    DEFAULT_TIMEZONE = os.getenv("DEFAULT_TIMEZONE", "Europe/Moscow")
+
+    SEND_WORKERS = int(os.getenv("SEND_WORKERS", "16"))
+    SEND_GLOBAL_RATE = float(os.getenv("SEND_GLOBAL_RATE", "30"))
+    SEND_PER_CHAT_RATE = float(os.getenv("SEND_PER_CHAT_RATE", "1"))
+    SEND_MAX_RETRIES = int(os.getenv("SEND_MAX_RETRIES", "3"))
+
+    LEADER_LEASE_TTL = int(os.getenv("LEADER_LEASE_TTL", "15"))
+    LEADER_HEARTBEAT_INTERVAL = float(os.getenv("LEADER_HEARTBEAT_INTERVAL", "5"))
+
+    REMINDER_COALESCE_WINDOW = int(os.getenv("REMINDER_COALESCE_WINDOW", "60"))
+    REMINDER_CLAIM_TIMEOUT = int(os.getenv("REMINDER_CLAIM_TIMEOUT", "120"))
+    REMINDER_MAX_ATTEMPTS = int(os.getenv("REMINDER_MAX_ATTEMPTS", "5"))
+    REMINDER_RETRY_BASE_SECONDS = int(os.getenv("REMINDER_RETRY_BASE_SECONDS", "60"))
+    REMINDER_RETRY_MAX_SECONDS = int(os.getenv("REMINDER_RETRY_MAX_SECONDS", "3600"))
+
+    ANALYTICS_CACHE_TTL = float(os.getenv("ANALYTICS_CACHE_TTL", "300"))
+    ANALYTICS_CACHE_SIZE = int(os.getenv("ANALYTICS_CACHE_SIZE", "256"))
 
     CLEANUP_COMPLETED_TASKS_DAYS = 30
     CLEANUP_DELETED_TASKS_DAYS = 30
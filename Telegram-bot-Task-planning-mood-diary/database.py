@@ -1,177 +1,313 @@
-import aiosqlite
+import json
+import logging
+from analytics import AnalyticsCache, AnalyticsSnapshot
+from clock import get_clock
 from config import Config
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
+from db_events import (
+    EventBus,
+    RemindersChangedEvent,
+    TaskEvent,
+    TASK_COMPLETED,
+    TASK_CREATED,
+    TASK_DELETED,
+    TASK_RESCHEDULED,
+    TASK_RESTORED,
+)
+from db_pool import ConnectionPool
+from db_writer import DatabaseWriter
+from migrations import (
+    DAILY_STATS_PRIORITIES,
+    MigrationRunner,
+    backfill_user_daily_stats,
+)
+from recurrence import next_occurrence
+from timeutils import next_daily_ts
+
+logger = logging.getLogger(__name__)
+
+SQL_VARIABLES_CHUNK = 500
+REMINDER_SCHEDULE_SETTINGS = (
+    "enable_reminders",
+    "reminder_before_hours",
+    "reminder_offsets",
+    "enable_overdue_reminders",
+)
+DIGEST_REPEAT_GUARD_SECONDS = 20 * 3600
+
+TASK_FIELDS = (
+    "id",
+    "user_id",
+    "content",
+    "due_ts",
+    "priority",
+    "status",
+    "created_ts",
+    "completed_ts",
+    "sent",
+    "is_deleted",
+    "deleted_at",
+    "recurrence",
+)
+TASK_TIMESTAMP_POSITIONS = (3, 6, 7)
+
+
+def task_columns(alias: str = "") -> str:
+    """Колонки задачи в едином порядке TASK_FIELDS"""
+    prefix = f"{alias}." if alias else ""
+    return ", ".join(prefix + field for field in TASK_FIELDS)
+
+
+def to_ts(value: datetime):
+    """Переводит время сервера (наивный datetime) в секунды эпохи"""
+    return int(value.timestamp()) if value else None
+
+
+def from_ts(value):
+    """Переводит секунды эпохи во время сервера"""
+    return datetime.fromtimestamp(value) if value is not None else None
+
+
+def now_ts() -> int:
+    """Текущее время в секундах эпохи по часам процесса"""
+    return int(get_clock().time())
+
+
+def utc_timestamp(ts: int) -> str:
+    """Секунды эпохи в формате CURRENT_TIMESTAMP (UTC, через пробел)"""
+    return datetime.fromtimestamp(ts, timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+
+
+def day_bounds_ts(day) -> tuple:
+    """Начало суток и начало следующих суток в секундах эпохи"""
+    start = datetime.combine(day, datetime.min.time())
+    return to_ts(start), to_ts(start + timedelta(days=1))
+
+
+def day_key(value: datetime) -> str:
+    """Ключ дня YYYY-MM-DD, как в user_daily_stats"""
+    return value.strftime("%Y-%m-%d")
+
+
+def today_key() -> str:
+    """Ключ сегодняшнего дня по часам процесса (день записи настроения)"""
+    return day_key(get_clock().now())
+
+
+def minute_of_day(value: str) -> int:
+    """Переводит время ЧЧ:ММ в минуту суток"""
+    parsed = datetime.strptime(value.strip(), "%H:%M")
+    return parsed.hour * 60 + parsed.minute
+
+
+def with_daily_minute(settings: dict) -> dict:
+    """Дополняет настройки минутой суток, если меняется время сводки"""
+    if settings.get("daily_overdue_time"):
+        minute = minute_of_day(settings["daily_overdue_time"])
+        settings = dict(settings)
+        settings["daily_overdue_time"] = f"{minute // 60:02d}:{minute % 60:02d}"
+        settings["daily_minute"] = minute
+    return settings
+
+
+def deadline_offsets(reminder_offsets: str, reminder_hours) -> list:
+    """Отступы напоминаний о дедлайне в минутах из настроек пользователя"""
+    if reminder_offsets:
+        return [int(value) for value in reminder_offsets.split(",") if value]
+    return [(reminder_hours or 1) * 60]
 
 
-class Database:
-    def __init__(self):
-        self.db_path = Config.DATABASE_URL.replace("sqlite:///", "")
+def task_from_row(row):
+    """Строка задачи, в которой колонки времени переведены в datetime"""
+    if row is None:
+        return None
+    row = list(row)
+    for position in TASK_TIMESTAMP_POSITIONS:
+        row[position] = from_ts(row[position])
+    return tuple(row)
 
-    async def initialize(self):
-        """Инициализация базы данных - создание таблиц"""
-        await self.create_tables()
 
-    async def create_tables(self):
-        async with aiosqlite.connect(self.db_path) as db:
-            await db.execute(
-                """
-                CREATE TABLE IF NOT EXISTS users (
-                    id INTEGER PRIMARY KEY,
-                    username TEXT,
-                    first_name TEXT,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            """
-            )
+def tasks_from_rows(rows) -> list:
+    """Список строк задач с колонками времени в datetime"""
+    return [task_from_row(row) for row in rows]
 
-            await db.execute(
-                """
-                CREATE TABLE IF NOT EXISTS tasks (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    user_id INTEGER,
-                    content TEXT NOT NULL,
-                    due_date TIMESTAMP,
-                    priority TEXT DEFAULT 'medium',
-                    status TEXT DEFAULT 'pending',
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    completed_at TIMESTAMP,
-                    sent BOOLEAN DEFAULT 0,
-                    is_deleted BOOLEAN DEFAULT 0,
-                    deleted_at TIMESTAMP,
-                    last_overdue_notification TEXT,
-                    FOREIGN KEY (user_id) REFERENCES users (id)
-                );
 
-            """
-            )
+def rows_with_datetimes(rows, *positions) -> list:
+    """Переводит в datetime колонки времени на указанных позициях"""
+    converted = []
+    for row in rows:
+        row = list(row)
+        for position in positions:
+            row[position] = from_ts(row[position])
+        converted.append(tuple(row))
+    return converted
 
-            await db.execute(
-                """
-                CREATE TABLE IF NOT EXISTS moods (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    user_id INTEGER,
-                    mood TEXT NOT NULL,
-                    notes TEXT,
-                    date DATE DEFAULT CURRENT_DATE,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    FOREIGN KEY (user_id) REFERENCES users (id)
-                )
-            """
-            )
 
-            await db.execute(
-                """
-                CREATE TABLE IF NOT EXISTS tags (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    user_id INTEGER,
-                    name TEXT NOT NULL,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    FOREIGN KEY (user_id) REFERENCES users (id),
-                    UNIQUE(user_id, name)
-                )
-            """
-            )
+def get_pragma_profile() -> dict:
+    """Собирает профиль PRAGMA из настроек"""
+    return {
+        "journal_mode": Config.DB_JOURNAL_MODE,
+        "synchronous": Config.DB_SYNCHRONOUS,
+        "cache_size": -Config.DB_CACHE_SIZE_KB,
+        "mmap_size": Config.DB_MMAP_SIZE,
+        "temp_store": Config.DB_TEMP_STORE,
+        "busy_timeout": Config.DB_BUSY_TIMEOUT_MS,
+        "foreign_keys": "ON" if Config.DB_FOREIGN_KEYS else "OFF",
+    }
 
-            await db.execute(
-                """
-                CREATE TABLE IF NOT EXISTS task_tags (
-                    task_id INTEGER,
-                    tag_id INTEGER,
-                    PRIMARY KEY (task_id, tag_id),
-                    FOREIGN KEY (task_id) REFERENCES tasks (id) ON DELETE CASCADE,
-                    FOREIGN KEY (tag_id) REFERENCES tags (id) ON DELETE CASCADE
-                )
-            """
-            )
 
-            await db.execute(
-                """
-                CREATE TABLE IF NOT EXISTS task_reminders (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    user_id INTEGER NOT NULL,
-                    task_id INTEGER NOT NULL,
-                    reminder_type TEXT NOT NULL DEFAULT 'deadline',
-                    scheduled_time DATETIME NOT NULL,
-                    sent BOOLEAN DEFAULT 0,
-                    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-                    sent_at DATETIME NULL,
-                    FOREIGN KEY (user_id) REFERENCES users (id),
-                    FOREIGN KEY (task_id) REFERENCES tasks (id) ON DELETE CASCADE
-                )
-            """
-            )
-            await db.execute(
-                """
-                CREATE TABLE IF NOT EXISTS reminder_settings (
-                    user_id INTEGER PRIMARY KEY,
-                    enable_reminders BOOLEAN DEFAULT 1,
-                    reminder_before_hours INTEGER DEFAULT 1,
-                    enable_overdue_reminders BOOLEAN DEFAULT 1,
-                    daily_overdue_time TEXT DEFAULT '09:00',
-                    overdue_reminder_interval_hours INTEGER DEFAULT 24,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    FOREIGN KEY (user_id) REFERENCES users (id)
-                )
-                """
-            )
+class Database:
+    def __init__(self):
+        self.db_path = Config.DATABASE_URL.replace("sqlite:///", "")
+        pragmas = get_pragma_profile()
+        self.pool = ConnectionPool(
+            self.db_path,
+            size=Config.DB_POOL_SIZE,
+            acquire_timeout=Config.DB_POOL_ACQUIRE_TIMEOUT,
+            health_check_interval=Config.DB_POOL_HEALTH_CHECK_INTERVAL,
+            pragmas=pragmas,
+        )
+        self.writer = DatabaseWriter(
+            self.db_path,
+            max_batch=Config.DB_WRITE_BATCH_SIZE,
+            max_delay=Config.DB_WRITE_MAX_DELAY,
+            pragmas=pragmas,
+        )
+        self.migrations = MigrationRunner(self.pool, self.writer)
+        self.events = EventBus()
+        self.analytics_cache = AnalyticsCache(
+            ttl=Config.ANALYTICS_CACHE_TTL, max_size=Config.ANALYTICS_CACHE_SIZE
+        )
 
-            await db.commit()
+    async def initialize(self):
+        """Инициализация базы данных - применение миграций схемы"""
+        await self.writer.start()
+        await self.pool.open()
+        await self.migrations.migrate()
+
+        settings = ", ".join(
+            f"{name}={value}" for name, value in self.writer.applied_pragmas.items()
+        )
+        logger.info(f"SQLite PRAGMA: {settings}")
+
+    async def set_trace_callback(self, callback):
+        """Вызывает callback(sql) для каждой инструкции SQL (бенчмарки, отладка)"""
+        await self.writer.set_trace_callback(callback)
+        await self.pool.set_trace_callback(callback)
+
+    async def close(self):
+        """Закрывает все соединения с базой данных"""
+        await self.migrations.stop()
+        await self.writer.close()
+        await self.pool.close()
+
+    def _publish_task_event(self, kind: str, task_id: int, row):
+        """Публикует событие задачи после коммита; row = (user_id, due_ts)"""
+        if row is None:
+            return
+        user_id, due_ts = row
+        self.analytics_cache.invalidate(user_id)
+        self.events.publish(TaskEvent(kind, task_id, user_id, from_ts(due_ts)))
+
+    async def _task_owner(self, db, task_id: int):
+        """Владелец задачи внутри транзакции записи"""
+        cursor = await db.execute("SELECT user_id FROM tasks WHERE id = ?", (task_id,))
+        row = await cursor.fetchone()
+        return row[0] if row else None
+
+    def _invalidate_task_owner(self, user_id):
+        """Сбрасывает кэш аналитики владельца задачи, если он известен"""
+        if user_id is not None:
+            self.analytics_cache.invalidate(user_id)
 
     async def add_user(self, user_id: int, username: str, first_name: str):
         """Добавляет пользователя"""
-        async with aiosqlite.connect(self.db_path) as db:
+
+        async def _write(db):
             await db.execute(
                 "INSERT OR IGNORE INTO users (id, username, first_name) VALUES (?, ?, ?)",
                 (user_id, username, first_name),
             )
-            await db.commit()
+            await db.execute(
+                "INSERT OR IGNORE INTO reminder_settings (user_id) VALUES (?)",
+                (user_id,),
+            )
+            await self._refresh_next_digest(db, user_id)
+
+        await self.writer.submit(_write)
+
+    async def _refresh_next_digest(self, conn, user_id: int):
+        """Пересчитывает UTC-время следующей сводки по минуте суток и поясу пользователя"""
+        cursor = await conn.execute(
+            "SELECT daily_minute, timezone FROM reminder_settings WHERE user_id = ?",
+            (user_id,),
+        )
+        row = await cursor.fetchone()
+        if row is None:
+            return
+        daily_minute, timezone = row
+        await conn.execute(
+            "UPDATE reminder_settings SET next_digest_ts = ? WHERE user_id = ?",
+            (next_daily_ts(daily_minute or 540, timezone, now_ts()), user_id),
+        )
 
     async def user_exists(self, user_id: int):
         """Проверяет существует ли пользователь"""
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self.pool.acquire() as db:
             cursor = await db.execute("SELECT id FROM users WHERE id = ?", (user_id,))
             return await cursor.fetchone() is not None
 
     async def add_task(self, user_id: int, content: str, due_date: datetime):
         """Добавляет задачу"""
-        async with aiosqlite.connect(self.db_path) as db:
+
+        async def _write(db):
             cursor = await db.execute(
-                "INSERT INTO tasks (user_id, content, due_date, status) VALUES (?, ?, ?, ?)",
+                "INSERT INTO tasks (user_id, content, due_date, due_ts, status, created_ts) VALUES (?, ?, ?, ?, ?, ?)",
                 (
                     user_id,
                     content,
                     due_date.isoformat() if due_date else None,
+                    to_ts(due_date),
                     "pending",
+                    now_ts(),
                 ),
             )
-            await db.commit()
             return cursor.lastrowid
 
+        task_id = await self.writer.submit(_write)
+        self._publish_task_event(TASK_CREATED, task_id, (user_id, to_ts(due_date)))
+        return task_id
+
     async def add_task_with_priority(
         self, user_id: int, content: str, due_date: datetime, priority: str = "medium"
     ):
         """Добавляет задачу с приоритетом"""
-        async with aiosqlite.connect(self.db_path) as db:
+
+        async def _write(db):
             cursor = await db.execute(
-                "INSERT INTO tasks (user_id, content, due_date, priority, status) VALUES (?, ?, ?, ?, ?)",
+                "INSERT INTO tasks (user_id, content, due_date, due_ts, priority, status, created_ts) VALUES (?, ?, ?, ?, ?, ?, ?)",
                 (
                     user_id,
                     content,
                     due_date.isoformat() if due_date else None,
+                    to_ts(due_date),
                     priority,
                     "pending",
+                    now_ts(),
                 ),
             )
-            await db.commit()
             return cursor.lastrowid
 
+        task_id = await self.writer.submit(_write)
+        self._publish_task_event(TASK_CREATED, task_id, (user_id, to_ts(due_date)))
+        return task_id
+
     async def get_user_tasks(
         self, user_id: int, status: str = None, include_deleted: bool = False
     ):
         """Получает задачи пользователя"""
-        async with aiosqlite.connect(self.db_path) as db:
-            base_query = "SELECT id, user_id, content, due_date, priority, status, created_at, is_deleted FROM tasks WHERE user_id = ?"
+        async with self.pool.acquire() as db:
+            base_query = f"SELECT {task_columns()} FROM tasks WHERE user_id = ?"
             params = [user_id]
 
             if not include_deleted:
@@ -181,17 +317,17 @@ class Database:
                 base_query += " AND status = ?"
                 params.append(status)
 
-            base_query += " ORDER BY due_date"
+            base_query += " ORDER BY due_ts"
 
             cursor = await db.execute(base_query, params)
-            return await cursor.fetchall()
+            return tasks_from_rows(await cursor.fetchall())
 
     async def get_user_tasks_with_priority(
         self, user_id: int, status: str = None, include_deleted: bool = False
     ):
         """Получает задачи пользователя с информацией о приоритете"""
-        async with aiosqlite.connect(self.db_path) as db:
-            base_query = "SELECT id, user_id, content, due_date, priority, status, created_at, is_deleted FROM tasks WHERE user_id = ?"
+        async with self.pool.acquire() as db:
+            base_query = f"SELECT {task_columns()} FROM tasks WHERE user_id = ?"
             params = [user_id]
 
             if not include_deleted:
@@ -201,118 +337,231 @@ class Database:
                 base_query += " AND status = ?"
                 params.append(status)
 
-            base_query += " ORDER BY due_date"
+            base_query += " ORDER BY due_ts"
 
             cursor = await db.execute(base_query, params)
-            return await cursor.fetchall()
+            return tasks_from_rows(await cursor.fetchall())
 
     async def get_task(self, task_id: int):
         """Получает задачу по ID"""
-        async with aiosqlite.connect(self.db_path) as db:
-            cursor = await db.execute("SELECT * FROM tasks WHERE id = ?", (task_id,))
-            return await cursor.fetchone()
+        async with self.pool.acquire() as db:
+            cursor = await db.execute(
+                f"SELECT {task_columns()} FROM tasks WHERE id = ?", (task_id,)
+            )
+            return task_from_row(await cursor.fetchone())
 
     async def complete_task(self, task_id: int):
-        """Отмечает задачу как выполненную"""
-        async with aiosqlite.connect(self.db_path) as db:
-            await db.execute(
-                'UPDATE tasks SET status = "completed", completed_at = CURRENT_TIMESTAMP WHERE id = ? AND is_deleted = 0',
-                (task_id,),
+        """Отмечает задачу как выполненную; возвращает (id, срок) следующего повторения или None"""
+        completed_ts = now_ts()
+
+        async def _write(db):
+            cursor = await db.execute(
+                'UPDATE tasks SET status = "completed", completed_at = ?, completed_ts = ? WHERE id = ? AND is_deleted = 0 RETURNING user_id, due_ts, recurrence',
+                (utc_timestamp(completed_ts), completed_ts, task_id),
+            )
+            row = await cursor.fetchone()
+            if row is None:
+                return None, None
+            user_id, due_ts, recurrence = row
+            next_due = next_occurrence(
+                recurrence, from_ts(due_ts), from_ts(completed_ts)
+            )
+            if next_due is None:
+                return (user_id, due_ts), None
+            return (user_id, due_ts), await self._materialize_next_occurrence(
+                db, task_id, next_due
+            )
+
+        row, next_task = await self.writer.submit(_write)
+        self._publish_task_event(TASK_COMPLETED, task_id, row)
+        if next_task is None:
+            return None
+        next_task_id, next_due = next_task
+        self._publish_task_event(TASK_CREATED, next_task_id, (row[0], to_ts(next_due)))
+        return next_task
+
+    async def _materialize_next_occurrence(
+        self, conn, task_id: int, next_due: datetime
+    ):
+        """Создает следующее повторение серии, если в ней нет активного или более позднего"""
+        cursor = await conn.execute(
+            """
+            INSERT INTO tasks (user_id, content, due_date, due_ts, priority, status, created_ts, recurrence, series_id)
+            SELECT user_id, content, ?, ?, priority, 'pending', ?, recurrence, COALESCE(series_id, id)
+            FROM tasks t
+            WHERE id = ? AND NOT EXISTS (
+                SELECT 1 FROM tasks
+                WHERE user_id = t.user_id AND series_id = COALESCE(t.series_id, t.id)
+                AND is_deleted = 0 AND (status = 'pending' OR due_ts >= ?)
+            )
+            RETURNING id
+            """,
+            (next_due.isoformat(), to_ts(next_due), now_ts(), task_id, to_ts(next_due)),
+        )
+        row = await cursor.fetchone()
+        if row is None:
+            return None
+
+        await conn.execute(
+            "INSERT INTO task_tags (task_id, tag_id) SELECT ?, tag_id FROM task_tags WHERE task_id = ?",
+            (row[0], task_id),
+        )
+        return row[0], next_due
+
+    async def set_task_recurrence(self, task_id: int, recurrence: str = None) -> bool:
+        """Задает правило повторения задачи; None прекращает повторения"""
+
+        async def _write(db):
+            cursor = await db.execute(
+                """
+                UPDATE tasks SET recurrence = ?,
+                    series_id = CASE WHEN ? IS NULL THEN series_id ELSE COALESCE(series_id, id) END
+                WHERE id = ? AND is_deleted = 0
+                RETURNING user_id
+                """,
+                (recurrence, recurrence, task_id),
             )
-            await db.commit()
+            return await cursor.fetchone()
+
+        row = await self.writer.submit(_write)
+        if row is None:
+            return False
+        self.analytics_cache.invalidate(row[0])
+        return True
 
     async def delete_task(self, task_id: int):
         """Помечает задачу как удаленную вместо физического удаления"""
-        async with aiosqlite.connect(self.db_path) as db:
-            await db.execute(
-                "UPDATE tasks SET is_deleted = 1, deleted_at = CURRENT_TIMESTAMP WHERE id = ?",
-                (task_id,),
+
+        async def _write(db):
+            cursor = await db.execute(
+                "UPDATE tasks SET is_deleted = 1, deleted_at = ? WHERE id = ? RETURNING user_id, due_ts",
+                (utc_timestamp(now_ts()), task_id),
             )
-            await db.commit()
+            return await cursor.fetchone()
+
+        row = await self.writer.submit(_write)
+        self._publish_task_event(TASK_DELETED, task_id, row)
 
     async def restore_task(self, task_id: int):
         """Восстанавливает удаленную задачу"""
-        async with aiosqlite.connect(self.db_path) as db:
-            await db.execute(
-                "UPDATE tasks SET is_deleted = 0, deleted_at = NULL WHERE id = ?",
+
+        async def _write(db):
+            cursor = await db.execute(
+                "UPDATE tasks SET is_deleted = 0, deleted_at = NULL WHERE id = ? RETURNING user_id, due_ts",
                 (task_id,),
             )
-            await db.commit()
+            return await cursor.fetchone()
+
+        row = await self.writer.submit(_write)
+        self._publish_task_event(TASK_RESTORED, task_id, row)
 
     async def permanently_delete_task(self, task_id: int):
         """Физически удаляет задачу"""
-        async with aiosqlite.connect(self.db_path) as db:
-            await db.execute("DELETE FROM tasks WHERE id = ?", (task_id,))
-            await db.commit()
+
+        async def _write(db):
+            cursor = await db.execute(
+                "DELETE FROM tasks WHERE id = ? RETURNING user_id, due_ts", (task_id,)
+            )
+            return await cursor.fetchone()
+
+        row = await self.writer.submit(_write)
+        self._publish_task_event(TASK_DELETED, task_id, row)
 
     async def postpone_task(self, task_id: int, new_date: datetime):
         """Откладывает задачу"""
-        async with aiosqlite.connect(self.db_path) as db:
-            await db.execute(
-                "UPDATE tasks SET due_date = ?, sent = 0 WHERE id = ? AND is_deleted = 0",
-                (new_date.isoformat(), task_id),
+
+        async def _write(db):
+            cursor = await db.execute(
+                "UPDATE tasks SET due_date = ?, due_ts = ?, sent = 0 WHERE id = ? AND is_deleted = 0 RETURNING user_id, due_ts",
+                (new_date.isoformat(), to_ts(new_date), task_id),
             )
-            await db.commit()
+            return await cursor.fetchone()
+
+        row = await self.writer.submit(_write)
+        self._publish_task_event(TASK_RESCHEDULED, task_id, row)
 
     async def update_task_priority(self, task_id: int, priority: str):
         """Обновляет приоритет задачи"""
-        async with aiosqlite.connect(self.db_path) as db:
-            await db.execute(
-                "UPDATE tasks SET priority = ? WHERE id = ? AND is_deleted = 0",
+
+        async def _write(db):
+            cursor = await db.execute(
+                "UPDATE tasks SET priority = ? WHERE id = ? AND is_deleted = 0 RETURNING user_id",
                 (priority, task_id),
             )
-            await db.commit()
+            return await cursor.fetchone()
+
+        row = await self.writer.submit(_write)
+        if row:
+            self.analytics_cache.invalidate(row[0])
 
     async def update_task_content(self, task_id: int, new_content: str):
         """Обновляет текст задачи"""
-        async with aiosqlite.connect(self.db_path) as db:
-            await db.execute(
-                "UPDATE tasks SET content = ? WHERE id = ? AND is_deleted = 0",
+
+        async def _write(db):
+            cursor = await db.execute(
+                "UPDATE tasks SET content = ? WHERE id = ? AND is_deleted = 0 RETURNING user_id",
                 (new_content, task_id),
             )
-            await db.commit()
+            return await cursor.fetchone()
+
+        row = await self.writer.submit(_write)
+        if row:
+            self.analytics_cache.invalidate(row[0])
 
     async def update_task_due_date(self, task_id: int, new_due_date: datetime):
         """Обновляет срок выполнения задачи"""
-        async with aiosqlite.connect(self.db_path) as db:
-            await db.execute(
-                "UPDATE tasks SET due_date = ?, sent = 0 WHERE id = ? AND is_deleted = 0",
-                (new_due_date.isoformat() if new_due_date else None, task_id),
+
+        async def _write(db):
+            cursor = await db.execute(
+                "UPDATE tasks SET due_date = ?, due_ts = ?, sent = 0 WHERE id = ? AND is_deleted = 0 RETURNING user_id, due_ts",
+                (
+                    new_due_date.isoformat() if new_due_date else None,
+                    to_ts(new_due_date),
+                    task_id,
+                ),
             )
-            await db.commit()
+            return await cursor.fetchone()
+
+        row = await self.writer.submit(_write)
+        self._publish_task_event(TASK_RESCHEDULED, task_id, row)
 
     async def update_task_full(
         self, task_id: int, new_content: str, new_due_date: datetime
     ):
         """Обновляет и текст и дату задачи"""
-        async with aiosqlite.connect(self.db_path) as db:
-            await db.execute(
-                "UPDATE tasks SET content = ?, due_date = ?, sent = 0 WHERE id = ? AND is_deleted = 0",
+
+        async def _write(db):
+            cursor = await db.execute(
+                "UPDATE tasks SET content = ?, due_date = ?, due_ts = ?, sent = 0 WHERE id = ? AND is_deleted = 0 RETURNING user_id, due_ts",
                 (
                     new_content,
                     new_due_date.isoformat() if new_due_date else None,
+                    to_ts(new_due_date),
                     task_id,
                 ),
             )
-            await db.commit()
+            return await cursor.fetchone()
+
+        row = await self.writer.submit(_write)
+        self._publish_task_event(TASK_RESCHEDULED, task_id, row)
 
     async def get_tasks_by_priority(self, user_id: int, priority: str):
         """Получает задачи по приоритету"""
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self.pool.acquire() as db:
             cursor = await db.execute(
-                """
-                SELECT id,content, due_date, priority, status, created_at 
+                f"""
+                SELECT {task_columns()}
                 FROM tasks 
                 WHERE user_id = ? AND priority = ? AND status = 'pending' AND is_deleted = 0
-                ORDER BY due_date
+                ORDER BY due_ts
                 """,
                 (user_id, priority),
             )
-            return await cursor.fetchall()
+            return tasks_from_rows(await cursor.fetchall())
 
     async def get_tasks_grouped_by_priority(self, user_id: int):
         """Получает задачи сгруппированные по приоритету"""
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self.pool.acquire() as db:
             cursor = await db.execute(
                 """
                 SELECT priority, COUNT(*) as count 
@@ -333,60 +582,62 @@ class Database:
 
     async def get_tasks_by_date(self, user_id: int, target_date: datetime):
         """Получает задачи на конкретную дату"""
-        async with aiosqlite.connect(self.db_path) as db:
-            date_str = target_date.date().isoformat()
+        async with self.pool.acquire() as db:
+            day_start, day_end = day_bounds_ts(target_date.date())
             cursor = await db.execute(
-                """
-                SELECT id, content, due_date, priority, status 
+                f"""
+                SELECT {task_columns()}
                 FROM tasks 
                 WHERE user_id = ? 
-                AND date(due_date) = ? 
                 AND status = 'pending' 
                 AND is_deleted = 0
-                ORDER BY due_date
+                AND due_ts >= ? AND due_ts < ?
+                ORDER BY due_ts
                 """,
-                (user_id, date_str),
+                (user_id, day_start, day_end),
             )
-            return await cursor.fetchall()
+            return tasks_from_rows(await cursor.fetchall())
 
     async def get_tasks_for_reminder(self):
         """Получает задачи для напоминания"""
-        async with aiosqlite.connect(self.db_path) as db:
-            reminder_time = (
-                datetime.now() + timedelta(hours=Config.REMINDER_HOURS_BEFORE)
-            ).isoformat()
+        async with self.pool.acquire() as db:
+            reminder_time = to_ts(
+                get_clock().now() + timedelta(hours=Config.REMINDER_HOURS_BEFORE)
+            )
             cursor = await db.execute(
-                """
-                SELECT t.*, u.id as user_id 
+                f"""
+                SELECT {task_columns('t')}
                 FROM tasks t 
                 JOIN users u ON t.user_id = u.id 
                 WHERE t.status = 'pending' 
-                AND t.due_date <= ? 
+                AND t.due_ts <= ? 
                 AND t.sent = 0
                 AND t.is_deleted = 0
             """,
                 (reminder_time,),
             )
-            return await cursor.fetchall()
+            return tasks_from_rows(await cursor.fetchall())
 
     async def mark_reminder_sent(self, task_id: int):
         """Отмечает что напоминание отправлено"""
-        async with aiosqlite.connect(self.db_path) as db:
+
+        async def _write(db):
             await db.execute("UPDATE tasks SET sent = 1 WHERE id = ?", (task_id,))
-            await db.commit()
+
+        await self.writer.submit(_write)
 
     async def get_today_mood(self, user_id: int):
         """Получает сегодняшнее настроение с заметкой"""
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self.pool.acquire() as db:
             cursor = await db.execute(
-                'SELECT id, user_id, mood, notes, date FROM moods WHERE user_id = ? AND date = date("now")',
-                (user_id,),
+                "SELECT id, user_id, mood, notes, date FROM moods WHERE user_id = ? AND date = ?",
+                (user_id, today_key()),
             )
             return await cursor.fetchone()
 
     async def get_mood_by_date(self, user_id: int, date: str):
         """Получает настроение за конкретную дату"""
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self.pool.acquire() as db:
             cursor = await db.execute(
                 "SELECT id, mood, notes FROM moods WHERE user_id = ? AND date = ?",
                 (user_id, date),
@@ -395,68 +646,81 @@ class Database:
 
     async def add_mood_with_notes(self, user_id: int, mood: str, notes: str = None):
         """Добавляет настроение с заметкой"""
-        async with aiosqlite.connect(self.db_path) as db:
+
+        today = today_key()
+
+        async def _write(db):
             cursor = await db.execute(
-                "SELECT id FROM moods WHERE user_id = ? AND date = CURRENT_DATE",
-                (user_id,),
+                "SELECT id FROM moods WHERE user_id = ? AND date = ?",
+                (user_id, today),
             )
             existing = await cursor.fetchone()
 
             if existing:
                 await db.execute(
-                    "UPDATE moods SET mood = ?, notes = ? WHERE user_id = ? AND date = CURRENT_DATE",
-                    (mood, notes, user_id),
+                    "UPDATE moods SET mood = ?, notes = ? WHERE user_id = ? AND date = ?",
+                    (mood, notes, user_id, today),
                 )
             else:
                 await db.execute(
-                    "INSERT INTO moods (user_id, mood, notes) VALUES (?, ?, ?)",
-                    (user_id, mood, notes),
+                    "INSERT INTO moods (user_id, mood, notes, date) VALUES (?, ?, ?, ?)",
+                    (user_id, mood, notes, today),
                 )
 
-            await db.commit()
+        await self.writer.submit(_write)
+        self.analytics_cache.invalidate(user_id)
 
     async def update_mood(self, user_id: int, new_mood: str):
         """Обновляет настроение"""
-        async with aiosqlite.connect(self.db_path) as db:
+
+        async def _write(db):
             await db.execute(
-                'UPDATE moods SET mood = ? WHERE user_id = ? AND date = date("now")',
-                (new_mood, user_id),
+                "UPDATE moods SET mood = ? WHERE user_id = ? AND date = ?",
+                (new_mood, user_id, today_key()),
             )
-            await db.commit()
+
+        await self.writer.submit(_write)
+        self.analytics_cache.invalidate(user_id)
 
     async def update_mood_with_notes(self, user_id: int, mood: str, notes: str = None):
         """Обновляет сегодняшнее настроение с заметкой"""
-        async with aiosqlite.connect(self.db_path) as db:
+
+        async def _write(db):
             await db.execute(
-                'UPDATE moods SET mood = ?, notes = ? WHERE user_id = ? AND date = date("now")',
-                (mood, notes, user_id),
+                "UPDATE moods SET mood = ?, notes = ? WHERE user_id = ? AND date = ?",
+                (mood, notes, user_id, today_key()),
             )
-            await db.commit()
+
+        await self.writer.submit(_write)
+        self.analytics_cache.invalidate(user_id)
 
     async def update_mood_notes(self, user_id: int, notes: str):
         """Обновляет только заметку к сегодняшнему настроению"""
-        try:
 
-            async with aiosqlite.connect(self.db_path) as db:
-                cursor = await db.execute(
-                    'SELECT id, mood, notes FROM moods WHERE user_id = ? AND date = date("now")',
-                    (user_id,),
-                )
-                existing_mood = await cursor.fetchone()
+        today = today_key()
 
-                if not existing_mood:
-                    print("❌ [UPDATE_MOOD_NOTES] Нет записи настроения на сегодня")
-                    return False
+        async def _write(db):
+            cursor = await db.execute(
+                "SELECT id, mood, notes FROM moods WHERE user_id = ? AND date = ?",
+                (user_id, today),
+            )
+            existing_mood = await cursor.fetchone()
 
-                result = await db.execute(
-                    'UPDATE moods SET notes = ? WHERE user_id = ? AND date = date("now")',
-                    (notes, user_id),
-                )
-                await db.commit()
+            if not existing_mood:
+                print("❌ [UPDATE_MOOD_NOTES] Нет записи настроения на сегодня")
+                return False
 
-                changes = result.rowcount
+            result = await db.execute(
+                "UPDATE moods SET notes = ? WHERE user_id = ? AND date = ?",
+                (notes, user_id, today),
+            )
 
-                return changes > 0
+            changes = result.rowcount
+
+            return changes > 0
+
+        try:
+            return await self.writer.submit(_write)
 
         except Exception as e:
             print(f"❌ [UPDATE_MOOD_NOTES] Ошибка: {e}")
@@ -467,35 +731,229 @@ class Database:
 
     async def get_mood_statistics(self, user_id: int, days: int = 30):
         """Получает статистику настроений"""
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self.pool.acquire() as db:
             cursor = await db.execute(
                 """
                 SELECT mood, date 
                 FROM moods 
-                WHERE user_id = ? AND date >= date('now', ?) 
+                WHERE user_id = ? AND date >= ? 
                 ORDER BY date DESC
             """,
-                (user_id, f"-{days} days"),
+                (user_id, day_key(get_clock().now() - timedelta(days=days))),
             )
             return await cursor.fetchall()
 
     async def get_task_statistics(self, user_id: int, days: int = 30):
         """Получает статистику задач"""
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self.pool.acquire() as db:
             cursor = await db.execute(
                 """
                 SELECT status, COUNT(*) as count 
                 FROM tasks 
-                WHERE user_id = ? AND created_at >= date('now', ?) AND is_deleted = 0
+                WHERE user_id = ? AND created_ts >= ? AND is_deleted = 0
                 GROUP BY status
             """,
-                (user_id, f"-{days} days"),
+                (
+                    user_id,
+                    day_bounds_ts(get_clock().now().date() - timedelta(days=days))[0],
+                ),
             )
             return await cursor.fetchall()
 
+    async def _query_task_analytics(
+        self, db, user_id: int, start_date: datetime, end_date: datetime
+    ):
+        """Счетчики задач, созданных в [start_date, end_date): по статусам, приоритетам и просрочке"""
+        priority_sums = ", ".join(
+            f"SUM({name}), SUM({name}_completed)" for name in DAILY_STATS_PRIORITIES
+        )
+        cursor = await db.execute(
+            f"""
+            SELECT {priority_sums}
+            FROM user_daily_stats
+            WHERE user_id = ? AND day >= ? AND day < ?
+            """,
+            (user_id, day_key(start_date), day_key(end_date)),
+        )
+        row = await cursor.fetchone()
+
+        # Просроченные еще не выполнены, значит очистка их не трогала
+        cursor = await db.execute(
+            """
+            SELECT COALESCE(priority, 'medium'), COUNT(*)
+            FROM tasks
+            WHERE user_id = ? AND status = 'pending' AND is_deleted = 0
+            AND due_ts < ? AND created_ts >= ? AND created_ts < ?
+            GROUP BY 1
+            """,
+            (user_id, now_ts(), to_ts(start_date), to_ts(end_date)),
+        )
+        overdue = dict(await cursor.fetchall())
+
+        analytics = {"total": 0, "completed": 0, "pending": 0, "overdue": 0}
+        priorities = {}
+        for index, priority in enumerate(DAILY_STATS_PRIORITIES):
+            total, completed = row[2 * index] or 0, row[2 * index + 1] or 0
+            if not total:
+                continue
+            priorities[priority] = {
+                "total": total,
+                "completed": completed,
+                "pending": total - completed,
+                "overdue": overdue.get(priority, 0),
+            }
+            for key, value in priorities[priority].items():
+                analytics[key] += value
+        analytics["priorities"] = priorities
+        return analytics
+
+    async def _query_daily_task_counts(
+        self, db, user_id: int, start_date: datetime, end_date: datetime
+    ):
+        """Задачи по дням: (YYYY-MM-DD, создано, выполнено, из них после срока)"""
+        cursor = await db.execute(
+            """
+            SELECT day, created, completed, overdue
+            FROM user_daily_stats
+            WHERE user_id = ? AND day >= ? AND day < ?
+            AND (created > 0 OR completed > 0)
+            ORDER BY day
+            """,
+            (user_id, day_key(start_date), day_key(end_date)),
+        )
+        return await cursor.fetchall()
+
+    async def _query_tag_analytics(self, db, user_id: int, start_ts: int, end_ts: int):
+        """Теги задач периода: (задач с тегами, [(тег, всего, выполнено), ...])"""
+        # Читает сами задачи: выполненные задачи старше 30 дней, удаленные очисткой,
+        # из тегов за длинный период выпадают (в user_daily_stats тегов нет)
+        params = (user_id, start_ts, end_ts)
+        cursor = await db.execute(
+            """
+            SELECT tg.name, COUNT(*), SUM(t.status = 'completed')
+            FROM tasks t
+            JOIN task_tags tt ON tt.task_id = t.id
+            JOIN tags tg ON tg.id = tt.tag_id
+            WHERE t.user_id = ? AND t.is_deleted = 0
+            AND t.created_ts >= ? AND t.created_ts < ?
+            GROUP BY tg.id
+            ORDER BY COUNT(*) DESC, tg.name
+            """,
+            params,
+        )
+        tags = await cursor.fetchall()
+        if not tags:
+            return 0, []
+
+        cursor = await db.execute(
+            """
+            SELECT COUNT(*) FROM tasks t
+            WHERE t.user_id = ? AND t.is_deleted = 0
+            AND t.created_ts >= ? AND t.created_ts < ?
+            AND EXISTS (SELECT 1 FROM task_tags tt WHERE tt.task_id = t.id)
+            """,
+            params,
+        )
+        return (await cursor.fetchone())[0], tags
+
+    async def _query_moods_between(
+        self, db, user_id: int, start_date: datetime, end_date: datetime
+    ):
+        """Настроения за дни [start_date, end_date), новые первыми: (настроение, YYYY-MM-DD, оценка)"""
+        cursor = await db.execute(
+            """
+            SELECT mood, day, mood_score
+            FROM user_daily_stats
+            WHERE user_id = ? AND day >= ? AND day < ? AND mood IS NOT NULL
+            ORDER BY day DESC
+            """,
+            (user_id, day_key(start_date), day_key(end_date)),
+        )
+        return await cursor.fetchall()
+
+    async def _query_recurring_series_stats(
+        self, db, user_id: int, start_ts: int, end_ts: int
+    ):
+        """Выполнение повторяющихся задач по сериям: (series_id, content, recurrence, всего, выполнено)"""
+        # Как и теги, считается по сохранившимся задачам: очистка укорачивает историю серии
+        cursor = await db.execute(
+            """
+            SELECT series_id, content, recurrence, total, completed FROM (
+                SELECT series_id, content, recurrence, MAX(id),
+                    COUNT(*) AS total, SUM(status = 'completed') AS completed
+                FROM tasks
+                WHERE user_id = ? AND series_id IS NOT NULL AND is_deleted = 0
+                AND due_ts >= ? AND due_ts < ?
+                GROUP BY series_id
+            )
+            ORDER BY total DESC
+            """,
+            (user_id, start_ts, end_ts),
+        )
+        return await cursor.fetchall()
+
+    async def _user_data_version(self, db, user_id: int) -> int:
+        """Счетчик изменений задач, тегов и настроений пользователя"""
+        cursor = await db.execute(
+            "SELECT version FROM user_data_versions WHERE user_id = ?", (user_id,)
+        )
+        row = await cursor.fetchone()
+        return row[0] if row else 0
+
+    async def get_analytics_snapshot(
+        self, user_id: int, start_date: datetime, end_date: datetime
+    ) -> AnalyticsSnapshot:
+        """Снимок аналитики за [start_date, end_date) одной транзакцией чтения; пока версия данных не изменилась, берется из кэша"""
+        start_ts, end_ts = to_ts(start_date), to_ts(end_date)
+        async with self.pool.acquire() as db:
+            # Все отчеты видят одно и то же состояние базы
+            await db.execute("BEGIN")
+            try:
+                # Версию меняют триггеры, поэтому записи других процессов тоже видны
+                version = await self._user_data_version(db, user_id)
+                snapshot = self.analytics_cache.get(
+                    user_id, start_date, end_date, version
+                )
+                if snapshot is not None:
+                    return snapshot
+
+                tasks = await self._query_task_analytics(
+                    db, user_id, start_date, end_date
+                )
+                daily_counts = await self._query_daily_task_counts(
+                    db, user_id, start_date, end_date
+                )
+                tasks_with_tags, tag_rows = await self._query_tag_analytics(
+                    db, user_id, start_ts, end_ts
+                )
+                moods = await self._query_moods_between(
+                    db, user_id, start_date, end_date
+                )
+                series_stats = await self._query_recurring_series_stats(
+                    db, user_id, start_ts, end_ts
+                )
+            finally:
+                await db.execute("COMMIT")
+
+        snapshot = AnalyticsSnapshot(
+            user_id,
+            start_date,
+            end_date,
+            tasks=tasks,
+            daily_counts=daily_counts,
+            tasks_with_tags=tasks_with_tags,
+            tag_rows=tag_rows,
+            moods=moods,
+            series_stats=series_stats,
+            version=version,
+        )
+        self.analytics_cache.put(snapshot)
+        return snapshot
+
     async def create_tag(self, user_id: int, tag_name: str):
         """Создает тег или возвращает ID существующего"""
-        async with aiosqlite.connect(self.db_path) as db:
+
+        async def _write(db):
             cursor = await db.execute(
                 "SELECT id FROM tags WHERE user_id = ? AND name = ?",
                 (user_id, tag_name.lower().strip()),
@@ -509,12 +967,13 @@ class Database:
                 "INSERT INTO tags (user_id, name) VALUES (?, ?)",
                 (user_id, tag_name.lower().strip()),
             )
-            await db.commit()
             return cursor.lastrowid
 
+        return await self.writer.submit(_write)
+
     async def get_user_tags(self, user_id: int):
         """Получает все теги пользователя"""
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self.pool.acquire() as db:
             cursor = await db.execute(
                 "SELECT id, name FROM tags WHERE user_id = ? ORDER BY name",
                 (user_id,),
@@ -523,31 +982,44 @@ class Database:
 
     async def delete_tag(self, tag_id: int):
         """Удаляет тег"""
-        async with aiosqlite.connect(self.db_path) as db:
-            await db.execute("DELETE FROM tags WHERE id = ?", (tag_id,))
-            await db.commit()
+
+        async def _write(db):
+            cursor = await db.execute(
+                "DELETE FROM tags WHERE id = ? RETURNING user_id", (tag_id,)
+            )
+            return await cursor.fetchone()
+
+        row = await self.writer.submit(_write)
+        if row:
+            self.analytics_cache.invalidate(row[0])
 
     async def add_tag_to_task(self, task_id: int, tag_id: int):
         """Добавляет тег к задаче"""
-        async with aiosqlite.connect(self.db_path) as db:
+
+        async def _write(db):
             await db.execute(
                 "INSERT OR IGNORE INTO task_tags (task_id, tag_id) VALUES (?, ?)",
                 (task_id, tag_id),
             )
-            await db.commit()
+            return await self._task_owner(db, task_id)
+
+        self._invalidate_task_owner(await self.writer.submit(_write))
 
     async def remove_tag_from_task(self, task_id: int, tag_id: int):
         """Убирает тег с задачи"""
-        async with aiosqlite.connect(self.db_path) as db:
+
+        async def _write(db):
             await db.execute(
                 "DELETE FROM task_tags WHERE task_id = ? AND tag_id = ?",
                 (task_id, tag_id),
             )
-            await db.commit()
+            return await self._task_owner(db, task_id)
+
+        self._invalidate_task_owner(await self.writer.submit(_write))
 
     async def get_task_tags(self, task_id: int):
         """Получает все теги задачи"""
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self.pool.acquire() as db:
             cursor = await db.execute(
                 """
                 SELECT t.id, t.name
@@ -559,11 +1031,36 @@ class Database:
             )
             return await cursor.fetchall()
 
+    async def get_tags_for_tasks(self, task_ids):
+        """Получает теги сразу для нескольких задач: {task_id: [(tag_id, name), ...]}"""
+        task_ids = list(dict.fromkeys(task_ids))
+        tags_by_task = {task_id: [] for task_id in task_ids}
+        if not task_ids:
+            return tags_by_task
+
+        async with self.pool.acquire() as db:
+            for start in range(0, len(task_ids), SQL_VARIABLES_CHUNK):
+                chunk = task_ids[start : start + SQL_VARIABLES_CHUNK]
+                placeholders = ", ".join("?" * len(chunk))
+                cursor = await db.execute(
+                    f"""
+                    SELECT tt.task_id, t.id, t.name
+                    FROM task_tags tt
+                    JOIN tags t ON t.id = tt.tag_id
+                    WHERE tt.task_id IN ({placeholders})
+                    """,
+                    chunk,
+                )
+                for task_id, tag_id, tag_name in await cursor.fetchall():
+                    tags_by_task[task_id].append((tag_id, tag_name))
+
+        return tags_by_task
+
     async def get_tasks_by_tag(self, user_id: int, tag_name: str):
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self.pool.acquire() as db:
             cursor = await db.execute(
-                """
-                SELECT ts.*  
+                f"""
+                SELECT {task_columns('ts')}
                 FROM tasks ts
                 JOIN task_tags tt ON ts.id = tt.task_id
                 JOIN tags tg ON tg.id = tt.tag_id
@@ -571,11 +1068,11 @@ class Database:
                 """,
                 (user_id, tag_name.lower()),
             )
-            return await cursor.fetchall()
+            return tasks_from_rows(await cursor.fetchall())
 
     async def get_tasks_grouped_by_tags(self, user_id: int):
         """Получает задачи сгруппированные по тегам"""
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self.pool.acquire() as db:
             cursor = await db.execute(
                 """
                 SELECT t.name, COUNT(tt.task_id) as task_count,
@@ -594,17 +1091,18 @@ class Database:
 
     async def get_deleted_tasks(self, user_id: int):
         """Получает удаленные задачи пользователя"""
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self.pool.acquire() as db:
             cursor = await db.execute(
-                "SELECT id, user_id, content, due_date, priority, status, created_at, deleted_at FROM tasks WHERE user_id = ? AND is_deleted = 1 ORDER BY deleted_at DESC",
+                f"SELECT {task_columns()} FROM tasks WHERE user_id = ? AND is_deleted = 1 ORDER BY deleted_at DESC",
                 (user_id,),
             )
-            return await cursor.fetchall()
+            return tasks_from_rows(await cursor.fetchall())
 
     async def cleanup_old_completed_tasks(self, days_old: int = 30):
         """Удаляет выполненные задачи старше X дней"""
-        async with aiosqlite.connect(self.db_path) as db:
-            cutoff_date = (datetime.now() - timedelta(days=days_old)).isoformat()
+
+        async def _write(db):
+            cutoff_date = to_ts(get_clock().now() - timedelta(days=days_old))
 
             await db.execute(
                 """
@@ -612,7 +1110,7 @@ class Database:
                 WHERE task_id IN (
                     SELECT id FROM tasks 
                     WHERE status = 'completed' 
-                    AND completed_at <= ?
+                    AND completed_ts <= ?
                 )
                 """,
                 (cutoff_date,),
@@ -622,30 +1120,42 @@ class Database:
                 """
                 DELETE FROM tasks 
                 WHERE status = 'completed' 
-                AND completed_at <= ?
+                AND completed_ts <= ?
                 """,
                 (cutoff_date,),
             )
 
-            await db.commit()
             return result.rowcount
 
+        deleted = await self.writer.submit(_write)
+        if deleted:
+            self.analytics_cache.clear()
+        return deleted
+
     async def cleanup_old_moods(self, days_old: int = 90):
         """Удаляет записи настроений старше X дней"""
-        async with aiosqlite.connect(self.db_path) as db:
-            cutoff_date = (datetime.now() - timedelta(days=days_old)).date().isoformat()
+
+        async def _write(db):
+            cutoff_date = (
+                (get_clock().now() - timedelta(days=days_old)).date().isoformat()
+            )
 
             result = await db.execute(
                 "DELETE FROM moods WHERE date < ?", (cutoff_date,)
             )
 
-            await db.commit()
             return result.rowcount
 
+        deleted = await self.writer.submit(_write)
+        if deleted:
+            self.analytics_cache.clear()
+        return deleted
+
     async def cleanup_old_deleted_tasks(self, days_old: int = 30):
         """Физически удаляет задачи, помеченные как удаленные больше X дней назад"""
-        async with aiosqlite.connect(self.db_path) as db:
-            cutoff_date = (datetime.now() - timedelta(days=days_old)).isoformat()
+
+        async def _write(db):
+            cutoff_date = utc_timestamp(now_ts() - days_old * 86400)
             await db.execute(
                 """
                 DELETE FROM task_tags 
@@ -663,63 +1173,119 @@ class Database:
                 (cutoff_date,),
             )
 
-            await db.commit()
             return result.rowcount
 
+        deleted = await self.writer.submit(_write)
+        if deleted:
+            self.analytics_cache.clear()
+        return deleted
+
+    async def backfill_daily_stats(self, user_id: int = None):
+        """Пересчитывает дневные агрегаты по сохранившимся данным; возвращает число дней в агрегатах"""
+
+        async def _write(db):
+            await backfill_user_daily_stats(db, user_id)
+            if user_id is None:
+                cursor = await db.execute("SELECT COUNT(*) FROM user_daily_stats")
+            else:
+                cursor = await db.execute(
+                    "SELECT COUNT(*) FROM user_daily_stats WHERE user_id = ?",
+                    (user_id,),
+                )
+            return (await cursor.fetchone())[0]
+
+        days = await self.writer.submit(_write)
+        if user_id is None:
+            self.analytics_cache.clear()
+        else:
+            self.analytics_cache.invalidate(user_id)
+        return days
+
+    async def cleanup_old_reminders(self, days_old: int = 7):
+        """Удаляет отправленные напоминания старше X дней"""
+
+        async def _write(db):
+            result = await db.execute(
+                "DELETE FROM task_reminders WHERE sent = 1 AND sent_at < ?",
+                (utc_timestamp(now_ts() - days_old * 86400),),
+            )
+
+            return result.rowcount
+
+        return await self.writer.submit(_write)
+
     async def get_storage_statistics(self, user_id: int):
         """Получает статистику хранилища"""
-        async with aiosqlite.connect(self.db_path) as db:
-            month_ago = (datetime.now() - timedelta(days=30)).isoformat()
+        async with self.pool.acquire() as db:
+            cursor = await db.execute(
+                "SELECT status, COUNT(*) FROM tasks WHERE user_id = ? AND is_deleted = 0 GROUP BY status",
+                (user_id,),
+            )
+            task_stats = await cursor.fetchall()
+
+            month_ago = to_ts(get_clock().now() - timedelta(days=30))
             cursor = await db.execute(
-                "SELECT COUNT(*) FROM tasks WHERE user_id = ? AND status = 'completed' AND completed_at <= ?",
+                "SELECT COUNT(*) FROM tasks WHERE user_id = ? AND status = 'completed' AND completed_ts <= ?",
                 (user_id, month_ago),
             )
             old_completed = (await cursor.fetchone())[0]
 
-            three_months_ago = (datetime.now() - timedelta(days=90)).date().isoformat()
+            three_months_ago = (
+                (get_clock().now() - timedelta(days=90)).date().isoformat()
+            )
             cursor = await db.execute(
                 "SELECT COUNT(*) FROM moods WHERE user_id = ? AND date < ?",
                 (user_id, three_months_ago),
             )
             old_moods = (await cursor.fetchone())[0]
 
-            return {"old_completed_tasks": old_completed, "old_moods": old_moods}
+            return {
+                "task_stats": task_stats,
+                "old_completed_tasks": old_completed,
+                "old_moods": old_moods,
+            }
 
     async def get_reminder_settings(self, user_id: int):
         """Получает настройки напоминаний пользователя"""
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self.pool.acquire() as db:
             cursor = await db.execute(
                 "SELECT * FROM reminder_settings WHERE user_id = ?", (user_id,)
             )
             settings = await cursor.fetchone()
 
-            if not settings:
+        if not settings:
+
+            async def _write(db):
                 await db.execute(
-                    "INSERT INTO reminder_settings (user_id, enable_reminders, reminder_before_hours, enable_overdue_reminders) VALUES (?, 1, 1, 1)",
+                    "INSERT OR IGNORE INTO reminder_settings (user_id, enable_reminders, reminder_before_hours, enable_overdue_reminders) VALUES (?, 1, 1, 1)",
                     (user_id,),
                 )
-                await db.commit()
-
+                await self._refresh_next_digest(db, user_id)
                 cursor = await db.execute(
                     "SELECT * FROM reminder_settings WHERE user_id = ?", (user_id,)
                 )
-                settings = await cursor.fetchone()
+                return await cursor.fetchone()
 
-            if settings:
-                settings_list = list(settings)
-                if settings_list[1] is None:
-                    settings_list[1] = 1
-                if settings_list[2] is None:
-                    settings_list[2] = 1
-                if settings_list[3] is None:
-                    settings_list[3] = 1
-                return tuple(settings_list)
+            settings = await self.writer.submit(_write)
 
-            return settings
+        if settings:
+            settings_list = list(settings)
+            if settings_list[1] is None:
+                settings_list[1] = 1
+            if settings_list[2] is None:
+                settings_list[2] = 1
+            if settings_list[3] is None:
+                settings_list[3] = 1
+            return tuple(settings_list)
+
+        return settings
 
     async def update_reminder_settings(self, user_id: int, **settings):
         """Обновляет настройки напоминаний"""
-        async with aiosqlite.connect(self.db_path) as db:
+        settings = with_daily_minute(settings)
+        reschedule = any(key in settings for key in REMINDER_SCHEDULE_SETTINGS)
+
+        async def _write(db):
             set_clause = ", ".join([f"{key} = ?" for key in settings.keys()])
             values = list(settings.values())
             values.append(user_id)
@@ -728,112 +1294,534 @@ class Database:
                 f"UPDATE reminder_settings SET {set_clause}, updated_at = CURRENT_TIMESTAMP WHERE user_id = ?",
                 values,
             )
-            await db.commit()
+            await self._refresh_next_digest(db, user_id)
+            if reschedule:
+                return await self._reschedule_user_reminders(db, user_id)
+
+        changes = await self.writer.submit(_write)
+        if changes and (changes[0] or changes[1]):
+            self.events.publish(RemindersChangedEvent(user_id, *changes))
+
+    async def _reschedule_user_reminders(self, db, user_id: int):
+        """Перестраивает неотправленные напоминания пользователя по его настройкам"""
+        cursor = await db.execute(
+            """
+            SELECT enable_reminders, reminder_before_hours, reminder_offsets,
+                enable_overdue_reminders
+            FROM reminder_settings WHERE user_id = ?
+            """,
+            (user_id,),
+        )
+        row = await cursor.fetchone()
+        if row is None:
+            return [], []
+        enable_reminders, reminder_hours, reminder_offsets, enable_overdue = row
+        offsets = (
+            json.dumps(deadline_offsets(reminder_offsets, reminder_hours))
+            if enable_reminders
+            else "[]"
+        )
+        overdue_types = "('overdue_immediate', 'overdue_repeat')"
+        now = now_ts()
+
+        cursor = await db.execute(
+            f"""
+            DELETE FROM task_reminders
+            WHERE user_id = ? AND sent = 0 AND status != 'sending'
+            AND (
+                (reminder_type = 'deadline'
+                    AND (offset_minutes IS NULL
+                        OR offset_minutes NOT IN (SELECT value FROM json_each(?))))
+                OR (? = 0 AND reminder_type IN {overdue_types})
+            )
+            RETURNING id
+            """,
+            (user_id, offsets, enable_overdue or 0),
+        )
+        cancelled = [row[0] for row in await cursor.fetchall()]
+
+        cursor = await db.execute(
+            """
+            INSERT INTO task_reminders (
+                user_id, task_id, reminder_type, offset_minutes,
+                scheduled_time, scheduled_ts
+            )
+            SELECT
+                t.user_id, t.id, 'deadline', o.value,
+                datetime(t.due_ts - o.value * 60, 'unixepoch', 'localtime'),
+                t.due_ts - o.value * 60
+            FROM tasks t
+            JOIN json_each(?) o
+            WHERE t.user_id = ?
+            AND t.status = 'pending'
+            AND t.is_deleted = 0
+            AND t.due_ts - o.value * 60 > ?
+            AND NOT EXISTS (
+                SELECT 1 FROM task_reminders tr
+                WHERE tr.task_id = t.id
+                AND tr.reminder_type = 'deadline'
+                AND tr.offset_minutes = o.value
+                AND tr.sent = 0
+            )
+            RETURNING id, task_id, scheduled_ts
+            """,
+            (offsets, user_id, now),
+        )
+        scheduled = await cursor.fetchall()
+
+        if enable_overdue:
+            # Просроченным задачам, о которых уже напоминали, повторно не пишем
+            cursor = await db.execute(
+                """
+                INSERT INTO task_reminders (
+                    user_id, task_id, reminder_type, scheduled_time, scheduled_ts
+                )
+                SELECT
+                    t.user_id, t.id, 'overdue_immediate',
+                    datetime(MAX(t.due_ts, ?), 'unixepoch', 'localtime'),
+                    MAX(t.due_ts, ?)
+                FROM tasks t
+                WHERE t.user_id = ?
+                AND t.status = 'pending'
+                AND t.is_deleted = 0
+                AND t.due_ts IS NOT NULL
+                AND NOT EXISTS (
+                    SELECT 1 FROM task_reminders tr
+                    WHERE tr.task_id = t.id
+                    AND tr.reminder_type = 'overdue_immediate'
+                    AND (tr.sent = 0 OR t.due_ts <= ?)
+                )
+                RETURNING id, task_id, scheduled_ts
+                """,
+                (now, now, user_id, now),
+            )
+            scheduled += await cursor.fetchall()
+
+        return scheduled, cancelled
 
     async def create_task_reminder(
         self, user_id: int, task_id: int, reminder_type: str, scheduled_time: datetime
     ):
         """Создает напоминание для задачи"""
-        async with aiosqlite.connect(self.db_path) as db:
-
-            try:
-                if reminder_type == "overdue_immediate":
-                    actual_scheduled_time = datetime.now() - timedelta(minutes=1)
-                else:
-                    actual_scheduled_time = scheduled_time
+        actual_scheduled_time = scheduled_time or get_clock().now()
 
-                scheduled_time_str = actual_scheduled_time.strftime("%Y-%m-%d %H:%M:%S")
+        scheduled_time_str = actual_scheduled_time.strftime("%Y-%m-%d %H:%M:%S")
 
-                cursor = await db.execute(
-                    "INSERT INTO task_reminders (user_id, task_id, reminder_type, scheduled_time) VALUES (?, ?, ?, ?)",
-                    (
-                        user_id,
-                        task_id,
-                        reminder_type,
-                        scheduled_time_str,
-                    ),
-                )
-                await db.commit()
-                reminder_id = cursor.lastrowid
-                return reminder_id
-            except Exception as e:
-                print(f"❌ [CREATE_REMINDER] Ошибка при создании напоминания: {e}")
-                return None
+        async def _write(db):
+            cursor = await db.execute(
+                "INSERT INTO task_reminders (user_id, task_id, reminder_type, scheduled_time, scheduled_ts) VALUES (?, ?, ?, ?, ?)",
+                (
+                    user_id,
+                    task_id,
+                    reminder_type,
+                    scheduled_time_str,
+                    to_ts(actual_scheduled_time),
+                ),
+            )
+            return cursor.lastrowid
 
-    async def get_pending_reminders(self, limit: int = 100):
-        """Получает готовые к отправке напоминания"""
         try:
+            return await self.writer.submit(_write)
+        except Exception as e:
+            print(f"❌ [CREATE_REMINDER] Ошибка при создании напоминания: {e}")
+            return None
+
+    async def get_reminder_schedule(self):
+        """Получает время срабатывания всех неотправленных напоминаний"""
+        async with self.pool.acquire() as db:
+            cursor = await db.execute(
+                """
+                SELECT id, task_id, CASE status
+                    WHEN 'sending' THEN claim_expires_ts
+                    ELSE COALESCE(next_attempt_ts, scheduled_ts)
+                END
+                FROM task_reminders
+                WHERE sent = 0 AND status IN ('pending', 'sending')
+                """
+            )
+            return await cursor.fetchall()
 
-            async with aiosqlite.connect(self.db_path) as db:
+    async def _claimed_reminder_rows(self, db, claimed_ids: list) -> list:
+        """Читает захваченные напоминания вместе с полями задачи"""
+        if not claimed_ids:
+            return []
+        placeholders = ", ".join("?" * len(claimed_ids))
+        cursor = await db.execute(
+            f"""
+            SELECT 
+                tr.id, tr.user_id, tr.task_id, tr.reminder_type, 
+                tr.scheduled_time, tr.sent, tr.created_at, tr.sent_at,
+                t.content, t.due_ts, t.priority, tr.attempts, tr.scheduled_ts
+            FROM task_reminders tr
+            JOIN tasks t ON tr.task_id = t.id
+            WHERE tr.id IN ({placeholders})
+            ORDER BY tr.scheduled_ts ASC
+            """,
+            claimed_ids,
+        )
+        return await cursor.fetchall()
+
+    async def claim_reminders(self, reminder_ids, owner: str, timeout: int):
+        """Атомарно забирает напоминания в отправку и возвращает захваченные"""
+        reminder_ids = list(reminder_ids)
+        now = now_ts()
+
+        async def _write(db):
+            rows = []
+            for start in range(0, len(reminder_ids), SQL_VARIABLES_CHUNK):
+                chunk = reminder_ids[start : start + SQL_VARIABLES_CHUNK]
+                placeholders = ", ".join("?" * len(chunk))
+                # Напоминания выполненных и удаленных задач снимаются, а не отправляются
+                await db.execute(
+                    f"""
+                    DELETE FROM task_reminders
+                    WHERE id IN ({placeholders}) AND sent = 0
+                    AND task_id IN (
+                        SELECT id FROM tasks
+                        WHERE status != 'pending' OR is_deleted = 1
+                    )
+                    """,
+                    chunk,
+                )
+                # Захват просроченных чужих заявок подбирает отправки упавших воркеров;
+                # перенесенное на будущее напоминание не уходит по старому времени
                 cursor = await db.execute(
-                    "SELECT datetime('now'), datetime('now', 'localtime')"
+                    f"""
+                    UPDATE task_reminders SET
+                        status = 'sending', claimed_by = ?, claim_expires_ts = ?
+                    WHERE id IN ({placeholders})
+                    AND sent = 0
+                    AND (
+                        (
+                            status = 'pending'
+                            AND COALESCE(next_attempt_ts, scheduled_ts) <= ?
+                        )
+                        OR (status = 'sending' AND claim_expires_ts <= ?)
+                    )
+                    AND task_id IN (
+                        SELECT id FROM tasks WHERE status = 'pending' AND is_deleted = 0
+                    )
+                    RETURNING id
+                    """,
+                    [owner, now + timeout, *chunk, now, now],
                 )
-                times = await cursor.fetchone()
-                current_utc, current_local = times
+                claimed = [row[0] for row in await cursor.fetchall()]
+                rows.extend(await self._claimed_reminder_rows(db, claimed))
+            return rows
+
+        return rows_with_datetimes(await self.writer.submit(_write), 9)
+
+    async def sync_task_reminders(
+        self, user_id: int, task_id: int, desired, types, once_types=()
+    ):
+        """Сверяет неотправленные напоминания задачи типов types с набором desired"""
+        wanted = {}
+        for reminder_type, offset_minutes, scheduled_time in desired:
+            wanted[(reminder_type, offset_minutes)] = scheduled_time
+        types = list(types)
+
+        async def _write(db):
+            placeholders = ", ".join("?" * len(types))
+            if once_types:
+                # Напоминания типов once_types не создаются повторно после отправки
+                once_placeholders = ", ".join("?" * len(once_types))
                 cursor = await db.execute(
-                    """
-                    SELECT 
-                        tr.id, tr.user_id, tr.task_id, tr.reminder_type, 
-                        tr.scheduled_time, tr.sent, tr.created_at, tr.sent_at,
-                        t.content, t.due_date, t.priority
-                    FROM task_reminders tr
-                    JOIN tasks t ON tr.task_id = t.id
-                    WHERE tr.sent = 0
-                    AND datetime(tr.scheduled_time) <= datetime('now', 'localtime')
-                    ORDER BY tr.scheduled_time ASC
-                    LIMIT ?
+                    f"""
+                    SELECT DISTINCT reminder_type FROM task_reminders
+                    WHERE task_id = ? AND sent = 1
+                    AND reminder_type IN ({once_placeholders})
                     """,
-                    (limit,),
+                    [task_id, *once_types],
                 )
-                found_reminders = await cursor.fetchall()
+                for (reminder_type,) in await cursor.fetchall():
+                    for key in [key for key in wanted if key[0] == reminder_type]:
+                        del wanted[key]
+
+            cursor = await db.execute(
+                f"""
+                SELECT id, reminder_type, offset_minutes, scheduled_ts, status
+                FROM task_reminders
+                WHERE task_id = ? AND sent = 0 AND reminder_type IN ({placeholders})
+                ORDER BY id
+                """,
+                [task_id, *types],
+            )
+
+            existing = await cursor.fetchall()
+            kept, moved, removed = set(), [], []
+            for (
+                reminder_id,
+                reminder_type,
+                offset_minutes,
+                scheduled_ts,
+                status,
+            ) in existing:
+                key = (reminder_type, offset_minutes)
+                if key not in wanted or key in kept:
+                    removed.append((reminder_id,))
+                    continue
+                kept.add(key)
+                new_ts = to_ts(wanted[key])
+                # Отправляемые сейчас напоминания не трогаем
+                if status != "sending" and new_ts != scheduled_ts:
+                    moved.append(
+                        (
+                            wanted[key].strftime("%Y-%m-%d %H:%M:%S"),
+                            new_ts,
+                            reminder_id,
+                        )
+                    )
 
-                for rem in found_reminders:
+            await db.executemany("DELETE FROM task_reminders WHERE id = ?", removed)
+            await db.executemany(
+                """
+                UPDATE task_reminders SET
+                    scheduled_time = ?, scheduled_ts = ?, next_attempt_ts = NULL,
+                    attempts = 0, last_error = NULL, status = 'pending'
+                WHERE id = ?
+                """,
+                moved,
+            )
+            await db.executemany(
+                """
+                INSERT INTO task_reminders (
+                    user_id, task_id, reminder_type, offset_minutes,
+                    scheduled_time, scheduled_ts
+                ) VALUES (?, ?, ?, ?, ?, ?)
+                """,
+                [
                     (
-                        reminder_id,
                         user_id,
                         task_id,
                         reminder_type,
-                        scheduled_time,
-                        sent,
-                        created_at,
-                        sent_at,
-                        content,
-                        due_date,
-                        priority,
-                    ) = rem
-
-                    cursor_check = await db.execute(
-                        "SELECT ? <= datetime('now') as is_due_utc",
-                        (scheduled_time,),
+                        offset_minutes,
+                        scheduled_time.strftime("%Y-%m-%d %H:%M:%S"),
+                        to_ts(scheduled_time),
                     )
-                    is_due_utc = (await cursor_check.fetchone())[0]
+                    for (
+                        reminder_type,
+                        offset_minutes,
+                    ), scheduled_time in wanted.items()
+                    if (reminder_type, offset_minutes) not in kept
+                ],
+            )
 
-                return found_reminders
+            cursor = await db.execute(
+                f"""
+                SELECT id, scheduled_ts FROM task_reminders
+                WHERE task_id = ? AND sent = 0 AND status = 'pending'
+                AND reminder_type IN ({placeholders})
+                """,
+                [task_id, *types],
+            )
+            # Возвращаются только перенесенные и новые напоминания и id удаленных
+            unchanged = {row[0] for row in existing} - {row[2] for row in moved}
+            changed = [
+                row for row in await cursor.fetchall() if row[0] not in unchanged
+            ]
+            return changed, [row[0] for row in removed]
 
-        except Exception as e:
-            print(f"❌ Ошибка в get_pending_reminders: {e}")
-            import traceback
+        return await self.writer.submit(_write)
 
-            traceback.print_exc()
-            return []
+    async def claim_upcoming_reminders(
+        self, user_ids, until_ts: int, owner: str, timeout: int
+    ):
+        """Забирает в отправку напоминания пользователей, наступающие до until_ts"""
+        # О просрочке раньше срока задачи не сообщаем: иначе цепочка повторов не начнется
+        user_ids = list(user_ids)
+        now = now_ts()
+
+        async def _write(db):
+            rows = []
+            for start in range(0, len(user_ids), SQL_VARIABLES_CHUNK):
+                chunk = user_ids[start : start + SQL_VARIABLES_CHUNK]
+                placeholders = ", ".join("?" * len(chunk))
+                cursor = await db.execute(
+                    f"""
+                    UPDATE task_reminders SET
+                        status = 'sending', claimed_by = ?, claim_expires_ts = ?
+                    WHERE user_id IN ({placeholders})
+                    AND sent = 0
+                    AND status = 'pending'
+                    AND COALESCE(next_attempt_ts, scheduled_ts) <= ?
+                    AND task_id IN (
+                        SELECT id FROM tasks WHERE status = 'pending' AND is_deleted = 0
+                        AND (task_reminders.reminder_type = 'deadline' OR due_ts <= ?)
+                    )
+                    RETURNING id
+                    """,
+                    [owner, now + timeout, *chunk, until_ts, now],
+                )
+                claimed = [row[0] for row in await cursor.fetchall()]
+                rows.extend(await self._claimed_reminder_rows(db, claimed))
+            return rows
+
+        return rows_with_datetimes(await self.writer.submit(_write), 9)
+
+    async def delete_unsent_task_reminders(self, task_id: int):
+        """Удаляет неотправленные напоминания задачи и возвращает их id"""
+
+        async def _write(db):
+            cursor = await db.execute(
+                "DELETE FROM task_reminders WHERE task_id = ? AND sent = 0 RETURNING id",
+                (task_id,),
+            )
+            return [row[0] for row in await cursor.fetchall()]
+
+        return await self.writer.submit(_write)
 
     async def mark_reminder_sent(self, reminder_id: int):
         """Отмечает напоминание как отправленное"""
-        async with aiosqlite.connect(self.db_path) as db:
+        await self.mark_reminders_sent([reminder_id])
+
+    async def mark_reminders_sent(self, reminder_ids):
+        """Отмечает напоминания как отправленные"""
+        reminder_ids = list(reminder_ids)
+        sent_at = utc_timestamp(now_ts())
+
+        async def _write(db):
+            for start in range(0, len(reminder_ids), SQL_VARIABLES_CHUNK):
+                chunk = reminder_ids[start : start + SQL_VARIABLES_CHUNK]
+                placeholders = ", ".join("?" * len(chunk))
+                await db.execute(
+                    f"UPDATE task_reminders SET sent = 1, sent_at = ?, status = 'sent', claimed_by = NULL WHERE id IN ({placeholders})",
+                    [sent_at, *chunk],
+                )
+
+        await self.writer.submit(_write)
+
+    async def create_overdue_repeats(self, reminder_ids, after_ts: int):
+        """Создает следующий повтор для доставленных напоминаний о просрочке"""
+        reminder_ids = list(reminder_ids)
+
+        async def _write(db):
+            rows = []
+            for start in range(0, len(reminder_ids), SQL_VARIABLES_CHUNK):
+                chunk = reminder_ids[start : start + SQL_VARIABLES_CHUNK]
+                placeholders = ", ".join("?" * len(chunk))
+                # Материализуется только ближайший повтор: следующий создаст его отправка
+                cursor = await db.execute(
+                    f"""
+                    INSERT INTO task_reminders (
+                        user_id, task_id, reminder_type, scheduled_time, scheduled_ts
+                    )
+                    SELECT
+                        tr.user_id, tr.task_id, 'overdue_repeat',
+                        datetime(? + rs.overdue_reminder_interval_hours * 3600,
+                                 'unixepoch', 'localtime'),
+                        ? + rs.overdue_reminder_interval_hours * 3600
+                    FROM task_reminders tr
+                    JOIN tasks t ON t.id = tr.task_id
+                    JOIN reminder_settings rs ON rs.user_id = tr.user_id
+                    WHERE tr.id IN ({placeholders})
+                    AND tr.reminder_type IN ('overdue_immediate', 'overdue_repeat')
+                    AND t.status = 'pending'
+                    AND t.is_deleted = 0
+                    AND t.due_ts <= ?
+                    AND rs.enable_overdue_reminders = 1
+                    AND rs.overdue_reminder_interval_hours > 0
+                    AND NOT EXISTS (
+                        SELECT 1 FROM task_reminders queued
+                        WHERE queued.task_id = tr.task_id
+                        AND queued.reminder_type = 'overdue_repeat'
+                        AND queued.sent = 0
+                    )
+                    RETURNING id, task_id, scheduled_ts
+                    """,
+                    [after_ts, after_ts, *chunk, after_ts],
+                )
+                rows.extend(await cursor.fetchall())
+            return rows
+
+        return await self.writer.submit(_write)
+
+    async def record_reminder_failure(
+        self, reminder_id: int, error: str, next_attempt_ts: int = None
+    ):
+        """Сохраняет неудачную попытку; без времени повтора напоминание уходит в dead-letter"""
+
+        async def _write(db):
             await db.execute(
-                "UPDATE task_reminders SET sent = 1, sent_at = CURRENT_TIMESTAMP WHERE id = ?",
-                (reminder_id,),
+                """
+                UPDATE task_reminders SET
+                    attempts = attempts + 1,
+                    last_error = ?,
+                    next_attempt_ts = ?,
+                    status = CASE WHEN ? IS NULL THEN 'dead' ELSE 'pending' END,
+                    claimed_by = NULL
+                WHERE id = ? AND sent = 0
+                """,
+                (error[:500], next_attempt_ts, next_attempt_ts, reminder_id),
+            )
+
+        await self.writer.submit(_write)
+
+    async def get_dead_reminders(self, limit: int = 20):
+        """Получает напоминания, исчерпавшие попытки отправки"""
+        async with self.pool.acquire() as db:
+            cursor = await db.execute(
+                """
+                SELECT COUNT(*), COUNT(DISTINCT user_id)
+                FROM task_reminders WHERE status = 'dead'
+                """
+            )
+            total, users = await cursor.fetchone()
+            cursor = await db.execute(
+                """
+                SELECT id, user_id, task_id, reminder_type, attempts, last_error
+                FROM task_reminders
+                WHERE status = 'dead'
+                ORDER BY id DESC
+                LIMIT ?
+                """,
+                (limit,),
             )
-            await db.commit()
+            return {
+                "total": total,
+                "users": users,
+                "items": await cursor.fetchall(),
+            }
+
+    async def requeue_dead_reminders(self, reminder_ids=None):
+        """Возвращает dead-letter напоминания в очередь; без id возвращает все"""
+        retry_ts = now_ts()
+
+        async def _write(db):
+            query = """
+                UPDATE task_reminders SET
+                    status = 'pending', attempts = 0,
+                    next_attempt_ts = ?, last_error = NULL
+                WHERE status = 'dead'
+            """
+            if reminder_ids is None:
+                cursor = await db.execute(
+                    query + " RETURNING id, task_id, next_attempt_ts", (retry_ts,)
+                )
+                return await cursor.fetchall()
+
+            rows = []
+            ids = list(reminder_ids)
+            for start in range(0, len(ids), SQL_VARIABLES_CHUNK):
+                chunk = ids[start : start + SQL_VARIABLES_CHUNK]
+                placeholders = ", ".join("?" * len(chunk))
+                cursor = await db.execute(
+                    query
+                    + f" AND id IN ({placeholders}) RETURNING id, task_id, next_attempt_ts",
+                    [retry_ts, *chunk],
+                )
+                rows.extend(await cursor.fetchall())
+            return rows
+
+        return await self.writer.submit(_write)
 
     async def get_tasks_needing_reminders(self):
         """Получает задачи, для которых нужно создать напоминания о дедлайнах"""
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self.pool.acquire() as db:
             cursor = await db.execute(
                 """
                 SELECT 
-                    t.id, t.user_id, t.content, t.due_date, t.priority, t.status,
-                    t.created_at, t.completed_at, t.is_deleted,
+                    t.id, t.user_id, t.content, t.due_ts, t.priority, t.status,
+                    t.created_ts, t.completed_ts, t.is_deleted,
                     rs.enable_reminders, 
                     COALESCE(rs.reminder_before_hours, 1) as reminder_before_hours,  -- Исправлено на 1
                     rs.enable_overdue_reminders
@@ -842,8 +1830,7 @@ class Database:
                 JOIN reminder_settings rs ON u.id = rs.user_id
                 WHERE t.status = 'pending'
                 AND t.is_deleted = 0
-                AND t.due_date IS NOT NULL
-                AND t.due_date > datetime('now')
+                AND t.due_ts > ?
                 AND NOT EXISTS (
                     SELECT 1 FROM task_reminders tr 
                     WHERE tr.task_id = t.id 
@@ -851,14 +1838,15 @@ class Database:
                     AND tr.sent = 0
                 )
                 AND rs.enable_reminders = 1
-                ORDER BY t.due_date ASC
-                """
+                ORDER BY t.due_ts ASC
+                """,
+                (now_ts(),),
             )
-            return await cursor.fetchall()
+            return rows_with_datetimes(await cursor.fetchall(), 3, 6, 7)
 
     async def get_active_reminder_for_task(self, task_id: int, reminder_type: str):
         """Проверяет есть ли активное напоминание для задачи"""
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self.pool.acquire() as db:
             cursor = await db.execute(
                 "SELECT id FROM task_reminders WHERE task_id = ? AND reminder_type = ? AND sent = 0",
                 (task_id, reminder_type),
@@ -867,7 +1855,7 @@ class Database:
 
     async def get_overdue_tasks_stats(self, user_id: int):
         """Получает статистику по просроченным задачам"""
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self.pool.acquire() as db:
             cursor = await db.execute(
                 """
                 SELECT COUNT(*) 
@@ -875,10 +1863,9 @@ class Database:
                 WHERE user_id = ? 
                 AND status = 'pending'
                 AND is_deleted = 0
-                AND due_date IS NOT NULL
-                AND due_date < datetime('now')
+                AND due_ts < ?
                 """,
-                (user_id,),
+                (user_id, now_ts()),
             )
             total_overdue = (await cursor.fetchone())[0]
 
@@ -889,11 +1876,10 @@ class Database:
                 WHERE user_id = ? 
                 AND status = 'pending'
                 AND is_deleted = 0
-                AND due_date IS NOT NULL
-                AND due_date < datetime('now')
+                AND due_ts < ?
                 GROUP BY priority
                 """,
-                (user_id,),
+                (user_id, now_ts()),
             )
             overdue_by_priority = await cursor.fetchall()
 
@@ -904,16 +1890,21 @@ class Database:
 
     async def update_last_overdue_notification(self, task_id: int):
         """Обновляет время последнего уведомления о просрочке"""
-        async with aiosqlite.connect(self.db_path) as conn:
+        notified_ts = now_ts()
+
+        async def _write(conn):
             await conn.execute(
-                "UPDATE tasks SET last_overdue_notification = datetime('now') WHERE id = ?",
-                (task_id,),
+                "UPDATE tasks SET last_overdue_notification = ?, last_overdue_ts = ? WHERE id = ?",
+                (utc_timestamp(notified_ts), notified_ts, task_id),
             )
-            await conn.commit()
+
+        await self.writer.submit(_write)
 
     async def update_reminder_settings_with_time(self, user_id: int, **settings):
         """Обновляет настройки напоминаний с временем уведомлений"""
-        async with aiosqlite.connect(self.db_path) as conn:
+        settings = with_daily_minute(settings)
+
+        async def _write(conn):
             set_clause = ", ".join([f"{key} = ?" for key in settings.keys()])
             values = list(settings.values())
             values.append(user_id)
@@ -922,13 +1913,15 @@ class Database:
                 f"UPDATE reminder_settings SET {set_clause}, updated_at = CURRENT_TIMESTAMP WHERE user_id = ?",
                 values,
             )
-            await conn.commit()
+            await self._refresh_next_digest(conn, user_id)
+
+        await self.writer.submit(_write)
 
     async def get_filtered_tasks(self, user_id: int, filters: dict) -> list:
         """Получает задачи по фильтрам через SQL"""
-        async with aiosqlite.connect(self.db_path) as db:
-            base_query = """
-                SELECT * FROM tasks 
+        async with self.pool.acquire() as db:
+            base_query = f"""
+                SELECT {task_columns()} FROM tasks 
                 WHERE user_id = ? 
                 AND is_deleted = 0
             """
@@ -956,37 +1949,40 @@ class Database:
                 params.extend([user_id, filters["tag"].lower()])
 
             if filters.get("date"):
-                today = datetime.now().date()
+                today = get_clock().now().date()
                 if filters["date"] == "today":
-                    base_query += " AND date(due_date) = date(?)"
-                    params.append(today.isoformat())
+                    base_query += " AND due_ts >= ? AND due_ts < ?"
+                    params.extend(day_bounds_ts(today))
                 elif filters["date"] == "tomorrow":
-                    base_query += " AND date(due_date) = date(?, '+1 day')"
-                    params.append(today.isoformat())
+                    base_query += " AND due_ts >= ? AND due_ts < ?"
+                    params.extend(day_bounds_ts(today + timedelta(days=1)))
                 elif filters["date"] == "week":
-                    base_query += (
-                        " AND date(due_date) BETWEEN date(?) AND date(?, '+7 days')"
-                    )
-                    params.extend([today.isoformat(), today.isoformat()])
+                    base_query += " AND due_ts >= ? AND due_ts < ?"
+                    params.append(day_bounds_ts(today)[0])
+                    params.append(day_bounds_ts(today + timedelta(days=7))[1])
+                elif filters["date"] == "month":
+                    base_query += " AND due_ts >= ? AND due_ts < ?"
+                    params.append(day_bounds_ts(today)[0])
+                    params.append(day_bounds_ts(today + timedelta(days=30))[1])
                 elif filters["date"] == "overdue":
-                    base_query += " AND due_date < datetime(?) AND status = 'pending'"
-                    params.append(datetime.now().isoformat())
+                    base_query += " AND due_ts < ? AND status = 'pending'"
+                    params.append(now_ts())
 
-            base_query += " ORDER BY due_date ASC"
+            base_query += " ORDER BY due_ts ASC"
 
             cursor = await db.execute(base_query, params)
-            return await cursor.fetchall()
+            return tasks_from_rows(await cursor.fetchall())
 
     async def get_tasks_grouped_by_priority_detailed(self, user_id: int) -> dict:
         """Получает задачи сгруппированные по приоритетам с деталями"""
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self.pool.acquire() as db:
             cursor = await db.execute(
                 """
                 SELECT 
                     priority,
                     COUNT(*) as total,
-                    SUM(CASE WHEN due_date < datetime('now') THEN 1 ELSE 0 END) as overdue,
-                    SUM(CASE WHEN due_date IS NULL THEN 1 ELSE 0 END) as no_date
+                    SUM(CASE WHEN due_ts < ? THEN 1 ELSE 0 END) as overdue,
+                    SUM(CASE WHEN due_ts IS NULL THEN 1 ELSE 0 END) as no_date
                 FROM tasks 
                 WHERE user_id = ? AND status = 'pending' AND is_deleted = 0
                 GROUP BY priority
@@ -998,96 +1994,81 @@ class Database:
                         ELSE 4
                     END
             """,
-                (user_id,),
+                (now_ts(), user_id),
             )
 
             return await cursor.fetchall()
 
     async def get_urgent_tasks(self, user_id: int) -> list:
         """Получает срочные задачи (сегодня + просроченные)"""
-        async with aiosqlite.connect(self.db_path) as db:
-            today_start = datetime.now().replace(
-                hour=0, minute=0, second=0, microsecond=0
-            )
-            today_end = datetime.now().replace(
-                hour=23, minute=59, second=59, microsecond=999999
-            )
+        async with self.pool.acquire() as db:
+            now = now_ts()
+            today_start, today_end = day_bounds_ts(get_clock().now().date())
 
             cursor = await db.execute(
-                """
-                SELECT * FROM tasks 
+                f"""
+                SELECT {task_columns()} FROM tasks 
                 WHERE user_id = ? 
                 AND status = 'pending'
                 AND is_deleted = 0
-                AND due_date IS NOT NULL
-                AND due_date >= ? 
-                AND due_date <= ?
-                ORDER BY due_date ASC
+                AND due_ts >= ? 
+                AND due_ts < ?
+                ORDER BY due_ts ASC
                 """,
-                (user_id, today_start.isoformat(), today_end.isoformat()),
+                (user_id, max(today_start, now), today_end),
             )
             today_tasks = await cursor.fetchall()
 
             cursor = await db.execute(
-                """
-                SELECT * FROM tasks 
+                f"""
+                SELECT {task_columns()} FROM tasks 
                 WHERE user_id = ? 
                 AND status = 'pending'
                 AND is_deleted = 0
-                AND due_date IS NOT NULL
-                AND due_date < ?
-                ORDER BY due_date ASC
+                AND due_ts < ?
+                ORDER BY due_ts ASC
                 """,
-                (datetime.now().isoformat(),),
+                (user_id, now),
             )
             overdue_tasks = await cursor.fetchall()
 
-            return today_tasks + overdue_tasks
+            return tasks_from_rows(today_tasks + overdue_tasks)
 
     async def get_today_tasks(self, user_id: int) -> list:
         """Получает задачи на сегодня"""
-        async with aiosqlite.connect(self.db_path) as db:
-            today_start = datetime.now().replace(
-                hour=0, minute=0, second=0, microsecond=0
-            )
-            today_end = datetime.now().replace(
-                hour=23, minute=59, second=59, microsecond=999999
-            )
+        async with self.pool.acquire() as db:
+            today_start, today_end = day_bounds_ts(get_clock().now().date())
 
             cursor = await db.execute(
-                """
-                SELECT * FROM tasks 
+                f"""
+                SELECT {task_columns()} FROM tasks 
                 WHERE user_id = ? 
                 AND status = 'pending'
                 AND is_deleted = 0
-                AND due_date IS NOT NULL
-                AND due_date >= ? 
-                AND due_date <= ?
-                ORDER BY due_date ASC
+                AND due_ts >= ? 
+                AND due_ts < ?
+                ORDER BY due_ts ASC
                 """,
-                (user_id, today_start.isoformat(), today_end.isoformat()),
+                (user_id, today_start, today_end),
             )
-            return await cursor.fetchall()
+            return tasks_from_rows(await cursor.fetchall())
 
     async def get_overdue_tasks(self, user_id: int) -> list:
         """Получает просроченные задачи"""
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self.pool.acquire() as db:
             try:
-                now = datetime.now().isoformat()
-
                 cursor = await db.execute(
-                    """
-                    SELECT * FROM tasks 
+                    f"""
+                    SELECT {task_columns()} FROM tasks 
                     WHERE user_id = ? 
                     AND status = 'pending'
                     AND is_deleted = 0
-                    AND due_date IS NOT NULL
-                    AND datetime(due_date) < datetime(?)
-                    ORDER BY due_date ASC
+                    AND due_ts < ?
+                    ORDER BY due_ts ASC
                     """,
-                    (user_id, now),
+                    (user_id, now_ts()),
                 )
-                return await cursor.fetchall()
+                return tasks_from_rows(await cursor.fetchall())
 
             except Exception as e:
                 print(f"❌ Ошибка в get_overdue_tasks: {e}")
@@ -1095,56 +2076,56 @@ class Database:
 
     async def get_upcoming_tasks(self, user_id: int, days: int = 7) -> list:
         """Получает ближайшие задачи на указанное количество дней"""
-        async with aiosqlite.connect(self.db_path) as db:
-            now = datetime.now()
+        async with self.pool.acquire() as db:
+            now = get_clock().now()
             period_end = now + timedelta(days=days)
 
             cursor = await db.execute(
-                """
-                SELECT * FROM tasks 
+                f"""
+                SELECT {task_columns()} FROM tasks 
                 WHERE user_id = ? 
                 AND status = 'pending'
                 AND is_deleted = 0
-                AND due_date IS NOT NULL
-                AND due_date >= ? 
-                AND due_date <= ?
-                ORDER BY due_date ASC
+                AND due_ts >= ? 
+                AND due_ts <= ?
+                ORDER BY due_ts ASC
                 """,
-                (user_id, now.isoformat(), period_end.isoformat()),
+                (user_id, to_ts(now), to_ts(period_end)),
             )
-            return await cursor.fetchall()
+            return tasks_from_rows(await cursor.fetchall())
 
     async def get_tasks_for_deadline_reminders(self):
         """Получает задачи для создания напоминаний о дедлайнах"""
-        async with aiosqlite.connect(self.db_path) as conn:
+        async with self.pool.acquire() as conn:
             cursor = await conn.execute(
                 """
                 SELECT 
-                    t.id, t.user_id, t.due_date, 
-                    COALESCE(rs.reminder_before_hours, 1) as reminder_hours
+                    t.id, t.user_id, t.due_ts, 
+                    COALESCE(rs.reminder_before_hours, 1) as reminder_hours,
+                    rs.reminder_offsets
                 FROM tasks t
                 LEFT JOIN reminder_settings rs ON t.user_id = rs.user_id
                 WHERE t.status = 'pending'
                 AND t.is_deleted = 0
-                AND t.due_date IS NOT NULL
-                AND t.due_date > datetime('now')
+                AND t.due_ts > ?
                 AND NOT EXISTS (
                     SELECT 1 FROM task_reminders tr 
                     WHERE tr.task_id = t.id 
                     AND tr.reminder_type = 'deadline'
                 )
                 AND (rs.enable_reminders = 1 OR rs.enable_reminders IS NULL)
-                """
+                """,
+                (now_ts(),),
             )
-            return await cursor.fetchall()
+            return rows_with_datetimes(await cursor.fetchall(), 2)
 
     async def get_overdue_tasks_for_debug(self):
         """Получает просроченные задачи для диагностики"""
-        async with aiosqlite.connect(self.db_path) as conn:
+        async with self.pool.acquire() as conn:
             cursor = await conn.execute(
                 """
                 SELECT 
-                    t.id, t.user_id, t.due_date, t.status, t.is_deleted,
+                    t.id, t.user_id, t.due_ts, t.status, t.is_deleted,
                     rs.enable_overdue_reminders,
                     EXISTS (
                         SELECT 1 FROM task_reminders tr 
@@ -1155,89 +2136,217 @@ class Database:
                 LEFT JOIN reminder_settings rs ON t.user_id = rs.user_id
                 WHERE t.status = 'pending'
                 AND t.is_deleted = 0
-                AND t.due_date IS NOT NULL
-                AND t.due_date < datetime('now')
-                ORDER BY t.due_date DESC
+                AND t.due_ts < ?
+                ORDER BY t.due_ts DESC
                 LIMIT 10
-                """
+                """,
+                (now_ts(),),
             )
-            return await cursor.fetchall()
+            return rows_with_datetimes(await cursor.fetchall(), 2)
 
     async def get_overdue_tasks_without_reminders(self):
         """Получает просроченные задачи без напоминаний"""
-        async with aiosqlite.connect(self.db_path) as conn:
+        async with self.pool.acquire() as conn:
             cursor = await conn.execute(
                 """
-                SELECT DISTINCT t.id, t.user_id, t.due_date
+                SELECT DISTINCT t.id, t.user_id, t.due_ts
                 FROM tasks t
                 LEFT JOIN reminder_settings rs ON t.user_id = rs.user_id
                 WHERE t.status = 'pending'
                 AND t.is_deleted = 0
-                AND t.due_date IS NOT NULL
-                AND t.due_date < datetime('now')
+                AND t.due_ts < ?
                 AND NOT EXISTS (
                     SELECT 1 FROM task_reminders tr 
                     WHERE tr.task_id = t.id 
                     AND tr.reminder_type = 'overdue_immediate'
                 )
                 AND (rs.enable_overdue_reminders = 1 OR rs.enable_overdue_reminders IS NULL)
-                """
+                """,
+                (now_ts(),),
             )
-            return await cursor.fetchall()
-
-    async def get_database_local_time(self):
-        """Получает локальное время базы данных"""
-        async with aiosqlite.connect(self.db_path) as conn:
-            cursor = await conn.execute("SELECT datetime('now', 'localtime')")
-            return (await cursor.fetchone())[0]
+            return rows_with_datetimes(await cursor.fetchall(), 2)
 
     async def get_new_overdue_tasks_for_reminders(self):
         """Получает новые просроченные задачи для создания напоминаний"""
-        async with aiosqlite.connect(self.db_path) as conn:
+        async with self.pool.acquire() as conn:
             cursor = await conn.execute(
                 """
                 SELECT DISTINCT
-                    t.id, t.user_id, t.content, t.due_date
+                    t.id, t.user_id, t.content, t.due_ts
                 FROM tasks t
                 LEFT JOIN reminder_settings rs ON t.user_id = rs.user_id
                 WHERE t.status = 'pending'
                 AND t.is_deleted = 0
-                AND t.due_date IS NOT NULL
-                AND datetime(t.due_date) < datetime('now', 'localtime')
+                AND t.due_ts < ?
                 AND NOT EXISTS (
                     SELECT 1 FROM task_reminders tr 
                     WHERE tr.task_id = t.id 
                     AND tr.reminder_type = 'overdue_immediate'
                 )
                 AND (rs.enable_overdue_reminders = 1 OR rs.enable_overdue_reminders IS NULL)
-                """
+                """,
+                (now_ts(),),
             )
-            return await cursor.fetchall()
+            return rows_with_datetimes(await cursor.fetchall(), 3)
 
-    async def get_users_for_daily_overdue_notifications(self):
-        """Получает пользователей и их настройки для ежедневных уведомлений"""
-        async with aiosqlite.connect(self.db_path) as conn:
+    async def iter_daily_overdue_digests(self, since_ts: int, until_ts: int):
+        """Потоком отдает (user_id, задачи) для сводок со временем в (since, until]"""
+        async with self.pool.acquire() as conn:
             cursor = await conn.execute(
                 """
                 SELECT 
-                    u.id, 
-                    COALESCE(rs.daily_overdue_time, '09:00') as notification_time,
-                    rs.enable_overdue_reminders
-                FROM users u
-                LEFT JOIN reminder_settings rs ON u.id = rs.user_id
-                WHERE rs.enable_overdue_reminders = 1 OR rs.enable_overdue_reminders IS NULL
+                    t.id, t.user_id, t.content, t.due_ts, t.priority,
+                    t.last_overdue_ts,
+                    rs.enable_overdue_reminders,
+                    u.first_name
+                FROM reminder_settings rs
+                JOIN users u ON u.id = rs.user_id
+                JOIN tasks t ON t.user_id = rs.user_id
+                WHERE rs.enable_overdue_reminders = 1
+                AND rs.next_digest_ts > ? AND rs.next_digest_ts <= ?
+                AND t.status = 'pending'
+                AND t.is_deleted = 0
+                AND t.due_ts < ?
+                AND (t.last_overdue_ts IS NULL OR t.last_overdue_ts < ?)
+                ORDER BY rs.user_id, t.due_ts
+                """,
+                (
+                    since_ts,
+                    until_ts,
+                    until_ts,
+                    until_ts - DIGEST_REPEAT_GUARD_SECONDS,
+                ),
+            )
+
+            user_id, tasks = None, []
+            while True:
+                rows = await cursor.fetchmany(SQL_VARIABLES_CHUNK)
+                if not rows:
+                    break
+                for row in rows_with_datetimes(rows, 3):
+                    if row[1] != user_id:
+                        if tasks:
+                            yield user_id, tasks
+                        user_id, tasks = row[1], []
+                    tasks.append(row)
+            if tasks:
+                yield user_id, tasks
+
+    async def advance_daily_digests(self, until_ts: int):
+        """Переносит наступившие сводки на следующий день в поясе каждого пользователя"""
+
+        async def _write(conn):
+            cursor = await conn.execute(
                 """
+                SELECT user_id, daily_minute, timezone FROM reminder_settings
+                WHERE enable_overdue_reminders = 1 AND next_digest_ts <= ?
+                """,
+                (until_ts,),
+            )
+            rows = await cursor.fetchall()
+            await conn.executemany(
+                "UPDATE reminder_settings SET next_digest_ts = ? WHERE user_id = ?",
+                [
+                    (next_daily_ts(daily_minute or 540, timezone, until_ts), user_id)
+                    for user_id, daily_minute, timezone in rows
+                ],
+            )
+            return len(rows)
+
+        return await self.writer.submit(_write)
+
+    async def mark_overdue_notified(self, task_ids):
+        """Отмечает, что о просроченных задачах сегодня уже напомнили"""
+        task_ids = list(task_ids)
+        notified_ts = now_ts()
+
+        async def _write(conn):
+            for start in range(0, len(task_ids), SQL_VARIABLES_CHUNK):
+                chunk = task_ids[start : start + SQL_VARIABLES_CHUNK]
+                placeholders = ", ".join("?" * len(chunk))
+                await conn.execute(
+                    f"UPDATE tasks SET last_overdue_notification = ?, last_overdue_ts = ? WHERE id IN ({placeholders})",
+                    [utc_timestamp(notified_ts), notified_ts, *chunk],
+                )
+
+        await self.writer.submit(_write)
+
+    async def get_worker_state(self, name: str):
+        """Получает сохраненное состояние фонового воркера"""
+        async with self.pool.acquire() as conn:
+            cursor = await conn.execute(
+                "SELECT value FROM worker_state WHERE name = ?", (name,)
             )
-            return await cursor.fetchall()
+            row = await cursor.fetchone()
+            return row[0] if row else None
+
+    async def set_worker_state(self, name: str, value: int):
+        """Сохраняет состояние фонового воркера"""
+
+        async def _write(conn):
+            await conn.execute(
+                """
+                INSERT INTO worker_state (name, value, updated_at)
+                VALUES (?, ?, CURRENT_TIMESTAMP)
+                ON CONFLICT(name) DO UPDATE SET
+                    value = excluded.value, updated_at = excluded.updated_at
+                """,
+                (name, value),
+            )
+
+        await self.writer.submit(_write)
+
+    async def try_acquire_lease(self, name: str, holder: str, ttl: int) -> bool:
+        """Берет или продлевает аренду, если она свободна, истекла или уже наша"""
+        now = now_ts()
+
+        async def _write(conn):
+            cursor = await conn.execute(
+                """
+                INSERT INTO leases (name, holder, expires_ts, heartbeat_ts, acquired_ts)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT(name) DO UPDATE SET
+                    acquired_ts = CASE WHEN leases.holder = excluded.holder
+                        THEN leases.acquired_ts ELSE excluded.acquired_ts END,
+                    holder = excluded.holder,
+                    expires_ts = excluded.expires_ts,
+                    heartbeat_ts = excluded.heartbeat_ts
+                WHERE leases.holder = excluded.holder OR leases.expires_ts <= ?
+                RETURNING holder
+                """,
+                (name, holder, now + ttl, now, now, now),
+            )
+            return await cursor.fetchone() is not None
+
+        return await self.writer.submit(_write)
+
+    async def release_lease(self, name: str, holder: str):
+        """Освобождает аренду, если ее держит holder"""
+
+        async def _write(conn):
+            await conn.execute(
+                "DELETE FROM leases WHERE name = ? AND holder = ?", (name, holder)
+            )
+
+        await self.writer.submit(_write)
+
+    async def get_lease(self, name: str):
+        """Получает текущего держателя аренды и время ее окончания"""
+        async with self.pool.acquire() as conn:
+            cursor = await conn.execute(
+                "SELECT holder, expires_ts, heartbeat_ts, acquired_ts FROM leases WHERE name = ?",
+                (name,),
+            )
+            return await cursor.fetchone()
 
     async def get_overdue_tasks_for_user_daily(self, user_id: int):
         """Получает просроченные задачи пользователя для ежедневного уведомления"""
-        async with aiosqlite.connect(self.db_path) as conn:
+        async with self.pool.acquire() as conn:
             cursor = await conn.execute(
                 """
                 SELECT 
-                    t.id, t.user_id, t.content, t.due_date, t.priority,
-                    t.last_overdue_notification,
+                    t.id, t.user_id, t.content, t.due_ts, t.priority,
+                    t.last_overdue_ts,
                     rs.enable_overdue_reminders,
                     u.first_name
                 FROM tasks t
@@ -1245,23 +2354,20 @@ class Database:
                 LEFT JOIN reminder_settings rs ON t.user_id = rs.user_id
                 WHERE t.status = 'pending' 
                 AND t.is_deleted = 0
-                AND t.due_date IS NOT NULL
-                AND t.due_date < datetime('now')
+                AND t.due_ts < ?
                 AND (rs.enable_overdue_reminders = 1 OR rs.enable_overdue_reminders IS NULL)
-                AND (
-                    t.last_overdue_notification IS NULL 
-                    OR date(t.last_overdue_notification) < date('now')
-                )
+                AND (t.last_overdue_ts IS NULL OR t.last_overdue_ts < ?)
                 AND t.user_id = ?
-                ORDER BY t.due_date ASC
+                ORDER BY t.due_ts ASC
                 """,
-                (user_id,),
+                (now_ts(), now_ts() - DIGEST_REPEAT_GUARD_SECONDS, user_id),
             )
-            return await cursor.fetchall()
+            return rows_with_datetimes(await cursor.fetchall(), 3)
 
     async def delete_task_reminders(self, task_id: int, reminder_type: str = None):
         """Удаляет напоминания для задачи"""
-        async with aiosqlite.connect(self.db_path) as db:
+
+        async def _write(db):
             if reminder_type:
                 result = await db.execute(
                     "DELETE FROM task_reminders WHERE task_id = ? AND reminder_type = ?",
@@ -1273,8 +2379,9 @@ class Database:
                     "DELETE FROM task_reminders WHERE task_id = ?", (task_id,)
                 )
                 deleted_count = result.rowcount
-            await db.commit()
             return deleted_count
 
+        return await self.writer.submit(_write)
+
 
 db = Database()
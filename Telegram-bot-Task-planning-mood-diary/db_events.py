@@ -0,0 +1,65 @@
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+TASK_CREATED = "created"
+TASK_RESCHEDULED = "rescheduled"
+TASK_COMPLETED = "completed"
+TASK_DELETED = "deleted"
+TASK_RESTORED = "restored"
+REMINDERS_CHANGED = "reminders_changed"
+
+
+class TaskEvent:
+    """Изменение задачи, уже зафиксированное в базе"""
+
+    def __init__(self, kind: str, task_id: int, user_id: int, due_date=None):
+        self.kind = kind
+        self.task_id = task_id
+        self.user_id = user_id
+        self.due_date = due_date
+
+    def __repr__(self):
+        return f"TaskEvent({self.kind}, task={self.task_id}, user={self.user_id})"
+
+
+class RemindersChangedEvent:
+    """Напоминания пользователя перестроены в базе после смены настроек"""
+
+    kind = REMINDERS_CHANGED
+
+    def __init__(self, user_id: int, scheduled, cancelled):
+        self.user_id = user_id
+        self.scheduled = scheduled
+        self.cancelled = cancelled
+
+    def __repr__(self):
+        return (
+            f"RemindersChangedEvent(user={self.user_id}, "
+            f"scheduled={len(self.scheduled)}, cancelled={len(self.cancelled)})"
+        )
+
+
+class EventBus:
+    """Рассылает события об изменениях задач подписчикам внутри процесса"""
+
+    def __init__(self):
+        self._subscribers = []
+
+    def subscribe(self) -> asyncio.Queue:
+        """Возвращает очередь, в которую будут приходить события"""
+        queue = asyncio.Queue()
+        self._subscribers.append(queue)
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        """Отписывает очередь от событий"""
+        if queue in self._subscribers:
+            self._subscribers.remove(queue)
+
+    def publish(self, event: TaskEvent):
+        """Кладет событие во все очереди подписчиков"""
+        for queue in self._subscribers:
+            queue.put_nowait(event)
+        logger.debug(f"Published {event}")
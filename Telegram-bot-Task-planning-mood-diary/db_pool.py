@@ -0,0 +1,166 @@
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
+
+import aiosqlite
+
+logger = logging.getLogger(__name__)
+
+
+class PoolTimeoutError(Exception):
+    """Не удалось получить соединение из пула за отведенное время"""
+
+
+class PoolClosedError(Exception):
+    """Пул соединений уже закрыт"""
+
+
+async def apply_pragmas(conn, pragmas) -> dict:
+    """Применяет PRAGMA к соединению и возвращает фактические значения"""
+    applied = {}
+    for name, value in (pragmas or {}).items():
+        cursor = await conn.execute(f"PRAGMA {name} = {value}")
+        row = await cursor.fetchone()
+        if row is None:
+            cursor = await conn.execute(f"PRAGMA {name}")
+            row = await cursor.fetchone()
+        applied[name] = row[0] if row else None
+    return applied
+
+
+class ConnectionPool:
+    """Ограниченный пул долгоживущих соединений aiosqlite"""
+
+    def __init__(
+        self,
+        db_path: str,
+        size: int = 5,
+        acquire_timeout: float = 10.0,
+        health_check_interval: float = 30.0,
+        pragmas: dict = None,
+    ):
+        self.db_path = db_path
+        self.size = max(1, size)
+        self.acquire_timeout = acquire_timeout
+        self.health_check_interval = health_check_interval
+        self.pragmas = pragmas or {}
+
+        self._idle = []
+        self._last_used = {}
+        self._all = set()
+        self._semaphore = None
+        self._closed = False
+        self._trace_callback = None
+
+    def _ensure_started(self):
+        if self._closed:
+            raise PoolClosedError("Пул соединений закрыт")
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.size)
+
+    async def _connect(self):
+        """Открывает новое соединение"""
+        conn = await aiosqlite.connect(self.db_path)
+        await apply_pragmas(conn, self.pragmas)
+        if self._trace_callback is not None:
+            await conn.set_trace_callback(self._trace_callback)
+        self._all.add(conn)
+        return conn
+
+    async def set_trace_callback(self, callback):
+        """Вызывает callback(sql) для каждой инструкции на всех соединениях пула"""
+        self._trace_callback = callback
+        for conn in list(self._all):
+            await conn.set_trace_callback(callback)
+
+    async def _discard(self, conn):
+        """Закрывает соединение и убирает его из пула"""
+        self._all.discard(conn)
+        self._last_used.pop(id(conn), None)
+        try:
+            await conn.close()
+        except Exception as e:
+            logger.warning(f"Error closing pooled connection: {e}")
+
+    async def _is_healthy(self, conn) -> bool:
+        """Проверяет соединение, которое долго простаивало"""
+        idle_for = time.monotonic() - self._last_used.get(id(conn), 0)
+        if idle_for < self.health_check_interval:
+            return True
+        try:
+            cursor = await conn.execute("SELECT 1")
+            await cursor.fetchone()
+            return True
+        except Exception as e:
+            logger.warning(f"Pooled connection failed health check: {e}")
+            return False
+
+    async def open(self):
+        """Заранее открывает все соединения пула"""
+        self._ensure_started()
+        while len(self._all) < self.size:
+            conn = await self._connect()
+            self._last_used[id(conn)] = time.monotonic()
+            self._idle.append(conn)
+        logger.info(
+            f"Connection pool opened: {self.size} connections to {self.db_path}"
+        )
+
+    @asynccontextmanager
+    async def acquire(self):
+        """Выдает соединение из пула на время блока async with"""
+        self._ensure_started()
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), self.acquire_timeout)
+        except asyncio.TimeoutError:
+            raise PoolTimeoutError(
+                f"Нет свободных соединений за {self.acquire_timeout} с"
+            ) from None
+
+        conn = None
+        try:
+            while self._idle:
+                candidate = self._idle.pop()
+                if await self._is_healthy(candidate):
+                    conn = candidate
+                    break
+                await self._discard(candidate)
+
+            if conn is None:
+                conn = await self._connect()
+
+            yield conn
+        finally:
+            if conn is not None:
+                await self._release(conn)
+            self._semaphore.release()
+
+    async def _release(self, conn):
+        """Возвращает соединение в пул, откатывая незавершенную транзакцию"""
+        if self._closed:
+            await self._discard(conn)
+            return
+
+        try:
+            if conn.in_transaction:
+                await conn.rollback()
+        except Exception as e:
+            logger.warning(f"Rollback on release failed, dropping connection: {e}")
+            await self._discard(conn)
+            return
+
+        self._last_used[id(conn)] = time.monotonic()
+        self._idle.append(conn)
+
+    async def close(self):
+        """Закрывает пул и все простаивающие соединения"""
+        if self._closed:
+            return
+        self._closed = True
+
+        idle, self._idle = self._idle, []
+        for conn in idle:
+            await self._discard(conn)
+
+        logger.info("Connection pool closed")
@@ -0,0 +1,150 @@
+import asyncio
+import logging
+
+import aiosqlite
+
+from db_pool import apply_pragmas
+
+logger = logging.getLogger(__name__)
+
+
+class WriterClosedError(Exception):
+    """Очередь записи уже остановлена"""
+
+
+class DatabaseWriter:
+    """Единственный писатель: выполняет все изменения пачками в одной транзакции"""
+
+    def __init__(
+        self,
+        db_path: str,
+        max_batch: int = 50,
+        max_delay: float = 0.005,
+        pragmas: dict = None,
+    ):
+        self.db_path = db_path
+        self.pragmas = pragmas or {}
+        self.max_batch = max(1, max_batch)
+        self.max_delay = max_delay
+
+        self._conn = None
+        self._queue = None
+        self._task = None
+        self._closed = False
+        self.applied_pragmas = {}
+
+    async def start(self):
+        """Открывает соединение писателя и запускает фоновую задачу"""
+        if self._task is not None:
+            return
+        self._conn = await aiosqlite.connect(self.db_path, isolation_level=None)
+        self.applied_pragmas = await apply_pragmas(self._conn, self.pragmas)
+        self._queue = asyncio.Queue()
+        self._task = asyncio.create_task(self._worker())
+        logger.info(
+            f"Database writer started: batch={self.max_batch}, delay={self.max_delay}s"
+        )
+
+    async def set_trace_callback(self, callback):
+        """Вызывает callback(sql) для каждой инструкции соединения писателя"""
+        await self._conn.set_trace_callback(callback)
+
+    async def submit(self, op):
+        """Ставит операцию op(conn) в очередь и ждет ее результата после коммита"""
+        if self._closed or self._queue is None:
+            raise WriterClosedError("Писатель базы данных не запущен")
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((op, future))
+        return await future
+
+    async def _collect_batch(self):
+        """Забирает из очереди первую операцию и все, что успело прийти следом"""
+        batch = [await self._queue.get()]
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.max_delay
+
+        while len(batch) < self.max_batch:
+            if not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+                continue
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+
+        return batch
+
+    async def _worker(self):
+        """Фоновая задача: выполняет пачки операций и коммитит их разом"""
+        while True:
+            batch = await self._collect_batch()
+
+            stop = any(op is None for op, _ in batch)
+            batch = [(op, future) for op, future in batch if op is not None]
+
+            if batch:
+                await self._run_batch(batch)
+
+            if stop:
+                break
+
+    async def _run_batch(self, batch):
+        """Выполняет пачку в одной транзакции, каждую операцию в своей точке сохранения"""
+        outcomes = []
+        try:
+            await self._conn.execute("BEGIN IMMEDIATE")
+
+            for op, future in batch:
+                await self._conn.execute("SAVEPOINT batch_op")
+                try:
+                    result = await op(self._conn)
+                except Exception as e:
+                    await self._conn.execute("ROLLBACK TO batch_op")
+                    await self._conn.execute("RELEASE batch_op")
+                    outcomes.append((future, None, e))
+                else:
+                    await self._conn.execute("RELEASE batch_op")
+                    outcomes.append((future, result, None))
+
+            await self._conn.execute("COMMIT")
+
+        except Exception as e:
+            logger.error(f"Database write batch failed: {e}")
+            try:
+                if self._conn.in_transaction:
+                    await self._conn.execute("ROLLBACK")
+            except Exception as rollback_error:
+                logger.error(f"Rollback of write batch failed: {rollback_error}")
+
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for future, result, error in outcomes:
+            if future.done():
+                continue
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+
+    async def close(self):
+        """Дописывает очередь и закрывает соединение писателя"""
+        if self._closed:
+            return
+        self._closed = True
+
+        if self._task is not None:
+            await self._queue.put((None, None))
+            await self._task
+            self._task = None
+
+        if self._conn is not None:
+            await self._conn.close()
+            self._conn = None
+
+        logger.info("Database writer stopped")
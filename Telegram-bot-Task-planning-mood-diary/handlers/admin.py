@@ -0,0 +1,107 @@
+from aiogram import Router
+from aiogram.types import Message
+from aiogram.filters import Command, CommandObject
+from pathlib import Path
+import html
+import sys
+
+current_dir = Path(__file__).parent
+project_root = current_dir.parent
+sys.path.insert(0, str(project_root))
+
+from config import Config
+from database import db
+from metrics import metrics
+
+router = Router()
+
+
+def is_admin(message: Message) -> bool:
+    """Проверяет, что команду отправил администратор бота"""
+    return message.from_user.id in Config.ADMIN_IDS
+
+
+@router.message(Command("dead_reminders"))
+async def cmd_dead_reminders(message: Message):
+    """Показывает напоминания, которые не удалось доставить"""
+    if not is_admin(message):
+        return
+
+    dead = await db.get_dead_reminders()
+    if not dead["total"]:
+        await message.answer("✅ Недоставленных напоминаний нет")
+        return
+
+    lines = [
+        f"☠️ <b>Недоставленные напоминания: {dead['total']}</b>",
+        f"👥 Пользователей: {dead['users']}\n",
+    ]
+    for reminder_id, user_id, task_id, reminder_type, attempts, last_error in dead[
+        "items"
+    ]:
+        lines.append(
+            f"• #{reminder_id} ({reminder_type}) пользователь {user_id}, "
+            f"задача {task_id}, попыток {attempts}\n"
+            f"  <i>{html.escape(last_error or '')[:200]}</i>"
+        )
+    lines.append("\n/requeue_reminders [id ...] — вернуть в очередь (без id — все)")
+
+    await message.answer("\n".join(lines), parse_mode="HTML")
+
+
+@router.message(Command("metrics"))
+async def cmd_metrics(message: Message):
+    """Показывает метрики доставки напоминаний этого процесса"""
+    if not is_admin(message):
+        return
+
+    lag = metrics.histogram("reminder_delivery_lag_seconds", type="deadline")
+    await message.answer(
+        f"📈 <b>Метрики процесса</b>\n"
+        f"Дедлайны доставлены за 5 с: {lag.share_below(5) * 100:.2f}%\n\n"
+        f"<pre>{html.escape(metrics.render()[:3500])}</pre>",
+        parse_mode="HTML",
+    )
+
+
+@router.message(Command("requeue_reminders"))
+async def cmd_requeue_reminders(message: Message, command: CommandObject):
+    """Возвращает недоставленные напоминания в очередь отправки"""
+    if not is_admin(message):
+        return
+
+    reminder_ids = None
+    if command.args:
+        try:
+            reminder_ids = [int(value) for value in command.args.split()]
+        except ValueError:
+            await message.answer("❌ Укажите id напоминаний числами через пробел")
+            return
+
+    from reminders import reminder_manager
+
+    if reminder_manager:
+        requeued = await reminder_manager.requeue_dead_reminders(reminder_ids)
+    else:
+        requeued = len(await db.requeue_dead_reminders(reminder_ids))
+
+    await message.answer(f"🔁 Возвращено в очередь: {requeued}")
+
+
+@router.message(Command("backfill_stats"))
+async def cmd_backfill_stats(message: Message, command: CommandObject):
+    """Пересчитывает дневные агрегаты аналитики по сохранившимся данным"""
+    if not is_admin(message):
+        return
+
+    user_id = None
+    if command.args:
+        try:
+            user_id = int(command.args.strip())
+        except ValueError:
+            await message.answer("❌ Укажите id пользователя числом")
+            return
+
+    days = await db.backfill_daily_stats(user_id)
+    target = f"пользователя {user_id}" if user_id else "всех пользователей"
+    await message.answer(f"📊 Агрегаты {target} пересчитаны, дней в статистике: {days}")
@@ -204,6 +204,7 @@ async def help_tasks(message: Message):
         "✏️ <b>Редактировать задачу</b>\n"
         "🗑️ <b>Удалить задачу</b>\n"
         "🔄 <b>Восстановить задачу</b>\n"
+        "🔁 <b>/repeat ID правило</b> - повторяющаяся задача (ежедневно, пн ср пт, 15 числа)\n"
         "\n"
         "<b>МОЩНЫЙ ПРОСМОТР, ФИЛЬТРАЦИЯ и ГРУППИРОВКА:</b>\n\n"
         "\n"
@@ -15,7 +15,13 @@ current_dir = Path(__file__).parent
 project_root = current_dir.parent
 sys.path.insert(0, str(project_root))
 
-from database import db
+from database import db, deadline_offsets
+from timeutils import (
+    format_reminder_offsets,
+    local_now,
+    normalize_timezone,
+    parse_reminder_offsets,
+)
 from keyboards import (
     get_main_keyboard,
     get_cancel_keyboard,
@@ -28,15 +34,22 @@ from keyboards import (
 router = Router()
 
 
+def offsets_text(settings) -> str:
+    """Отступы напоминаний о дедлайне из настроек в читаемом виде"""
+    return format_reminder_offsets(deadline_offsets(settings[11], settings[2]))
+
+
 class ReminderSettings(StatesGroup):
     waiting_for_settings_choice = State()
     waiting_for_reminders_setting = State()
     waiting_for_overdue_setting = State()
     waiting_for_reminder_hours = State()
+    waiting_for_overdue_interval = State()
 
 
 class DailyReminderSettings(StatesGroup):
     waiting_for_daily_time = State()
+    waiting_for_timezone = State()
 
 
 @router.message(F.text == "🔔 Уведомления")
@@ -61,7 +74,7 @@ async def cmd_reminders(message: Message, state: FSMContext = None):
     settings_text = (
         "🔔 <b>Управление напоминаниями</b>\n\n"
         f"✅ Напоминания о дедлайнах: {'ВКЛ' if settings[1] else 'ВЫКЛ'}\n"
-        f"⏰ Часов до дедлайна: {settings[2]}\n"
+        f"⏰ До дедлайна: {offsets_text(settings)}\n"
         f"⚠️ Напоминания о просрочке: {'ВКЛ' if settings[3] else 'ВЫКЛ'}\n\n"
         "Выберите действие:"
     )
@@ -81,7 +94,7 @@ async def handle_reminder_settings_button(message: Message, state: FSMContext):
         f"Текущий статус:\n"
         f"• Напоминания: {'✅ ВКЛ' if settings[1] else '🔇 ВЫКЛ'}\n"
         f"• Просрочка: {'⚠️ ВКЛ' if settings[3] else '🔕 ВЫКЛ'}\n"
-        f"• Часов до дедлайна: {settings[2]}\n\n"
+        f"• До дедлайна: {offsets_text(settings)}\n\n"
         "Выберите настройку для изменения:"
     )
 
@@ -202,40 +215,61 @@ async def handle_overdue_off_button(message: Message):
 async def handle_change_time_button(message: Message, state: FSMContext):
     """Обработка кнопки изменения времени напоминаний"""
     settings = await db.get_reminder_settings(message.from_user.id)
-    current_hours = settings[2]
 
     await message.answer(
         f"⏰ <b>Изменение времени напоминаний</b>\n\n"
-        f"Текущее значение: <b>{current_hours} часов</b> до дедлайна\n\n"
-        f"Введите новое количество часов (от 1 до 24):\n\n"
-        f"💡 <i>Рекомендуется устанавливать 1-3 часа для своевременных напоминаний</i>",
+        f"Сейчас напоминания приходят за: <b>{offsets_text(settings)}</b> до дедлайна\n\n"
+        f"Введите до 5 отступов через запятую, например <b>1д, 1ч, 10м</b>, "
+        f"или просто число часов:\n\n"
+        f"💡 <i>Максимальный отступ — 7 дней</i>",
         parse_mode="HTML",
         reply_markup=get_cancel_keyboard(),
     )
     await state.set_state(ReminderSettings.waiting_for_reminder_hours)
 
 
-@router.message(StateFilter(ReminderSettings.waiting_for_reminder_hours))
-async def process_reminder_hours(message: Message, state: FSMContext):
-    """Обработка ввода часов для напоминаний"""
+@router.message(F.text == "🔁 Повтор о просрочке")
+async def handle_overdue_interval_button(message: Message, state: FSMContext):
+    """Обработка кнопки интервала повторных напоминаний о просрочке"""
+    settings = await db.get_reminder_settings(message.from_user.id)
+    current_hours = settings[5]
+
+    await message.answer(
+        f"🔁 <b>Повторные напоминания о просрочке</b>\n\n"
+        f"Текущий интервал: <b>{current_hours or 0} ч</b>\n\n"
+        f"Введите, через сколько часов повторять напоминание (от 1 до 168), "
+        f"или 0, чтобы отключить повторы:",
+        parse_mode="HTML",
+        reply_markup=get_cancel_keyboard(),
+    )
+    await state.set_state(ReminderSettings.waiting_for_overdue_interval)
+
+
+@router.message(StateFilter(ReminderSettings.waiting_for_overdue_interval))
+async def process_overdue_interval(message: Message, state: FSMContext):
+    """Обработка ввода интервала повторных напоминаний о просрочке"""
     if await handle_navigation(message, state):
         return
     try:
         hours = int(message.text.strip())
 
-        if hours < 1 or hours > 24:
+        if hours < 0 or hours > 168:
             await message.answer(
-                "❌ Число должно быть от 1 до 24! Попробуйте снова:",
+                "❌ Число должно быть от 0 до 168! Попробуйте снова:",
                 reply_markup=get_cancel_keyboard(),
             )
             return
 
         await db.update_reminder_settings(
-            message.from_user.id, reminder_before_hours=hours
+            message.from_user.id, overdue_reminder_interval_hours=hours
+        )
+        result = (
+            f"Напоминание о просроченной задаче будет повторяться каждые <b>{hours} ч</b>."
+            if hours
+            else "Повторные напоминания о просрочке отключены."
         )
         await message.answer(
-            f"✅ <b>Время напоминаний обновлено!</b>\n\n"
-            f"Теперь напоминания будут приходить за <b>{hours} ч</b> до дедлайна.",
+            f"✅ <b>Интервал обновлен!</b>\n\n{result}",
             parse_mode="HTML",
             reply_markup=get_reminder_settings_keyboard(),
         )
@@ -243,11 +277,41 @@ async def process_reminder_hours(message: Message, state: FSMContext):
 
     except ValueError:
         await message.answer(
-            "❌ Неверный формат! Введите число от 1 до 24:",
+            "❌ Неверный формат! Введите число от 0 до 168:",
             reply_markup=get_cancel_keyboard(),
         )
 
 
+@router.message(StateFilter(ReminderSettings.waiting_for_reminder_hours))
+async def process_reminder_hours(message: Message, state: FSMContext):
+    """Обработка ввода отступов для напоминаний"""
+    if await handle_navigation(message, state):
+        return
+    offsets = parse_reminder_offsets(message.text)
+
+    if not offsets:
+        await message.answer(
+            "❌ Неверный формат! Введите до 5 отступов через запятую "
+            "(например, 1д, 1ч, 10м) не больше 7 дней:",
+            reply_markup=get_cancel_keyboard(),
+        )
+        return
+
+    await db.update_reminder_settings(
+        message.from_user.id,
+        reminder_offsets=",".join(map(str, offsets)),
+        reminder_before_hours=max(1, offsets[0] // 60),
+    )
+    await message.answer(
+        f"✅ <b>Время напоминаний обновлено!</b>\n\n"
+        f"Теперь напоминания будут приходить за "
+        f"<b>{format_reminder_offsets(offsets)}</b> до дедлайна.",
+        parse_mode="HTML",
+        reply_markup=get_reminder_settings_keyboard(),
+    )
+    await state.clear()
+
+
 @router.message(StateFilter(DailyReminderSettings.waiting_for_daily_time))
 async def process_daily_reminder_time(message: Message, state: FSMContext):
     """Обработка ввода времени ежедневных уведомлений"""
@@ -279,6 +343,52 @@ async def process_daily_reminder_time(message: Message, state: FSMContext):
         )
 
 
+@router.message(F.text.in_(["🌍 Пояс сводки", "🌍 Часовой пояс"]))
+@router.message(Command("timezone"))
+async def handle_timezone_button(message: Message, state: FSMContext):
+    """Обработка кнопки настройки часового пояса ежедневной сводки"""
+    settings = await db.get_reminder_settings(message.from_user.id)
+    timezone = local_now(settings[9]).tzinfo.zone
+
+    await message.answer(
+        f"🌍 <b>Часовой пояс ежедневной сводки</b>\n\n"
+        f"Текущий пояс: <b>{timezone}</b>\n\n"
+        f"Введите пояс в формате Europe/Moscow, Asia/Yekaterinburg или UTC+5:\n\n"
+        f"💡 <i>Пояс влияет только на время ежедневной сводки. "
+        f"Сроки задач и напоминания о дедлайнах считаются по времени бота</i>",
+        parse_mode="HTML",
+        reply_markup=get_cancel_keyboard(),
+    )
+    await state.set_state(DailyReminderSettings.waiting_for_timezone)
+
+
+@router.message(StateFilter(DailyReminderSettings.waiting_for_timezone))
+async def process_timezone(message: Message, state: FSMContext):
+    """Обработка ввода часового пояса ежедневной сводки"""
+    if await handle_navigation(message, state):
+        return
+    timezone = normalize_timezone(message.text)
+
+    if not timezone:
+        await message.answer(
+            "❌ Неизвестный часовой пояс!\n\n"
+            "Введите пояс в формате Europe/Moscow, Asia/Yekaterinburg или UTC+5:",
+            reply_markup=get_cancel_keyboard(),
+        )
+        return
+
+    await db.update_reminder_settings(message.from_user.id, timezone=timezone)
+
+    await message.answer(
+        f"✅ <b>Пояс ежедневной сводки установлен!</b>\n\n"
+        f"Пояс: <b>{timezone}</b>\n"
+        f"Местное время: <b>{local_now(timezone).strftime('%H:%M')}</b>",
+        parse_mode="HTML",
+        reply_markup=get_notifications_keyboard(),
+    )
+    await state.clear()
+
+
 @router.message(F.text == "🔙 Назад к уведомлениям")
 async def handle_back_to_notifications(message: Message):
     """Возврат к меню уведомлений"""
@@ -297,13 +407,16 @@ async def cmd_reminder_settings(message: Message):
     settings = await db.get_reminder_settings(message.from_user.id)
 
     daily_time = settings[4] if len(settings) > 4 else "09:00"
+    timezone = local_now(settings[9]).tzinfo.zone
 
     settings_text = (
         "🔔 <b>Текущие настройки напоминаний</b>\n\n"
         f"✅ Напоминания о дедлайнах: {'ВКЛ' if settings[1] else 'ВЫКЛ'}\n"
-        f"⏰ Часов до дедлайна: {settings[2]}\n"
+        f"⏰ До дедлайна: {offsets_text(settings)}\n"
         f"⚠️ Напоминания о просрочке: {'ВКЛ' if settings[3] else 'ВЫКЛ'}\n"
-        f"🌅 Время ежедневных уведомлений: <b>{daily_time}</b>\n\n"
+        f"🔁 Повтор о просрочке: {f'каждые {settings[5]} ч' if settings[5] else 'ВЫКЛ'}\n"
+        f"🌅 Время ежедневных уведомлений: <b>{daily_time}</b>\n"
+        f"🌍 Пояс ежедневной сводки: <b>{timezone}</b>\n\n"
         "Для изменения настроек используйте меню уведомлений:"
     )
 
@@ -7,8 +7,8 @@ from database import db
 from datetime import datetime, timedelta
 from collections import Counter
 import statistics
-import aiosqlite
 from handlers.common import handle_navigation
+from recurrence import describe_rule
 from aiogram.filters import Command, StateFilter
 
 
@@ -39,6 +39,8 @@ MOOD_EMOJIS = {
 
 PRIORITY_EMOJIS = {"high": "🔴", "medium": "🟡", "low": "🟢"}
 
+DYNAMICS_DAYS_SHOWN = 14
+
 VISUAL_ELEMENTS = {
     "header": "✨",
     "divider": "▬▬▬▬▬▬▬▬▬▬▬▬▬",
@@ -453,27 +455,8 @@ async def show_overview_analytics_universal(
     end_date: datetime = None,
 ):
     """Универсальная общая статистика"""
-    if start_date and end_date:
-        all_tasks = await db.get_user_tasks(user_id, include_deleted=False)
-        filtered_tasks = filter_tasks_by_date(all_tasks, start_date, end_date)
-        all_moods = await db.get_mood_statistics(user_id, 365)
-        filtered_moods = (
-            filter_moods_by_date(all_moods, start_date, end_date) if all_moods else []
-        )
-        task_analysis = analyze_tasks_for_custom_period(filtered_tasks, days)
-        mood_analysis = analyze_moods(filtered_moods, days) if filtered_moods else None
-    else:
-        task_stats = await db.get_task_statistics(user_id, days)
-        mood_stats = await db.get_mood_statistics(user_id, days)
-        all_tasks = await db.get_user_tasks(user_id, include_deleted=False)
-        task_analysis = (
-            analyze_tasks(task_stats, all_tasks, days) if task_stats else None
-        )
-        mood_analysis = analyze_moods(mood_stats, days) if mood_stats else None
-
-    text = format_overview_analytics_universal(
-        task_analysis, mood_analysis, days, start_date, end_date
-    )
+    snapshot = await load_analytics_snapshot(user_id, days, start_date, end_date)
+    text = format_overview_analytics_universal(snapshot, days, start_date, end_date)
     await message.answer(
         text, reply_markup=get_back_to_analytics_keyboard(), parse_mode="HTML"
     )
@@ -487,26 +470,8 @@ async def show_priority_analytics_universal(
     end_date: datetime = None,
 ):
     """Универсальный анализ по приоритетам"""
-    if start_date and end_date:
-        all_tasks = await db.get_user_tasks(user_id, include_deleted=False)
-        filtered_tasks = filter_tasks_by_date(all_tasks, start_date, end_date)
-        task_stats = []
-        if filtered_tasks:
-            status_count = {}
-            for task in filtered_tasks:
-                if len(task) > 5:
-                    status = task[5]
-                    status_count[status] = status_count.get(status, 0) + 1
-            for status, count in status_count.items():
-                task_stats.append((status, count))
-    else:
-        task_stats = await db.get_task_statistics(user_id, days)
-        all_tasks = await db.get_user_tasks(user_id, include_deleted=False)
-        filtered_tasks = all_tasks
-
-    text = format_priority_analytics_universal(
-        filtered_tasks, task_stats, days, start_date, end_date
-    )
+    snapshot = await load_analytics_snapshot(user_id, days, start_date, end_date)
+    text = format_priority_analytics_universal(snapshot, days, start_date, end_date)
     await message.answer(
         text, reply_markup=get_back_to_analytics_keyboard(), parse_mode="HTML"
     )
@@ -520,12 +485,10 @@ async def show_dynamics_analytics_universal(
     end_date: datetime = None,
 ):
     """Универсальная динамика выполнения"""
-    task_stats, all_tasks, actual_days = await get_dynamics_data(
-        user_id, days=days, start_date=start_date, end_date=end_date
-    )
-    text = format_dynamics_analytics_universal(
-        task_stats, all_tasks, actual_days, start_date, end_date
-    )
+    snapshot = await load_analytics_snapshot(user_id, days, start_date, end_date)
+    if start_date and end_date:
+        days = (end_date - start_date).days + 1
+    text = format_dynamics_analytics_universal(snapshot, days, start_date, end_date)
     await message.answer(
         text, reply_markup=get_back_to_analytics_keyboard(), parse_mode="HTML"
     )
@@ -540,26 +503,12 @@ async def show_tags_analytics_universal(
 ):
     """Универсальный анализ по тегам"""
     try:
-
-        if start_date and end_date:
-            all_tasks = await db.get_user_tasks(user_id, include_deleted=False)
-            filtered_tasks = filter_tasks_by_date(all_tasks, start_date, end_date)
-            actual_days = days
-        else:
-            tag_stats = await db.get_tasks_grouped_by_tags(user_id)
-            all_tasks = await db.get_user_tasks(user_id, include_deleted=False)
+        snapshot = await load_analytics_snapshot(user_id, days, start_date, end_date)
+        if not (start_date and end_date):
             end_date = datetime.now()
             start_date = end_date - timedelta(days=days)
-            filtered_tasks = filter_tasks_by_date(all_tasks, start_date, end_date)
-            actual_days = days
-
-        tag_analysis = await analyze_tags_for_period_db(
-            user_id, filtered_tasks, actual_days
-        )
 
-        text = format_tags_analytics_universal(
-            tag_analysis, actual_days, start_date, end_date
-        )
+        text = format_tags_analytics_universal(snapshot, days, start_date, end_date)
         await message.answer(
             text, reply_markup=get_back_to_analytics_keyboard(), parse_mode="HTML"
         )
@@ -575,63 +524,22 @@ async def show_tags_analytics_universal(
         )
 
 
-async def analyze_tags_for_period_db(user_id: int, tasks: list, days: int) -> dict:
-    """Анализирует теги для периода через запросы к БД"""
-    if not tasks:
-        return {
-            "total_tasks_with_tags": 0,
-            "unique_tags": 0,
-            "total_tag_uses": 0,
-            "tags_distribution": {},
-            "most_used_tags": [],
-            "completion_by_tags": {},
-            "avg_tags_per_task": 0,
-        }
-
-    all_tags = await db.get_user_tags(user_id)
-
-    tags_stats = {}
-    tasks_with_tags = 0
-    total_tag_uses = 0
-
-    for task in tasks:
-        task_id = task[0]
-        task_status = task[5] if len(task) > 5 else "pending"
-
-        task_tags = await db.get_task_tags(task_id)
-
-        if task_tags:
-            tasks_with_tags += 1
-            total_tag_uses += len(task_tags)
-
-            for tag in task_tags:
-                tag_id, tag_name = tag
-
-                if tag_name not in tags_stats:
-                    tags_stats[tag_name] = {
-                        "total": 0,
-                        "completed": 0,
-                        "pending": 0,
-                    }
-
-                tags_stats[tag_name]["total"] += 1
-                if task_status == "completed":
-                    tags_stats[tag_name]["completed"] += 1
-                else:
-                    tags_stats[tag_name]["pending"] += 1
-
-    most_used_tags = sorted(
-        [(tag, stats["total"]) for tag, stats in tags_stats.items()],
-        key=lambda x: x[1],
-        reverse=True,
-    )
+def analyze_tags(snapshot) -> dict:
+    """Анализирует теги задач периода по агрегатам снимка"""
+    tasks_with_tags, tag_rows = snapshot.tasks_with_tags, snapshot.tag_rows
+
+    tags_stats = {
+        tag_name: {"total": total, "completed": completed, "pending": total - completed}
+        for tag_name, total, completed in tag_rows
+    }
+    total_tag_uses = sum(stats["total"] for stats in tags_stats.values())
 
     return {
         "total_tasks_with_tags": tasks_with_tags,
         "unique_tags": len(tags_stats),
         "total_tag_uses": total_tag_uses,
         "tags_distribution": tags_stats,
-        "most_used_tags": most_used_tags,
+        "most_used_tags": [(tag_name, total) for tag_name, total, _ in tag_rows],
         "completion_by_tags": {
             tag: stats["completed"] for tag, stats in tags_stats.items()
         },
@@ -649,29 +557,8 @@ async def show_productivity_analytics_universal(
     end_date: datetime = None,
 ):
     """Универсальный анализ продуктивности"""
-    if start_date and end_date:
-        all_tasks = await db.get_user_tasks(user_id, include_deleted=False)
-        filtered_tasks = filter_tasks_by_date(all_tasks, start_date, end_date)
-        all_moods = await db.get_mood_statistics(user_id, 365)
-        filtered_moods = (
-            filter_moods_by_date(all_moods, start_date, end_date) if all_moods else []
-        )
-        task_stats = []
-        if filtered_tasks:
-            status_count = {}
-            for task in filtered_tasks:
-                if len(task) > 5:
-                    status = task[5]
-                    status_count[status] = status_count.get(status, 0) + 1
-            for status, count in status_count.items():
-                task_stats.append((status, count))
-    else:
-        task_stats = await db.get_task_statistics(user_id, days)
-        mood_stats = await db.get_mood_statistics(user_id, days)
-        filtered_moods = mood_stats
-
-    analysis = analyze_productivity(task_stats, filtered_moods, days)
-    text = format_productivity_analytics_universal(analysis, days, start_date, end_date)
+    snapshot = await load_analytics_snapshot(user_id, days, start_date, end_date)
+    text = format_productivity_analytics_universal(snapshot, days, start_date, end_date)
     await message.answer(
         text, reply_markup=get_back_to_analytics_keyboard(), parse_mode="HTML"
     )
@@ -685,38 +572,8 @@ async def show_summary_analytics_universal(
     end_date: datetime = None,
 ):
     """Универсальный сводный отчет"""
-    if start_date and end_date:
-        all_tasks = await db.get_user_tasks(user_id, include_deleted=False)
-        filtered_tasks = filter_tasks_by_date(all_tasks, start_date, end_date)
-        all_moods = await db.get_mood_statistics(user_id, 365)
-        filtered_moods = (
-            filter_moods_by_date(all_moods, start_date, end_date) if all_moods else []
-        )
-        task_stats = []
-        if filtered_tasks:
-            status_count = {}
-            for task in filtered_tasks:
-                if len(task) > 5:
-                    status = task[5]
-                    status_count[status] = status_count.get(status, 0) + 1
-            for status, count in status_count.items():
-                task_stats.append((status, count))
-        task_analysis = (
-            analyze_tasks(task_stats, filtered_tasks, days) if task_stats else None
-        )
-        mood_analysis = analyze_moods(filtered_moods, days) if filtered_moods else None
-    else:
-        task_stats = await db.get_task_statistics(user_id, days)
-        mood_stats = await db.get_mood_statistics(user_id, days)
-        all_tasks = await db.get_user_tasks(user_id, include_deleted=False)
-        task_analysis = (
-            analyze_tasks(task_stats, all_tasks, days) if task_stats else None
-        )
-        mood_analysis = analyze_moods(mood_stats, days) if mood_stats else None
-
-    text = format_summary_analytics_universal(
-        task_analysis, mood_analysis, days, start_date, end_date
-    )
+    snapshot = await load_analytics_snapshot(user_id, days, start_date, end_date)
+    text = format_summary_analytics_universal(snapshot, days, start_date, end_date)
     await message.answer(
         text, reply_markup=get_back_to_analytics_keyboard(), parse_mode="HTML"
     )
@@ -730,17 +587,8 @@ async def show_mood_analytics_universal(
     end_date: datetime = None,
 ):
     """Универсальный анализ настроений"""
-    if start_date and end_date:
-        all_moods = await db.get_mood_statistics(user_id, 365)
-        filtered_moods = (
-            filter_moods_by_date(all_moods, start_date, end_date) if all_moods else []
-        )
-        mood_analysis = analyze_moods(filtered_moods, days) if filtered_moods else None
-    else:
-        mood_stats = await db.get_mood_statistics(user_id, days)
-        mood_analysis = analyze_moods(mood_stats, days) if mood_stats else None
-
-    text = format_mood_analytics_universal(mood_analysis, days, start_date, end_date)
+    snapshot = await load_analytics_snapshot(user_id, days, start_date, end_date)
+    text = format_mood_analytics_universal(snapshot, days, start_date, end_date)
     await message.answer(
         text, reply_markup=get_back_to_analytics_keyboard(), parse_mode="HTML"
     )
@@ -781,13 +629,14 @@ async def show_storage_statistics(message: Message):
 
 
 def format_overview_analytics_universal(
-    task_analysis,
-    mood_analysis,
+    snapshot,
     days: int,
     start_date: datetime = None,
     end_date: datetime = None,
 ):
     """Универсальная общая статистика"""
+    task_analysis = analyze_tasks(snapshot.tasks, days)
+    mood_analysis = analyze_moods(snapshot.moods, days)
     period_header = create_period_header("universal", days, start_date, end_date)
 
     html = f"""
@@ -858,16 +707,16 @@ def format_overview_analytics_universal(
 
 
 def format_priority_analytics_universal(
-    all_tasks,
-    task_stats,
+    snapshot,
     days: int,
     start_date: datetime = None,
     end_date: datetime = None,
 ):
     """Универсальный анализ по приоритетам"""
+    analytics = snapshot.tasks
     period_header = create_period_header("universal", days, start_date, end_date)
 
-    if not all_tasks:
+    if not analytics["total"]:
         return f"""
 {VISUAL_ELEMENTS['header']} <b>АНАЛИЗ ПО ПРИОРИТЕТАМ</b> {VISUAL_ELEMENTS['header']}
 {period_header}
@@ -876,18 +725,7 @@ def format_priority_analytics_universal(
 {VISUAL_ELEMENTS['warning']} <i>Нет задач за этот период</i>
 """
 
-    priority_stats = {}
-    for task in all_tasks:
-        if len(task) > 4:
-            priority = task[4] or "medium"
-            status = task[5] if len(task) > 5 else "pending"
-            if priority not in priority_stats:
-                priority_stats[priority] = {"total": 0, "completed": 0, "pending": 0}
-            priority_stats[priority]["total"] += 1
-            if status == "completed":
-                priority_stats[priority]["completed"] += 1
-            else:
-                priority_stats[priority]["pending"] += 1
+    priority_stats = analytics["priorities"]
 
     html = f"""
 {VISUAL_ELEMENTS['header']} <b>АНАЛИЗ ПО ПРИОРИТЕТАМ</b> {VISUAL_ELEMENTS['header']}
@@ -924,10 +762,8 @@ def format_priority_analytics_universal(
 {VISUAL_ELEMENTS['sub_divider']}
 """
 
-        total_tasks = len(all_tasks)
-        completed_tasks = len(
-            [t for t in all_tasks if len(t) > 5 and t[5] == "completed"]
-        )
+        total_tasks = analytics["total"]
+        completed_tasks = analytics["completed"]
         completion_rate = (
             (completed_tasks / total_tasks * 100) if total_tasks > 0 else 0
         )
@@ -947,13 +783,13 @@ def format_priority_analytics_universal(
 
 
 def format_dynamics_analytics_universal(
-    task_stats,
-    all_tasks,
+    snapshot,
     days: int,
     start_date: datetime = None,
     end_date: datetime = None,
 ):
     """Универсальная динамика выполнения"""
+    analytics, daily_counts = snapshot.tasks, snapshot.daily_counts
     period_header = create_period_header("universal", days, start_date, end_date)
 
     html = f"""
@@ -962,11 +798,10 @@ def format_dynamics_analytics_universal(
 {VISUAL_ELEMENTS['divider']}
 """
 
-    if task_stats and all_tasks:
-        status_data = {status: count for status, count in task_stats}
-        total = sum(status_data.values())
-        completed = status_data.get("completed", 0)
-        pending = status_data.get("pending", 0)
+    if analytics["total"]:
+        total = analytics["total"]
+        completed = analytics["completed"]
+        pending = analytics["pending"]
         completion_rate = (completed / total * 100) if total > 0 else 0
         quality = get_quality_level(completion_rate)
 
@@ -981,6 +816,15 @@ def format_dynamics_analytics_universal(
 {create_fancy_progress_bar(completion_rate, quality, show_percentage=True)}
 """
 
+        if daily_counts:
+            late = sum(row[3] for row in daily_counts)
+            if late:
+                html += f"{VISUAL_ELEMENTS['warning']} <b>Выполнено после срока:</b> <code>{late}</code>\n"
+            html += f"\n{VISUAL_ELEMENTS['calendar']} <b>ПО ДНЯМ</b> <i>(создано / выполнено / после срока)</i>\n"
+            for day, created, done, overdue in daily_counts[-DYNAMICS_DAYS_SHOWN:]:
+                day_label = datetime.strptime(day, "%Y-%m-%d").strftime("%d.%m")
+                html += f"{VISUAL_ELEMENTS['bullet']} {day_label}: <code>{created}</code> / <code>{done}</code> / <code>{overdue}</code>\n"
+
         html += f"\n{VISUAL_ELEMENTS['medal']} <b>ОЦЕНКА РЕЗУЛЬТАТОВ</b>\n"
         if completion_rate >= 80:
             html += f"{VISUAL_ELEMENTS['trophy']} <b>Отличные результаты!</b>\n<i>Вы эффективно справляетесь с задачами</i>"
@@ -997,12 +841,13 @@ def format_dynamics_analytics_universal(
 
 
 def format_tags_analytics_universal(
-    tag_analysis: dict,
+    snapshot,
     days: int,
     start_date: datetime = None,
     end_date: datetime = None,
 ):
     """Универсальный формат анализа по тегам"""
+    tag_analysis = analyze_tags(snapshot)
     period_header = create_period_header("universal", days, start_date, end_date)
 
     html = f"""
@@ -1068,9 +913,10 @@ def get_rank_emoji(rank: int) -> str:
 
 
 def format_productivity_analytics_universal(
-    analysis, days: int, start_date: datetime = None, end_date: datetime = None
+    snapshot, days: int, start_date: datetime = None, end_date: datetime = None
 ):
     """Универсальный анализ продуктивности"""
+    analysis = analyze_productivity(snapshot.tasks, snapshot.moods, days)
     period_header = create_period_header("universal", days, start_date, end_date)
 
     html = f"""
@@ -1112,13 +958,15 @@ def format_productivity_analytics_universal(
 
 
 def format_summary_analytics_universal(
-    task_analysis,
-    mood_analysis,
+    snapshot,
     days: int,
     start_date: datetime = None,
     end_date: datetime = None,
 ):
     """Универсальный сводный отчет"""
+    task_analysis = analyze_tasks(snapshot.tasks, days)
+    mood_analysis = analyze_moods(snapshot.moods, days)
+    series_stats = snapshot.series_stats
     period_header = create_period_header("universal", days, start_date, end_date)
 
     html = f"""
@@ -1185,6 +1033,17 @@ def format_summary_analytics_universal(
             common_emoji = MOOD_EMOJIS.get(mood_analysis["most_common"], "⚪")
             html += f"{VISUAL_ELEMENTS['target']} <b>Преобладает:</b> {common_emoji} {mood_analysis['most_common']}\n"
 
+    if series_stats:
+        html += "\n🔁 <b>ПОВТОРЯЮЩИЕСЯ ЗАДАЧИ</b>\n\n"
+        for series_id, content, recurrence, total, completed in series_stats[:5]:
+            rate = completed / total * 100
+            rule_text = describe_rule(recurrence) if recurrence else "остановлена"
+            html += (
+                f"{VISUAL_ELEMENTS['bullet']} {content[:30]} ({rule_text}): "
+                f"{completed}/{total}\n"
+                f"{create_fancy_progress_bar(rate, get_quality_level(rate))}\n"
+            )
+
     html += f"\n{VISUAL_ELEMENTS['medal']} <b>ИТОГОВАЯ ОЦЕНКА</b>\n"
     if overall_score >= 80:
         html += f"{VISUAL_ELEMENTS['trophy']} <b>ОТЛИЧНЫЕ РЕЗУЛЬТАТЫ!</b>\n<i>Вы прекрасно справляетесь!</i>"
@@ -1199,9 +1058,10 @@ def format_summary_analytics_universal(
 
 
 def format_mood_analytics_universal(
-    analysis, days: int, start_date: datetime = None, end_date: datetime = None
+    snapshot, days: int, start_date: datetime = None, end_date: datetime = None
 ):
     """Универсальный анализ настроений"""
+    analysis = analyze_moods(snapshot.moods, days)
     period_header = create_period_header("universal", days, start_date, end_date)
 
     if not analysis:
@@ -1322,36 +1182,6 @@ def create_mood_distribution_table(distribution: dict, total: int) -> str:
     return table
 
 
-def mood_to_score(mood: str) -> int:
-    """Конвертирует настроение в числовую оценку"""
-    scores = {"отлично": 5, "хорошо": 4, "нормально": 3, "плохо": 2, "ужасно": 1}
-    return scores.get(mood.lower(), 3)
-
-
-def count_overdue_tasks(tasks: list) -> int:
-    """Считает просроченные задачи"""
-    if not tasks:
-        return 0
-
-    overdue = 0
-    now = datetime.now()
-
-    for task in tasks:
-        if len(task) > 3 and task[3] and task[5] == "pending":
-            try:
-                due_date_str = str(task[3]).strip()
-                if "." in due_date_str:
-                    due_date_str = due_date_str.split(".")[0]
-                due_date_str = due_date_str.replace("Z", "+00:00")
-                due_date = datetime.fromisoformat(due_date_str)
-                if due_date < now:
-                    overdue += 1
-            except (ValueError, TypeError):
-                continue
-
-    return overdue
-
-
 def calculate_productivity_score(
     completion_rate: float, pending_tasks: int, overdue_tasks: int
 ) -> float:
@@ -1375,143 +1205,46 @@ def calculate_productivity_score(
     return max(0, min(10, round(productivity, 1)))
 
 
-def filter_moods_by_date(
-    mood_stats: list, start_date: datetime, end_date: datetime
-) -> list:
-    """Фильтрует настроения по дате"""
-    filtered = []
-    for mood in mood_stats:
-        if len(mood) > 1 and mood[1]:
-            try:
-                mood_date = datetime.strptime(mood[1], "%Y-%m-%d").date()
-                if start_date.date() <= mood_date <= end_date.date():
-                    filtered.append(mood)
-            except (ValueError, TypeError):
-                continue
-    return filtered
-
-
-def filter_tasks_by_date(tasks: list, start_date: datetime, end_date: datetime) -> list:
-    """Фильтрует задачи по дате создания"""
-    filtered = []
-    for task in tasks:
-        if len(task) < 7:
-            continue
-
-        task_id = task[0]
-        created_at = task[6]
-
-        if not created_at:
-            continue
-
-        try:
-            created_str = str(created_at).strip()
-            if "." in created_str:
-                created_str = created_str.split(".")[0]
-            created_str = created_str.replace("Z", "+00:00")
-            task_date = datetime.fromisoformat(created_str)
-            task_date_date = task_date.date()
-            start_date_date = start_date.date()
-            end_date_date = end_date.date()
-
-            if start_date_date <= task_date_date <= end_date_date:
-                filtered.append(task)
-        except (ValueError, TypeError):
-            continue
-
-    return filtered
+def analytics_range(
+    days: int, start_date: datetime = None, end_date: datetime = None
+) -> tuple:
+    """Границы периода аналитики [начало, конец) с точностью до суток"""
+    if start_date and end_date:
+        first_day, last_day = start_date.date(), end_date.date()
+    else:
+        last_day = datetime.now().date()
+        first_day = last_day - timedelta(days=days)
+    return (
+        datetime.combine(first_day, datetime.min.time()),
+        datetime.combine(last_day + timedelta(days=1), datetime.min.time()),
+    )
 
 
-async def get_dynamics_data(
+async def load_analytics_snapshot(
     user_id: int,
     days: int = None,
     start_date: datetime = None,
     end_date: datetime = None,
 ):
-    """Получает данные для анализа динамики"""
-    if start_date and end_date:
-        all_tasks = await db.get_user_tasks(user_id, include_deleted=False)
-        filtered_tasks = filter_tasks_by_date(all_tasks, start_date, end_date)
-        days = (end_date - start_date).days + 1
-    else:
-        all_tasks = await db.get_user_tasks(user_id, include_deleted=False)
-        end_date = datetime.now()
-        start_date = end_date - timedelta(days=days)
-        filtered_tasks = filter_tasks_by_date(all_tasks, start_date, end_date)
-
-    task_stats = []
-    if filtered_tasks:
-        status_count = {}
-        for task in filtered_tasks:
-            if len(task) > 5:
-                status = task[5]
-                status_count[status] = status_count.get(status, 0) + 1
-
-        for status, count in status_count.items():
-            task_stats.append((status, count))
-
-    return task_stats, filtered_tasks, days
-
-
-def analyze_tasks_for_custom_period(tasks: list, days: int) -> dict:
-    """Анализирует задачи для произвольного периода"""
-    if not tasks:
-        return None
-
-    total = len(tasks)
-    completed = 0
-    pending = 0
-
-    for task in tasks:
-        if len(task) > 5:
-            status = task[5]
-            if status == "completed":
-                completed += 1
-            elif status == "pending":
-                pending += 1
-
-    completion_rate = (completed / total * 100) if total > 0 else 0
-    overdue = count_overdue_tasks(tasks)
-
-    priorities = {}
-    for task in tasks:
-        if len(task) > 4:
-            priority = task[4] if task[4] else "medium"
-            priorities[priority] = priorities.get(priority, 0) + 1
-
-    productivity = calculate_productivity_score(completion_rate, pending, overdue)
-    daily_avg = round(total / days, 1) if days > 0 and total > 0 else 0
-
-    return {
-        "total": total,
-        "completed": completed,
-        "pending": pending,
-        "completion_rate": round(completion_rate, 1),
-        "overdue": overdue,
-        "priorities": priorities,
-        "productivity": round(productivity, 1),
-        "daily_avg": daily_avg,
-    }
+    """Снимок аналитики за выбранный период, общий для всех отчетов"""
+    period_start, period_end = analytics_range(days, start_date, end_date)
+    return await db.get_analytics_snapshot(user_id, period_start, period_end)
 
 
-def analyze_tasks(task_stats, all_tasks, days):
+def analyze_tasks(analytics: dict, days):
     """Анализирует статистику задач"""
-    if not task_stats:
+    if not analytics or not analytics["total"]:
         return None
 
-    status_data = {status: count for status, count in task_stats}
-    total = sum(status_data.values())
-    completed = status_data.get("completed", 0)
-    pending = status_data.get("pending", 0)
+    total = analytics["total"]
+    completed = analytics["completed"]
+    pending = analytics["pending"]
+    overdue = analytics["overdue"]
 
     completion_rate = (completed / total * 100) if total > 0 else 0
-    overdue = count_overdue_tasks(all_tasks)
-
-    priorities = {}
-    for task in all_tasks:
-        if len(task) > 3 and task[4] == "pending":
-            priority = task[3] if task[3] else "medium"
-            priorities[priority] = priorities.get(priority, 0) + 1
+    priorities = {
+        priority: stats["total"] for priority, stats in analytics["priorities"].items()
+    }
 
     productivity = calculate_productivity_score(completion_rate, pending, overdue)
     daily_avg = round(total / days, 1) if days > 0 and total > 0 else 0
@@ -1552,7 +1285,7 @@ def analyze_moods(mood_stats, days):
         else:
             stability = "низкая"
 
-    scores = [mood_to_score(mood) for mood in moods]
+    scores = [mood[2] for mood in mood_stats]
     avg_score = statistics.mean(scores) if scores else 0
 
     weeks = days / 7
@@ -1568,10 +1301,10 @@ def analyze_moods(mood_stats, days):
     }
 
 
-def analyze_productivity(task_stats, mood_stats, days):
+def analyze_productivity(task_analytics, mood_stats, days):
     """Анализирует продуктивность"""
-    task_analysis = analyze_tasks(task_stats, [], days) if task_stats else None
-    mood_analysis = analyze_moods(mood_stats, days) if mood_stats else None
+    task_analysis = analyze_tasks(task_analytics, days)
+    mood_analysis = analyze_moods(mood_stats, days)
 
     insights = []
 
@@ -1628,26 +1361,10 @@ async def handle_storage_analytics(message: Message):
 
 async def get_storage_stats(user_id: int) -> str:
     """Получить статистику хранилища"""
-    async with aiosqlite.connect(db.db_path) as conn:
-        cursor = await conn.execute(
-            "SELECT status, COUNT(*) FROM tasks WHERE user_id = ? AND is_deleted = 0 GROUP BY status",
-            (user_id,),
-        )
-        task_stats = await cursor.fetchall()
-
-        month_ago = (datetime.now() - timedelta(days=30)).isoformat()
-        cursor = await conn.execute(
-            "SELECT COUNT(*) FROM tasks WHERE status = 'completed' AND completed_at <= ? AND user_id = ?",
-            (month_ago, user_id),
-        )
-        old_completed = (await cursor.fetchone())[0]
-
-        three_months_ago = (datetime.now() - timedelta(days=90)).date().isoformat()
-        cursor = await conn.execute(
-            "SELECT COUNT(*) FROM moods WHERE date < ? AND user_id = ?",
-            (three_months_ago, user_id),
-        )
-        old_moods = (await cursor.fetchone())[0]
+    storage_stats = await db.get_storage_statistics(user_id)
+    task_stats = storage_stats["task_stats"]
+    old_completed = storage_stats["old_completed_tasks"]
+    old_moods = storage_stats["old_moods"]
 
     stats_text = "📊 <b>Текущая статистика хранилища</b>\n\n"
 
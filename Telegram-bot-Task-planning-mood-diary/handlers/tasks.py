@@ -1,7 +1,7 @@
 from aiogram import Router, F
 import asyncio
 from aiogram.types import Message
-from aiogram.filters import Command, StateFilter
+from aiogram.filters import Command, CommandObject, StateFilter
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
 from datetime import datetime, time, timedelta
@@ -15,6 +15,7 @@ project_root = current_dir.parent
 sys.path.insert(0, str(project_root))
 
 from database import db
+from recurrence import describe_rule, parse_rule
 from keyboards import (
     get_tasks_keyboard,
     get_task_creation_keyboard,
@@ -213,6 +214,70 @@ async def cmd_complete(message: Message, state: FSMContext):
     await state.set_state(TaskComplete.waiting_for_task_id)
 
 
+@router.message(Command("repeat"))
+async def cmd_repeat(message: Message, command: CommandObject):
+    """Задает или отключает повторение задачи"""
+    args = (command.args or "").split(maxsplit=1)
+    if len(args) < 2 or not args[0].isdigit():
+        await message.answer(
+            "🔁 Повторяющиеся задачи\n\n"
+            "Использование: /repeat ID правило\n\n"
+            "Примеры правил:\n"
+            "• ежедневно\n"
+            "• каждые 3 дня\n"
+            "• по будням\n"
+            "• пн ср пт\n"
+            "• еженедельно\n"
+            "• ежемесячно или 15 числа\n\n"
+            "/repeat ID нет — отключить повторение\n"
+            "Следующее повторение создается, когда выполнена текущая задача.",
+            reply_markup=get_tasks_keyboard(),
+        )
+        return
+
+    task_id = int(args[0])
+    task = await db.get_task(task_id)
+    if not task or task[1] != message.from_user.id or task[9]:
+        await message.answer("❌ Задача не найдена!", reply_markup=get_tasks_keyboard())
+        return
+    if task[5] == "completed":
+        await message.answer(
+            "❌ Задача уже выполнена! Повторение задается для активных задач.",
+            reply_markup=get_tasks_keyboard(),
+        )
+        return
+
+    if args[1].strip().lower() in ("нет", "off", "выкл"):
+        await db.set_task_recurrence(task_id, None)
+        await message.answer(
+            f"⏹️ Повторение задачи #{task_id} отключено",
+            reply_markup=get_tasks_keyboard(),
+        )
+        return
+
+    due_date = task[3]
+    if not due_date:
+        await message.answer(
+            "❌ Для повторения у задачи должен быть срок!",
+            reply_markup=get_tasks_keyboard(),
+        )
+        return
+
+    rule = parse_rule(args[1], due_date)
+    if not rule:
+        await message.answer(
+            "❌ Не удалось распознать правило. Отправьте /repeat для примеров.",
+            reply_markup=get_tasks_keyboard(),
+        )
+        return
+
+    await db.set_task_recurrence(task_id, rule)
+    await message.answer(
+        f"🔁 Задача #{task_id} повторяется {describe_rule(rule)}",
+        reply_markup=get_tasks_keyboard(),
+    )
+
+
 @router.message(F.text == "🗑️ Удалить задачу")
 @router.message(Command("delete"))
 async def cmd_delete(message: Message, state: FSMContext):
@@ -320,36 +385,21 @@ def extract_task_data(task):
         return None
 
 
+def task_recurrence(task):
+    """Правило повторения из строки задачи или None"""
+    return task[11] if task and len(task) > 11 else None
+
+
 def format_due_date(due_date):
     """Форматирование даты для отображения с учетом времени"""
     if not due_date:
         return "⏳ без срока"
 
     try:
-        if not isinstance(due_date, str):
-            return "⏳ без срока"
-
-        invalid_keywords = [
-            "high",
-            "medium",
-            "low",
-            "сделать",
-            "проект",
-            "задача",
-            "описание",
-        ]
-        if any(keyword in due_date.lower() for keyword in invalid_keywords):
-            return "⏳ без срока"
-        if not any(char.isdigit() for char in due_date):
+        if not isinstance(due_date, datetime):
             return "⏳ без срока"
 
-        if "T" in due_date:
-            due_datetime = datetime.fromisoformat(due_date)
-        elif " " in due_date:
-            due_datetime = datetime.fromisoformat(due_date.replace(" ", "T"))
-        else:
-            due_datetime = datetime.fromisoformat(due_date + "T00:00:00")
-
+        due_datetime = due_date
         now = datetime.now()
         is_overdue = due_datetime < now
 
@@ -371,7 +421,7 @@ def format_due_date(due_date):
         return "⏳ без срока"
 
 
-def create_task_card(task_data, task_tags=None):
+def create_task_card(task_data, task_tags=None, recurrence=None):
     """Создает  карточку задачи"""
     if not task_data:
         return "❌ Ошибка данных задачи"
@@ -420,6 +470,9 @@ def create_task_card(task_data, task_tags=None):
     due_text = format_due_date(due_date)
     card += f"<code></code>{due_text}\n"
 
+    if recurrence:
+        card += f"<code></code>🔁 Повтор: {describe_rule(recurrence)}\n"
+
     if task_tags:
         tags_text = " ".join([f"<code>#{tag[1]}</code>" for tag in task_tags])
         card += f"<code></code>Теги: {tags_text}\n"
@@ -483,6 +536,8 @@ async def format_and_send_tasks(
         )
         return
 
+    tags_by_task = await db.get_tags_for_tasks([task[0] for task in tasks])
+
     chunk_size = 10
     task_chunks = [tasks[i : i + chunk_size] for i in range(0, len(tasks), chunk_size)]
 
@@ -501,7 +556,7 @@ async def format_and_send_tasks(
 
             task_id, content, due_date, priority, status, is_deleted = task_data
 
-            task_tags = await db.get_task_tags(task_id)
+            task_tags = tags_by_task.get(task_id, [])
             tags_text = (
                 " ".join([f"<code>#{tag[1]}</code>" for tag in task_tags])
                 if task_tags
@@ -521,7 +576,8 @@ async def format_and_send_tasks(
             if len(display_content) > 50:
                 display_content = display_content[:47] + "..."
 
-            tasks_text += f"{icon} <b>#{task_id}</b> - {display_content}\n"
+            repeat_mark = " 🔁" if task_recurrence(task) else ""
+            tasks_text += f"{icon} <b>#{task_id}</b> - {display_content}{repeat_mark}\n"
 
             if due_date:
                 due_text = format_due_date(due_date)
@@ -677,6 +733,10 @@ async def count_filtered_tasks(user_id: int, filters: dict) -> int:
     else:
         tasks = await db.get_user_tasks_with_priority(user_id, "pending")
 
+    tags_by_task = {}
+    if "tag" in filters:
+        tags_by_task = await db.get_tags_for_tasks([task[0] for task in tasks])
+
     count = 0
     for task in tasks:
         task_data = extract_task_data(task)
@@ -692,7 +752,7 @@ async def count_filtered_tasks(user_id: int, filters: dict) -> int:
             continue
 
         if "tag" in filters:
-            task_tags = await db.get_task_tags(task_id)
+            task_tags = tags_by_task.get(task_id, [])
             tag_names = [tag[1].lower() for tag in task_tags]
             if filters["tag"].lower() not in tag_names:
                 continue
@@ -702,7 +762,7 @@ async def count_filtered_tasks(user_id: int, filters: dict) -> int:
                 if filters["date"] != "overdue":
                     continue
             else:
-                due_datetime = datetime.fromisoformat(due_date)
+                due_datetime = due_date
                 today = datetime.now().date()
 
                 if filters["date"] == "today" and due_datetime.date() != today:
@@ -921,14 +981,6 @@ async def process_task_priority(message: Message, state: FSMContext):
         message.from_user.id, content, due_datetime, priority
     )
 
-    if due_datetime and reminder_manager:
-        try:
-            await reminder_manager.create_reminder_for_new_task(
-                user_id=message.from_user.id, task_id=task_id, due_date=due_datetime
-            )
-        except Exception as e:
-            print(f"ERROR: Failed to create reminder for task {task_id}: {e}")
-
     priority_icons = {"high": "🔴", "medium": "🟡", "low": "🟢"}
     priority_texts = {"high": "высокий", "medium": "средний", "low": "низкий"}
 
@@ -1042,18 +1094,12 @@ async def process_complete_task_id(message: Message, state: FSMContext, task_id:
         confirm_text = f"✅ Вы хотите завершить задачу?\n\n📝 {content}\n"
 
         if due_date:
-            try:
-                due_datetime = datetime.fromisoformat(due_date)
-                if due_datetime.time() == time(23, 59):
-                    confirm_text += (
-                        f"📅 Срок: {due_datetime.strftime('%d.%m.%Y')} (весь день)\n"
-                    )
-                else:
-                    confirm_text += (
-                        f"📅 Срок: {due_datetime.strftime('%d.%m.%Y %H:%M')}\n"
-                    )
-            except (ValueError, TypeError):
-                confirm_text += "📅 Срок: неверный формат даты\n"
+            if due_date.time() == time(23, 59):
+                confirm_text += (
+                    f"📅 Срок: {due_date.strftime('%d.%m.%Y')} (весь день)\n"
+                )
+            else:
+                confirm_text += f"📅 Срок: {due_date.strftime('%d.%m.%Y %H:%M')}\n"
 
         confirm_text += f"\nПодтвердите завершение задачи:"
 
@@ -1081,16 +1127,21 @@ async def process_complete_confirmation(message: Message, state: FSMContext):
         task_id = data["complete_task_id"]
         content = data["complete_task_content"]
 
-        await db.complete_task(task_id)
+        next_task = await db.complete_task(task_id)
 
         display_content = content
         if len(display_content) > 30:
             display_content = display_content[:30] + "..."
 
-        await message.answer(
-            f"✅ Задача #{task_id}: {display_content} - выполнена!",
-            reply_markup=get_tasks_keyboard(),
-        )
+        text = f"✅ Задача #{task_id}: {display_content} - выполнена!"
+        if next_task:
+            next_task_id, next_due = next_task
+            text += (
+                f"\n🔁 Следующее повторение: #{next_task_id} "
+                f"{next_due.strftime('%d.%m.%Y %H:%M')}"
+            )
+
+        await message.answer(text, reply_markup=get_tasks_keyboard())
         await state.clear()
 
     elif answer in ["❌ отменить", "нет", "no", "n", "н"]:
@@ -1317,7 +1368,7 @@ async def process_restore_task_id(message: Message, state: FSMContext, task_id:
     confirm_text = f"🔄 Вы хотите восстановить задачу?\n\n" f"📝 {content}\n"
 
     if due_date:
-        due_datetime = datetime.fromisoformat(due_date)
+        due_datetime = due_date
         if due_datetime.time() == time(23, 59):
             confirm_text += (
                 f"📅 Срок: {due_datetime.strftime('%d.%m.%Y')} (весь день)\n"
@@ -1435,7 +1486,7 @@ async def show_edit_options(message: Message, state: FSMContext):
     task_info += f"📝 Текст: {content}\n"
 
     if due_date:
-        due_datetime = datetime.fromisoformat(due_date)
+        due_datetime = due_date
         if due_datetime.time() == time(23, 59):
             task_info += f"📅 Срок: {due_datetime.strftime('%d.%m.%Y')} (весь день)\n"
         else:
@@ -1575,16 +1626,13 @@ async def process_new_time(message: Message, state: FSMContext):
 
     await db.update_task_due_date(task_id, due_datetime)
     if reminder_manager:
-        try:
-            await reminder_manager.update_reminders_for_edited_task(
-                user_id=message.from_user.id, task_id=task_id, new_due_date=due_datetime
-            )
-            response_text += "\n🔔 Напоминания обновлены!"
-        except Exception as e:
-            print(f"❌ Ошибка при обновлении напоминаний: {e}")
+        synced = await reminder_manager.sync_task_reminders(
+            message.from_user.id, task_id, due_datetime
+        )
+        if synced is None:
             response_text += "\n⚠️ Не удалось обновить напоминания"
-    else:
-        print(f"❌ Ошибка при обновлении напоминаний")
+        elif synced:
+            response_text += "\n🔔 Напоминания обновлены!"
 
     await message.answer(f"{response_text}\nID задачи: {task_id}")
     await message.answer(
@@ -2155,8 +2203,7 @@ async def cmd_overdue(message: Message):
 
             task_id, content, due_date, priority, status, is_deleted = task_data
 
-            due_datetime = datetime.fromisoformat(due_date)
-            overdue_time = datetime.now() - due_datetime
+            overdue_time = datetime.now() - due_date
             overdue_days = overdue_time.days
 
             priority_icons = {"high": "🔴", "medium": "🟡", "low": "🟢"}
@@ -2166,7 +2213,7 @@ async def cmd_overdue(message: Message):
                 display_content = display_content[:35] + "..."
 
             tasks_text += f"{priority_icons.get(priority, '🟡')} <b>#{task_id}</b> - {display_content}\n"
-            tasks_text += f"   📅 Был срок: {due_datetime.strftime('%d.%m.%Y %H:%M')}\n"
+            tasks_text += f"   📅 Был срок: {due_date.strftime('%d.%m.%Y %H:%M')}\n"
 
             if overdue_days == 1:
                 tasks_text += f"   ⏰ Просрочена: 1 день\n\n"
@@ -2228,8 +2275,7 @@ async def cmd_upcoming(message: Message):
                     display_content = (
                         content[:35] + "..." if len(content) > 35 else content
                     )
-                    due_datetime = datetime.fromisoformat(due_date.replace(" ", "T"))
-                    time_left = due_datetime - datetime.now()
+                    time_left = due_date - datetime.now()
 
                     if time_left.days > 0:
                         time_text = f"через {time_left.days} дн"
@@ -2314,6 +2360,7 @@ async def group_by_tags(message: Message, state: FSMContext):
 
     tasks_by_tag = {}
     tasks_without_tags = []
+    tags_by_task = await db.get_tags_for_tasks([task[0] for task in tasks])
 
     for task in tasks:
         task_data = extract_task_data(task)
@@ -2321,7 +2368,7 @@ async def group_by_tags(message: Message, state: FSMContext):
             continue
 
         task_id = task_data[0]
-        task_tags = await db.get_task_tags(task_id)
+        task_tags = tags_by_task.get(task_id, [])
 
         if task_tags:
             for tag in task_tags:
@@ -2345,10 +2392,10 @@ async def group_by_tags(message: Message, state: FSMContext):
     await message.answer(header, parse_mode="HTML")
 
     for tag_name, tag_tasks in tasks_by_tag.items():
-        await process_tag_group(message, tag_name, tag_tasks)
+        await process_tag_group(message, tag_name, tag_tasks, tags_by_task)
 
     if tasks_without_tags:
-        await process_tag_group(message, "БЕЗ ТЕГОВ", tasks_without_tags)
+        await process_tag_group(message, "БЕЗ ТЕГОВ", tasks_without_tags, tags_by_task)
 
     footer = (
         f"📈 <b>ИТОГИ ГРУППИРОВКИ ПО ТЕГАМ</b>\n"
@@ -2361,9 +2408,13 @@ async def group_by_tags(message: Message, state: FSMContext):
     await state.clear()
 
 
-async def process_tag_group(message: Message, tag_name: str, tasks: list):
+async def process_tag_group(
+    message: Message, tag_name: str, tasks: list, tags_by_task: dict = None
+):
     """Обрабатывает одну группу тегов"""
     total_tasks = len(tasks)
+    if tags_by_task is None:
+        tags_by_task = await db.get_tags_for_tasks([task[0] for task in tasks])
     overdue_count = 0
     today_count = 0
     urgent_count = 0
@@ -2372,11 +2423,7 @@ async def process_tag_group(message: Message, tag_name: str, tasks: list):
         task_data = extract_task_data(task)
         if task_data and task_data[2]:
             try:
-                due_date = task_data[2]
-                if "T" in due_date:
-                    due_datetime = datetime.fromisoformat(due_date)
-                else:
-                    due_datetime = datetime.fromisoformat(due_date + "T00:00:00")
+                due_datetime = task_data[2]
 
                 if due_datetime < datetime.now():
                     overdue_count += 1
@@ -2412,8 +2459,8 @@ async def process_tag_group(message: Message, tag_name: str, tasks: list):
         task_data = extract_task_data(task)
         if task_data:
             task_id, content, due_date, priority, status, is_deleted = task_data
-            all_task_tags = await db.get_task_tags(task_id)
-            card = create_task_card(task_data, all_task_tags)
+            all_task_tags = tags_by_task.get(task_id, [])
+            card = create_task_card(task_data, all_task_tags, task_recurrence(task))
             card += f"\n📁 <i>Группа: {tag_name} | Задача {i} из {total_tasks}</i>"
 
             await message.answer(card, parse_mode="HTML")
@@ -2506,6 +2553,7 @@ async def process_priority_group(
 ):
     """Обрабатывает одну группу приоритетов"""
     total_tasks = len(tasks)
+    tags_by_task = await db.get_tags_for_tasks([task[0] for task in tasks])
     overdue_count = 0
     today_count = 0
     urgent_count = 0
@@ -2514,11 +2562,7 @@ async def process_priority_group(
         task_data = extract_task_data(task)
         if task_data and task_data[2]:
             try:
-                due_date = task_data[2]
-                if "T" in due_date:
-                    due_datetime = datetime.fromisoformat(due_date)
-                else:
-                    due_datetime = datetime.fromisoformat(due_date + "T00:00:00")
+                due_datetime = task_data[2]
 
                 if due_datetime < datetime.now():
                     overdue_count += 1
@@ -2548,8 +2592,8 @@ async def process_priority_group(
         task_data = extract_task_data(task)
         if task_data:
             task_id, content, due_date, priority, status, is_deleted = task_data
-            task_tags = await db.get_task_tags(task_id)
-            card = create_task_card(task_data, task_tags)
+            task_tags = tags_by_task.get(task_id, [])
+            card = create_task_card(task_data, task_tags, task_recurrence(task))
             card += f"\n📁 <i>Группа: {group_name} | Задача {i} из {total_tasks}</i>"
 
             await message.answer(card, parse_mode="HTML")
@@ -2598,12 +2642,7 @@ async def group_by_date(message: Message, state: FSMContext):
                 continue
 
             try:
-                if "T" in due_date:
-                    due_datetime = datetime.fromisoformat(due_date)
-                else:
-                    due_datetime = datetime.fromisoformat(due_date + "T00:00:00")
-
-                due_date_only = due_datetime.date()
+                due_date_only = due_date.date()
 
                 if due_date_only < today:
                     tasks_by_date["ПРОСРОЧЕННЫЕ"].append(task)
@@ -2755,6 +2794,7 @@ async def process_status_group(
 ):
     """Обрабатывает одну группу статусов"""
     total_tasks = len(tasks)
+    tags_by_task = await db.get_tags_for_tasks([task[0] for task in tasks])
 
     header = (
         f"{icon} <b>СТАТУС: {status_name}</b>\n"
@@ -2766,8 +2806,8 @@ async def process_status_group(
         if task_data:
             task_id, content, due_date, priority, status, is_deleted = task_data
 
-            task_tags = await db.get_task_tags(task_id)
-            card = create_task_card(task_data, task_tags)
+            task_tags = tags_by_task.get(task_id, [])
+            card = create_task_card(task_data, task_tags, task_recurrence(task))
             card += f"\n📁 <i>Группа: {status_name} | Задача {i} из {total_tasks}</i>"
 
             await message.answer(card, parse_mode="HTML")
@@ -2779,6 +2819,7 @@ async def process_status_group(
 async def process_date_group(message: Message, date_name: str, icon: str, tasks: list):
     """Обрабатывает одну группу дат"""
     total_tasks = len(tasks)
+    tags_by_task = await db.get_tags_for_tasks([task[0] for task in tasks])
 
     header = (
         f"{icon} <b>ДАТА: {date_name}</b>\n"
@@ -2792,8 +2833,8 @@ async def process_date_group(message: Message, date_name: str, icon: str, tasks:
         if task_data:
             task_id, content, due_date, priority, status, is_deleted = task_data
 
-            task_tags = await db.get_task_tags(task_id)
-            card = create_task_card(task_data, task_tags)
+            task_tags = tags_by_task.get(task_id, [])
+            card = create_task_card(task_data, task_tags, task_recurrence(task))
             card += f"\n📁 <i>Группа: {date_name} | Задача {i} из {total_tasks}</i>"
 
             await message.answer(card, parse_mode="HTML")
@@ -2846,39 +2887,15 @@ async def group_by_specific_period(message: Message, state: FSMContext, period:
         target_date = today + timedelta(days=1)
         period_name = "завтра"
     elif period == "week":
-        tasks = await db.get_user_tasks_with_priority(user_id, "pending")
-        week_tasks = []
-
-        for task in tasks:
-            task_data = extract_task_data(task)
-            if task_data and task_data[2]:
-                try:
-                    due_date = datetime.fromisoformat(
-                        task_data[2].replace(" ", "T")
-                    ).date()
-                    if 0 <= (due_date - today).days <= 7:
-                        week_tasks.append(task)
-                except (ValueError, TypeError):
-                    continue
-
+        week_tasks = await db.get_filtered_tasks(
+            user_id, {"status": "pending", "date": "week"}
+        )
         await show_period_tasks(message, state, week_tasks, "ближайшую неделю")
         return
     elif period == "month":
-        tasks = await db.get_user_tasks_with_priority(user_id, "pending")
-        month_tasks = []
-
-        for task in tasks:
-            task_data = extract_task_data(task)
-            if task_data and task_data[2]:
-                try:
-                    due_date = datetime.fromisoformat(
-                        task_data[2].replace(" ", "T")
-                    ).date()
-                    if 0 <= (due_date - today).days <= 30:
-                        month_tasks.append(task)
-                except (ValueError, TypeError):
-                    continue
-
+        month_tasks = await db.get_filtered_tasks(
+            user_id, {"status": "pending", "date": "month"}
+        )
         await show_period_tasks(message, state, month_tasks, "ближайший месяц")
         return
 
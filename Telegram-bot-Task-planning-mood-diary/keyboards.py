@@ -344,6 +344,10 @@ def get_time_reminder_keyboard():
                 KeyboardButton(text="⏰ Изменить время дедлайнов"),
                 KeyboardButton(text="⏰ Время ежедневных уведомлений"),
             ],
+            [
+                KeyboardButton(text="🔁 Повтор о просрочке"),
+                KeyboardButton(text="🌍 Пояс сводки"),
+            ],
             [KeyboardButton(text="🔙 Назад к уведомлениям")],
         ],
         resize_keyboard=True,
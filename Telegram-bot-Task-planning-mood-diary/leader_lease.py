@@ -0,0 +1,101 @@
+import asyncio
+import logging
+import os
+import socket
+import time
+import uuid
+
+from database import db
+
+logger = logging.getLogger(__name__)
+
+
+def make_holder_id() -> str:
+    """Уникальный идентификатор процесса-претендента на аренду"""
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+class LeaderLease:
+    """Аренда лидерства в SQLite: фоновую работу выполняет только один процесс"""
+
+    def __init__(
+        self,
+        name: str,
+        on_acquired,
+        on_lost,
+        ttl: int = 15,
+        heartbeat: float = 5.0,
+        holder: str = None,
+    ):
+        self.name = name
+        self.on_acquired = on_acquired
+        self.on_lost = on_lost
+        self.ttl = ttl
+        self.heartbeat = min(heartbeat, ttl / 3)
+        self.holder = holder or make_holder_id()
+
+        self.is_leader = False
+        self._valid_until = 0.0
+        self._task = None
+
+    async def start(self):
+        """Запускает цикл захвата и продления аренды"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+            logger.info(f"Lease '{self.name}': candidate {self.holder}")
+
+    async def stop(self):
+        """Останавливает цикл, сворачивает работу и освобождает аренду"""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        if self.is_leader:
+            await self._step_down()
+            try:
+                await db.release_lease(self.name, self.holder)
+            except Exception as e:
+                logger.error(f"Lease '{self.name}': release failed: {e}")
+
+    async def _run(self):
+        while True:
+            try:
+                await self._tick()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"❌ Ошибка продления аренды {self.name}: {e}")
+                logger.error(f"Lease '{self.name}' heartbeat failed: {e}")
+                # Без подтверждения продления лидер работает только до конца аренды
+                if self.is_leader and time.monotonic() >= self._valid_until:
+                    await self._step_down()
+            await asyncio.sleep(self.heartbeat)
+
+    async def _tick(self):
+        """Одна попытка взять или продлить аренду"""
+        started = time.monotonic()
+        held = await db.try_acquire_lease(self.name, self.holder, self.ttl)
+
+        if held:
+            self._valid_until = started + self.ttl
+            if not self.is_leader:
+                self.is_leader = True
+                logger.info(f"Lease '{self.name}' acquired by {self.holder}")
+                try:
+                    await self.on_acquired()
+                except Exception:
+                    await self._step_down()
+                    await db.release_lease(self.name, self.holder)
+                    raise
+        elif self.is_leader:
+            logger.warning(f"Lease '{self.name}' taken over by another process")
+            await self._step_down()
+
+    async def _step_down(self):
+        """Сворачивает работу лидера"""
+        self.is_leader = False
+        try:
+            await self.on_lost()
+        except Exception as e:
+            logger.error(f"Lease '{self.name}': error while stepping down: {e}")
+        logger.info(f"Lease '{self.name}' released by {self.holder}")
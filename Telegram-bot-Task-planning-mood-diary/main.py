@@ -1,17 +1,20 @@
 import asyncio
 import logging
+import signal
 from aiogram import Bot, Dispatcher
 from aiogram.fsm.storage.memory import MemoryStorage
+from cleanup import scheduled_cleanup
 from config import Config
 from database import db
-from reminders import init_reminder_manager
+from leader_lease import LeaderLease
+from reminders import init_reminder_manager, stop_reminder_manager
 from handlers.notifications import router as notification_router
 from handlers.tags import router as tags_router
 from handlers.tasks import router as tasks_router
 from handlers.moods import router as moods_router
 from handlers.statistics import router as stats_router
 from handlers.common import router as common_router
-from datetime import datetime, timedelta
+from handlers.admin import router as admin_router
 
 logging.basicConfig(
     level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
@@ -19,38 +22,72 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
-async def scheduled_cleanup():
-    """Ежедневная автоматическая очистка"""
-    while True:
-        try:
-            now = datetime.now()
-            next_run = now.replace(hour=3, minute=0, second=0, microsecond=0)
-            if now >= next_run:
-                next_run += timedelta(days=1)
-
-            wait_seconds = (next_run - now).total_seconds()
-            await asyncio.sleep(wait_seconds)
-
-            deleted_tasks = await db.cleanup_old_completed_tasks(30)
-            deleted_moods = await db.cleanup_old_moods(90)
-            deleted_removed = await db.cleanup_old_deleted_tasks(30)
-
-            deleted_reminders = await db.cleanup_old_reminders(7)
-
-            logger.info(
-                f"✅ Автоочистка завершена: "
-                f"задач {deleted_tasks}, "
-                f"настроений {deleted_moods}, "
-                f"удаленных {deleted_removed}, "
-                f"напоминаний {deleted_reminders}"
+class BackgroundWork:
+    """Прием обновлений, напоминания и автоочистка, которые выполняет только процесс-лидер"""
+
+    def __init__(self, bot: Bot, dp: Dispatcher, shutdown: asyncio.Event):
+        self.bot = bot
+        self.dp = dp
+        self.shutdown = shutdown
+        self.cleanup_task = None
+        self.polling_task = None
+
+    async def start(self):
+        from handlers.tasks import set_reminder_manager
+
+        reminder_manager_instance = await init_reminder_manager(self.bot)
+        await set_reminder_manager(reminder_manager_instance)
+        self.cleanup_task = asyncio.create_task(scheduled_cleanup())
+        # Обновления принимает только лидер: события задач остаются в его процессе
+        self.polling_task = asyncio.create_task(
+            self.dp.start_polling(
+                self.bot, handle_signals=False, close_bot_session=False
             )
+        )
+        self.polling_task.add_done_callback(self._on_polling_done)
+        logger.info("Фоновые задачи запущены в этом процессе")
+
+    def _on_polling_done(self, task: asyncio.Task):
+        """Polling упал сам по себе: процесс завершается и отдает аренду"""
+        if task is not self.polling_task or task.cancelled():
+            return
+        if task.exception() is not None:
+            logger.error(f"❌ Ошибка приема обновлений: {task.exception()}")
+        self.shutdown.set()
+
+    async def stop(self):
+        from handlers.tasks import set_reminder_manager
 
-        except Exception as e:
-            logger.error(f"❌ Ошибка автоочистки: {e}")
-            await asyncio.sleep(3600)
+        if self.polling_task is not None:
+            polling_task, self.polling_task = self.polling_task, None
+            if not polling_task.done():
+                try:
+                    await self.dp.stop_polling()
+                except RuntimeError:
+                    polling_task.cancel()
+            await asyncio.gather(polling_task, return_exceptions=True)
+        if self.cleanup_task is not None:
+            self.cleanup_task.cancel()
+            await asyncio.gather(self.cleanup_task, return_exceptions=True)
+            self.cleanup_task = None
+        await set_reminder_manager(None)
+        await stop_reminder_manager()
+        logger.info("Фоновые задачи остановлены в этом процессе")
+
+
+def handle_shutdown_signals(shutdown: asyncio.Event):
+    """SIGINT и SIGTERM завершают процесс штатно, с освобождением аренды"""
+    loop = asyncio.get_running_loop()
+    for signal_number in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(signal_number, shutdown.set)
+        except (NotImplementedError, RuntimeError):
+            pass
 
 
 async def main():
+    lease = None
+
     try:
 
         await db.initialize()
@@ -59,12 +96,7 @@ async def main():
         storage = MemoryStorage()
         dp = Dispatcher(storage=storage)
 
-        reminder_manager_instance = await init_reminder_manager(bot)
-        from handlers.tasks import set_reminder_manager
-
-        await set_reminder_manager(reminder_manager_instance)
-
-        asyncio.create_task(scheduled_cleanup())
+        dp.include_router(admin_router)
         dp.include_router(notification_router)
         dp.include_router(tags_router)
         dp.include_router(tasks_router)
@@ -72,17 +104,28 @@ async def main():
         dp.include_router(stats_router)
         dp.include_router(common_router)
 
-        await dp.start_polling(bot)
+        shutdown = asyncio.Event()
+        handle_shutdown_signals(shutdown)
+
+        # Резервные процессы ждут аренду; лидер принимает обновления и шлет напоминания
+        background = BackgroundWork(bot, dp, shutdown)
+        lease = LeaderLease(
+            "background",
+            on_acquired=background.start,
+            on_lost=background.stop,
+            ttl=Config.LEADER_LEASE_TTL,
+            heartbeat=Config.LEADER_HEARTBEAT_INTERVAL,
+        )
+        await lease.start()
+        await shutdown.wait()
 
     except Exception as e:
         logger.error(f"Критическая ошибка при запуске: {e}")
         raise
     finally:
         try:
-            from reminders import reminder_manager
-
-            if reminder_manager:
-                await reminder_manager.stop()
+            if lease:
+                await lease.stop()
                 logger.info("Менеджер напоминаний остановлен")
         except Exception as e:
             logger.error(f"Ошибка при остановке менеджера напоминаний: {e}")
@@ -93,6 +136,12 @@ async def main():
         except Exception as e:
             logger.error(f"Ошибка при закрытии сессии: {e}")
 
+        try:
+            await db.close()
+            logger.info("Соединения с базой данных закрыты")
+        except Exception as e:
+            logger.error(f"Ошибка при закрытии базы данных: {e}")
+
         logger.info("Бот полностью остановлен")
 
 
@@ -0,0 +1,188 @@
+import bisect
+import threading
+import time
+from collections import deque
+
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300, 900)
+RATE_WINDOW_SECONDS = 60
+
+
+def label_key(labels: dict) -> tuple:
+    """Неизменяемый ключ набора меток"""
+    return tuple(sorted((labels or {}).items()))
+
+
+def format_labels(key: tuple) -> str:
+    """Метки в виде {name="value",...}"""
+    if not key:
+        return ""
+    return "{" + ",".join(f'{name}="{value}"' for name, value in key) + "}"
+
+
+class Counter:
+    """Монотонный счетчик с оценкой скорости за последнюю минуту"""
+
+    def __init__(self):
+        self.value = 0
+        self._recent = deque()
+
+    def inc(self, amount: int = 1):
+        self.value += amount
+        second = int(time.monotonic())
+        if self._recent and self._recent[-1][0] == second:
+            self._recent[-1][1] += amount
+        else:
+            self._recent.append([second, amount])
+        self._trim(second)
+
+    def _trim(self, second: int):
+        while self._recent and self._recent[0][0] <= second - RATE_WINDOW_SECONDS:
+            self._recent.popleft()
+
+    def rate(self) -> float:
+        """Среднее число событий в секунду за последние RATE_WINDOW_SECONDS"""
+        self._trim(int(time.monotonic()))
+        return sum(amount for _, amount in self._recent) / RATE_WINDOW_SECONDS
+
+
+class Gauge:
+    """Текущее значение; может вычисляться функцией в момент чтения"""
+
+    def __init__(self, source=None):
+        self.source = source
+        self._value = 0
+
+    def set(self, value):
+        self._value = value
+
+    @property
+    def value(self):
+        return self.source() if self.source is not None else self._value
+
+
+class Histogram:
+    """Гистограмма с фиксированными корзинами и оценкой квантилей"""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float):
+        value = max(0.0, value)
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def quantile(self, q: float):
+        """Квантиль с линейной интерполяцией внутри корзины"""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for index, bucket_count in enumerate(self.counts):
+            if seen + bucket_count >= rank and bucket_count:
+                lower = self.buckets[index - 1] if index > 0 else 0.0
+                upper = self.buckets[index] if index < len(self.buckets) else self.max
+                return lower + (upper - lower) * (rank - seen) / bucket_count
+            seen += bucket_count
+        return self.max
+
+    def share_below(self, threshold: float) -> float:
+        """Доля наблюдений не больше threshold (threshold должен быть границей корзины)"""
+        if not self.count:
+            return 1.0
+        index = bisect.bisect_right(self.buckets, threshold)
+        return sum(self.counts[:index]) / self.count
+
+
+class MetricsRegistry:
+    """Реестр метрик процесса: счетчики, датчики и гистограммы с метками"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._metrics = {}
+        self.started = time.time()
+
+    def _get(self, kind, name: str, labels: dict, factory):
+        key = (name, label_key(labels))
+        metric = self._metrics.get(key)
+        if metric is None:
+            with self._lock:
+                metric = self._metrics.setdefault(key, (kind, factory()))
+        return metric[1]
+
+    def counter(self, name: str, **labels) -> Counter:
+        return self._get("counter", name, labels, Counter)
+
+    def gauge(self, name: str, source=None, **labels) -> Gauge:
+        gauge = self._get("gauge", name, labels, Gauge)
+        if source is not None:
+            gauge.source = source
+        return gauge
+
+    def histogram(self, name: str, buckets=LATENCY_BUCKETS, **labels) -> Histogram:
+        return self._get("histogram", name, labels, lambda: Histogram(buckets))
+
+    def timer(self, name: str, **labels):
+        """Контекстный менеджер, записывающий длительность блока в гистограмму"""
+        return _Timer(self.histogram(name, **labels))
+
+    def snapshot(self) -> dict:
+        """Значения всех метрик в виде словаря"""
+        result = {}
+        for (name, key), (kind, metric) in sorted(self._metrics.items()):
+            full_name = name + format_labels(key)
+            if kind == "counter":
+                result[full_name] = {"value": metric.value, "rate": metric.rate()}
+            elif kind == "gauge":
+                result[full_name] = {"value": metric.value}
+            else:
+                result[full_name] = {
+                    "count": metric.count,
+                    "sum": metric.sum,
+                    "max": metric.max,
+                    "p50": metric.quantile(0.5),
+                    "p95": metric.quantile(0.95),
+                    "p99": metric.quantile(0.99),
+                }
+        return result
+
+    def render(self) -> str:
+        """Текстовый дамп метрик"""
+        lines = [f"uptime {time.time() - self.started:.0f}s"]
+        for name, values in self.snapshot().items():
+            parts = []
+            for field, value in values.items():
+                if value is None:
+                    continue
+                if isinstance(value, float):
+                    value = f"{value:.3f}"
+                parts.append(f"{field}={value}")
+            lines.append(f"{name} {' '.join(parts)}")
+        return "\n".join(lines)
+
+    def reset(self):
+        """Очищает реестр"""
+        with self._lock:
+            self._metrics.clear()
+            self.started = time.time()
+
+
+class _Timer:
+    def __init__(self, histogram: Histogram):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.started)
+        return False
+
+
+metrics = MetricsRegistry()
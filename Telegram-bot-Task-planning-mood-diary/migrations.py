@@ -0,0 +1,861 @@
+import asyncio
+import logging
+import sqlite3
+
+from timeutils import next_daily_ts
+
+logger = logging.getLogger(__name__)
+
+INITIAL_INDEXES = [
+    (
+        "idx_tasks_user_status_due",
+        "CREATE INDEX IF NOT EXISTS idx_tasks_user_status_due "
+        "ON tasks (user_id, status, is_deleted, due_date)",
+    ),
+    (
+        "idx_tasks_pending_due",
+        "CREATE INDEX IF NOT EXISTS idx_tasks_pending_due ON tasks (due_date) "
+        "WHERE status = 'pending' AND is_deleted = 0 AND due_date IS NOT NULL",
+    ),
+    (
+        "idx_tasks_user_created",
+        "CREATE INDEX IF NOT EXISTS idx_tasks_user_created "
+        "ON tasks (user_id, created_at)",
+    ),
+    (
+        "idx_tasks_completed_at",
+        "CREATE INDEX IF NOT EXISTS idx_tasks_completed_at "
+        "ON tasks (completed_at) WHERE status = 'completed'",
+    ),
+    (
+        "idx_tasks_deleted_at",
+        "CREATE INDEX IF NOT EXISTS idx_tasks_deleted_at "
+        "ON tasks (deleted_at) WHERE is_deleted = 1",
+    ),
+    (
+        "idx_reminders_task_type",
+        "CREATE INDEX IF NOT EXISTS idx_reminders_task_type "
+        "ON task_reminders (task_id, reminder_type, sent)",
+    ),
+    (
+        "idx_reminders_unsent_scheduled",
+        "CREATE INDEX IF NOT EXISTS idx_reminders_unsent_scheduled "
+        "ON task_reminders (scheduled_time) WHERE sent = 0",
+    ),
+    (
+        "idx_reminders_sent_at",
+        "CREATE INDEX IF NOT EXISTS idx_reminders_sent_at "
+        "ON task_reminders (sent_at) WHERE sent = 1",
+    ),
+    (
+        "idx_moods_user_date",
+        "CREATE INDEX IF NOT EXISTS idx_moods_user_date ON moods (user_id, date)",
+    ),
+    (
+        "idx_task_tags_tag",
+        "CREATE INDEX IF NOT EXISTS idx_task_tags_tag ON task_tags (tag_id)",
+    ),
+]
+
+TIMESTAMP_INDEXES = [
+    (
+        "idx_tasks_user_status_due_ts",
+        "CREATE INDEX IF NOT EXISTS idx_tasks_user_status_due_ts "
+        "ON tasks (user_id, status, is_deleted, due_ts)",
+    ),
+    (
+        "idx_tasks_pending_due_ts",
+        "CREATE INDEX IF NOT EXISTS idx_tasks_pending_due_ts ON tasks (due_ts) "
+        "WHERE status = 'pending' AND is_deleted = 0 AND due_ts IS NOT NULL",
+    ),
+    (
+        "idx_tasks_user_created_ts",
+        "CREATE INDEX IF NOT EXISTS idx_tasks_user_created_ts "
+        "ON tasks (user_id, created_ts)",
+    ),
+    (
+        "idx_tasks_completed_ts",
+        "CREATE INDEX IF NOT EXISTS idx_tasks_completed_ts "
+        "ON tasks (completed_ts) WHERE status = 'completed'",
+    ),
+    (
+        "idx_reminders_unsent_scheduled_ts",
+        "CREATE INDEX IF NOT EXISTS idx_reminders_unsent_scheduled_ts "
+        "ON task_reminders (scheduled_ts) WHERE sent = 0",
+    ),
+]
+
+DIGEST_INDEXES = [
+    (
+        "idx_reminder_settings_daily_minute",
+        "CREATE INDEX IF NOT EXISTS idx_reminder_settings_daily_minute "
+        "ON reminder_settings (daily_minute, user_id) "
+        "WHERE enable_overdue_reminders = 1",
+    ),
+]
+
+TIMEZONE_INDEXES = [
+    (
+        "idx_reminder_settings_next_digest",
+        "CREATE INDEX IF NOT EXISTS idx_reminder_settings_next_digest "
+        "ON reminder_settings (next_digest_ts) "
+        "WHERE enable_overdue_reminders = 1",
+    ),
+]
+
+RETRY_INDEXES = [
+    (
+        "idx_reminders_dead",
+        "CREATE INDEX IF NOT EXISTS idx_reminders_dead "
+        "ON task_reminders (user_id) WHERE status = 'dead'",
+    ),
+]
+
+COALESCE_INDEXES = [
+    (
+        "idx_reminders_user_pending",
+        "CREATE INDEX IF NOT EXISTS idx_reminders_user_pending "
+        "ON task_reminders (user_id, scheduled_ts) WHERE sent = 0",
+    ),
+]
+
+RECURRENCE_INDEXES = [
+    (
+        "idx_tasks_series",
+        "CREATE INDEX IF NOT EXISTS idx_tasks_series "
+        "ON tasks (user_id, series_id, due_ts) WHERE series_id IS NOT NULL",
+    ),
+]
+
+SUPERSEDED_INDEXES = [
+    "idx_tasks_user_status_due",
+    "idx_tasks_pending_due",
+    "idx_tasks_user_created",
+    "idx_tasks_completed_at",
+    "idx_reminders_unsent_scheduled",
+]
+
+# Индексы, которые удаляет одна из поздних миграций: новая база их не строит
+DROPPED_INDEXES = SUPERSEDED_INDEXES + ["idx_reminder_settings_daily_minute"]
+
+
+class Migration:
+    """Один шаг миграции схемы; онлайн-шаг идет в фоне, но занимает писателя"""
+
+    def __init__(
+        self,
+        version: int,
+        description: str,
+        apply,
+        online: bool = False,
+        index: tuple = None,
+    ):
+        self.version = version
+        self.description = description
+        self.apply = apply
+        self.online = online
+        self.index = index
+
+
+async def column_exists(db, table: str, column: str) -> bool:
+    """Проверяет наличие колонки в таблице"""
+    cursor = await db.execute(f"PRAGMA table_info({table})")
+    return any(row[1] == column for row in await cursor.fetchall())
+
+
+async def baseline_schema(db):
+    """Исходная схема: таблицы, существовавшие до появления миграций"""
+    await db.execute(
+        """
+        CREATE TABLE IF NOT EXISTS users (
+            id INTEGER PRIMARY KEY,
+            username TEXT,
+            first_name TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """
+    )
+
+    await db.execute(
+        """
+        CREATE TABLE IF NOT EXISTS tasks (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER,
+            content TEXT NOT NULL,
+            due_date TIMESTAMP,
+            priority TEXT DEFAULT 'medium',
+            status TEXT DEFAULT 'pending',
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            completed_at TIMESTAMP,
+            sent BOOLEAN DEFAULT 0,
+            is_deleted BOOLEAN DEFAULT 0,
+            deleted_at TIMESTAMP,
+            FOREIGN KEY (user_id) REFERENCES users (id)
+        );
+
+    """
+    )
+
+    await db.execute(
+        """
+        CREATE TABLE IF NOT EXISTS moods (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER,
+            mood TEXT NOT NULL,
+            notes TEXT,
+            date DATE DEFAULT CURRENT_DATE,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (user_id) REFERENCES users (id)
+        )
+    """
+    )
+
+    await db.execute(
+        """
+        CREATE TABLE IF NOT EXISTS tags (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER,
+            name TEXT NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (user_id) REFERENCES users (id),
+            UNIQUE(user_id, name)
+        )
+    """
+    )
+
+    await db.execute(
+        """
+        CREATE TABLE IF NOT EXISTS task_tags (
+            task_id INTEGER,
+            tag_id INTEGER,
+            PRIMARY KEY (task_id, tag_id),
+            FOREIGN KEY (task_id) REFERENCES tasks (id) ON DELETE CASCADE,
+            FOREIGN KEY (tag_id) REFERENCES tags (id) ON DELETE CASCADE
+        )
+    """
+    )
+
+    await db.execute(
+        """
+        CREATE TABLE IF NOT EXISTS task_reminders (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            task_id INTEGER NOT NULL,
+            reminder_type TEXT NOT NULL DEFAULT 'deadline',
+            scheduled_time DATETIME NOT NULL,
+            sent BOOLEAN DEFAULT 0,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            sent_at DATETIME NULL,
+            FOREIGN KEY (user_id) REFERENCES users (id),
+            FOREIGN KEY (task_id) REFERENCES tasks (id) ON DELETE CASCADE
+        )
+    """
+    )
+    await db.execute(
+        """
+        CREATE TABLE IF NOT EXISTS reminder_settings (
+            user_id INTEGER PRIMARY KEY,
+            enable_reminders BOOLEAN DEFAULT 1,
+            reminder_before_hours INTEGER DEFAULT 1,
+            enable_overdue_reminders BOOLEAN DEFAULT 1,
+            daily_overdue_time TEXT DEFAULT '09:00',
+            overdue_reminder_interval_hours INTEGER DEFAULT 24,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (user_id) REFERENCES users (id)
+        )
+        """
+    )
+
+
+async def add_last_overdue_notification(db):
+    """Добавляет колонку времени последнего уведомления о просрочке"""
+    if not await column_exists(db, "tasks", "last_overdue_notification"):
+        await db.execute("ALTER TABLE tasks ADD COLUMN last_overdue_notification TEXT")
+
+
+async def add_epoch_timestamps(db):
+    """Добавляет целочисленные колонки времени (секунды эпохи) и заполняет их"""
+    columns = [
+        ("tasks", "due_ts"),
+        ("tasks", "created_ts"),
+        ("tasks", "completed_ts"),
+        ("task_reminders", "scheduled_ts"),
+    ]
+    for table, column in columns:
+        if not await column_exists(db, table, column):
+            await db.execute(f"ALTER TABLE {table} ADD COLUMN {column} INTEGER")
+
+    # due_date и scheduled_time хранятся в локальном времени, created_at и
+    # completed_at заполнялись CURRENT_TIMESTAMP, то есть уже в UTC
+    await db.execute(
+        """
+        UPDATE tasks SET
+            due_ts = CAST(strftime('%s', due_date, 'utc') AS INTEGER),
+            created_ts = CAST(strftime('%s', created_at) AS INTEGER),
+            completed_ts = CAST(strftime('%s', completed_at) AS INTEGER)
+        WHERE due_ts IS NULL AND created_ts IS NULL
+        """
+    )
+    await db.execute(
+        """
+        UPDATE task_reminders
+        SET scheduled_ts = CAST(strftime('%s', scheduled_time, 'utc') AS INTEGER)
+        WHERE scheduled_ts IS NULL
+        """
+    )
+
+
+async def add_daily_digest_schedule(db):
+    """Минута ежедневной сводки, настройки для всех пользователей и состояние воркеров"""
+    if not await column_exists(db, "reminder_settings", "daily_minute"):
+        await db.execute(
+            "ALTER TABLE reminder_settings ADD COLUMN daily_minute INTEGER DEFAULT 540"
+        )
+
+    await db.execute(
+        "INSERT OR IGNORE INTO reminder_settings (user_id) SELECT id FROM users"
+    )
+    await db.execute(
+        """
+        UPDATE reminder_settings SET daily_minute =
+            CAST(substr(daily_overdue_time, 1, instr(daily_overdue_time, ':') - 1) AS INTEGER) * 60
+            + CAST(substr(daily_overdue_time, instr(daily_overdue_time, ':') + 1) AS INTEGER)
+        WHERE instr(daily_overdue_time, ':') > 0
+        """
+    )
+
+    await db.execute(
+        """
+        CREATE TABLE IF NOT EXISTS worker_state (
+            name TEXT PRIMARY KEY,
+            value INTEGER,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """
+    )
+
+
+async def add_user_timezones(db):
+    """Часовой пояс пользователя, UTC-время следующей сводки и время последней сводки"""
+    for column in ("timezone", "next_digest_ts"):
+        if not await column_exists(db, "reminder_settings", column):
+            column_type = "TEXT" if column == "timezone" else "INTEGER"
+            await db.execute(
+                f"ALTER TABLE reminder_settings ADD COLUMN {column} {column_type}"
+            )
+    if not await column_exists(db, "tasks", "last_overdue_ts"):
+        await db.execute("ALTER TABLE tasks ADD COLUMN last_overdue_ts INTEGER")
+
+    # last_overdue_notification заполнялся datetime('now'), то есть в UTC
+    await db.execute(
+        """
+        UPDATE tasks
+        SET last_overdue_ts = CAST(strftime('%s', last_overdue_notification) AS INTEGER)
+        WHERE last_overdue_notification IS NOT NULL AND last_overdue_ts IS NULL
+        """
+    )
+
+    cursor = await db.execute(
+        "SELECT user_id, daily_minute, timezone FROM reminder_settings "
+        "WHERE next_digest_ts IS NULL"
+    )
+    rows = await cursor.fetchall()
+    await db.executemany(
+        "UPDATE reminder_settings SET next_digest_ts = ? WHERE user_id = ?",
+        [
+            (next_daily_ts(daily_minute or 540, timezone), user_id)
+            for user_id, daily_minute, timezone in rows
+        ],
+    )
+
+
+async def add_reminder_retry_state(db):
+    """Счетчик попыток, время следующей попытки, последняя ошибка и статус напоминания"""
+    columns = [
+        ("attempts", "INTEGER NOT NULL DEFAULT 0"),
+        ("next_attempt_ts", "INTEGER"),
+        ("last_error", "TEXT"),
+        ("status", "TEXT NOT NULL DEFAULT 'pending'"),
+    ]
+    for column, column_type in columns:
+        if not await column_exists(db, "task_reminders", column):
+            await db.execute(
+                f"ALTER TABLE task_reminders ADD COLUMN {column} {column_type}"
+            )
+
+
+async def add_leases(db):
+    """Таблица аренды лидерства для фоновых воркеров"""
+    await db.execute(
+        """
+        CREATE TABLE IF NOT EXISTS leases (
+            name TEXT PRIMARY KEY,
+            holder TEXT NOT NULL,
+            expires_ts INTEGER NOT NULL,
+            heartbeat_ts INTEGER NOT NULL,
+            acquired_ts INTEGER NOT NULL
+        )
+        """
+    )
+
+
+async def add_reminder_claims(db):
+    """Владелец и срок заявки на отправку напоминания"""
+    for column, column_type in (
+        ("claimed_by", "TEXT"),
+        ("claim_expires_ts", "INTEGER"),
+    ):
+        if not await column_exists(db, "task_reminders", column):
+            await db.execute(
+                f"ALTER TABLE task_reminders ADD COLUMN {column} {column_type}"
+            )
+    await db.execute(
+        "UPDATE task_reminders SET status = 'sent' WHERE sent = 1 AND status = 'pending'"
+    )
+
+
+async def add_reminder_offsets(db):
+    """Несколько отступов напоминаний о дедлайне и отступ каждого напоминания"""
+    if not await column_exists(db, "reminder_settings", "reminder_offsets"):
+        await db.execute(
+            "ALTER TABLE reminder_settings ADD COLUMN reminder_offsets TEXT"
+        )
+    if not await column_exists(db, "task_reminders", "offset_minutes"):
+        await db.execute("ALTER TABLE task_reminders ADD COLUMN offset_minutes INTEGER")
+
+    await db.execute(
+        """
+        UPDATE task_reminders SET offset_minutes = (
+            SELECT (t.due_ts - task_reminders.scheduled_ts) / 60
+            FROM tasks t WHERE t.id = task_reminders.task_id
+        )
+        WHERE reminder_type = 'deadline' AND offset_minutes IS NULL
+        """
+    )
+
+
+async def add_task_recurrence(db):
+    """Правило повторения задачи и общий идентификатор серии повторений"""
+    for column, column_type in (("recurrence", "TEXT"), ("series_id", "INTEGER")):
+        if not await column_exists(db, "tasks", column):
+            await db.execute(f"ALTER TABLE tasks ADD COLUMN {column} {column_type}")
+
+
+MOOD_SCORE_SQL = """CASE {mood}
+    WHEN 'отлично' THEN 5 WHEN 'хорошо' THEN 4 WHEN 'нормально' THEN 3
+    WHEN 'плохо' THEN 2 WHEN 'ужасно' THEN 1 ELSE 3 END"""
+DAILY_STATS_PRIORITIES = ("high", "medium", "low")
+
+
+def daily_stats_task_delta(row: str, sign: str) -> str:
+    """Инструкции триггера, прибавляющие (+) или вычитающие (-) вклад задачи row (NEW/OLD) в user_daily_stats"""
+    live = f"COALESCE({row}.is_deleted, 0) = 0"
+    priority = f"COALESCE({row}.priority, 'medium')"
+    done = f"({row}.status = 'completed')"
+    created_day = f"date({row}.created_ts, 'unixepoch', 'localtime')"
+    completed_day = f"date({row}.completed_ts, 'unixepoch', 'localtime')"
+    by_priority = ", ".join(
+        f"{name} = {name} {sign} ({priority} = '{name}'), "
+        f"{name}_completed = {name}_completed {sign} ({priority} = '{name}' AND {done})"
+        for name in DAILY_STATS_PRIORITIES
+    )
+    return f"""
+        INSERT OR IGNORE INTO user_daily_stats (user_id, day)
+        SELECT {row}.user_id, {created_day}
+        WHERE {live} AND {row}.created_ts IS NOT NULL;
+        UPDATE user_daily_stats SET
+            created = created {sign} 1,
+            {by_priority}
+        WHERE {live} AND user_id = {row}.user_id AND day = {created_day};
+        INSERT OR IGNORE INTO user_daily_stats (user_id, day)
+        SELECT {row}.user_id, {completed_day}
+        WHERE {live} AND {done} AND {row}.completed_ts IS NOT NULL;
+        UPDATE user_daily_stats SET
+            completed = completed {sign} 1,
+            overdue = overdue {sign} ({row}.due_ts IS NOT NULL AND {row}.completed_ts > {row}.due_ts)
+        WHERE {live} AND {done} AND user_id = {row}.user_id AND day = {completed_day};
+    """
+
+
+def daily_stats_mood_upsert() -> str:
+    """Инструкции триггера, записывающие настроение NEW в user_daily_stats"""
+    return f"""
+        INSERT INTO user_daily_stats (user_id, day, mood, mood_score)
+        VALUES (NEW.user_id, NEW.date, NEW.mood, {MOOD_SCORE_SQL.format(mood="NEW.mood")})
+        ON CONFLICT (user_id, day) DO UPDATE SET
+            mood = excluded.mood, mood_score = excluded.mood_score;
+    """
+
+
+async def add_user_daily_stats(db):
+    """Дневные агрегаты пользователя, которые триггеры обновляют при каждой записи"""
+    by_priority = "".join(
+        f"            {name} INTEGER NOT NULL DEFAULT 0,\n"
+        f"            {name}_completed INTEGER NOT NULL DEFAULT 0,\n"
+        for name in DAILY_STATS_PRIORITIES
+    )
+    # created и приоритеты - по дню создания задачи, completed/overdue - по дню
+    # выполнения (overdue - выполнены после срока); день везде по времени сервера,
+    # как у сроков задач и записей настроения
+    await db.execute(
+        f"""
+        CREATE TABLE IF NOT EXISTS user_daily_stats (
+            user_id INTEGER NOT NULL,
+            day TEXT NOT NULL,
+            created INTEGER NOT NULL DEFAULT 0,
+            completed INTEGER NOT NULL DEFAULT 0,
+            overdue INTEGER NOT NULL DEFAULT 0,
+{by_priority}            mood TEXT,
+            mood_score INTEGER,
+            PRIMARY KEY (user_id, day)
+        ) WITHOUT ROWID
+        """
+    )
+
+    # Триггеров на DELETE нет: очистка старых строк не должна стирать историю
+    await db.execute(
+        f"""
+        CREATE TRIGGER IF NOT EXISTS trg_tasks_daily_stats_insert
+        AFTER INSERT ON tasks
+        BEGIN {daily_stats_task_delta("NEW", "+")} END
+        """
+    )
+    await db.execute(
+        f"""
+        CREATE TRIGGER IF NOT EXISTS trg_tasks_daily_stats_update
+        AFTER UPDATE OF status, is_deleted, priority, created_ts, completed_ts, due_ts
+        ON tasks
+        WHEN OLD.status IS NOT NEW.status
+            OR OLD.is_deleted IS NOT NEW.is_deleted
+            OR OLD.priority IS NOT NEW.priority
+            OR OLD.created_ts IS NOT NEW.created_ts
+            OR OLD.completed_ts IS NOT NEW.completed_ts
+            OR (NEW.status = 'completed' AND OLD.due_ts IS NOT NEW.due_ts)
+        BEGIN {daily_stats_task_delta("OLD", "-")} {daily_stats_task_delta("NEW", "+")} END
+        """
+    )
+    for event in ("INSERT", "UPDATE OF mood, date"):
+        name = event.split()[0].lower()
+        await db.execute(
+            f"""
+            CREATE TRIGGER IF NOT EXISTS trg_moods_daily_stats_{name}
+            AFTER {event} ON moods
+            BEGIN {daily_stats_mood_upsert()} END
+            """
+        )
+
+    await backfill_user_daily_stats(db)
+
+
+async def backfill_user_daily_stats(db, user_id: int = None):
+    """Пересчитывает user_daily_stats по сохранившимся строкам задач и настроений"""
+    # Счетчики только растут: за дни, где старые строки уже удалены очисткой,
+    # в агрегатах остается больше, чем можно пересчитать
+    user_filter = "" if user_id is None else "AND user_id = ?"
+    params = () if user_id is None else (user_id,)
+    priority = "COALESCE(priority, 'medium')"
+    priority_columns = [
+        column
+        for name in DAILY_STATS_PRIORITIES
+        for column in (name, f"{name}_completed")
+    ]
+    priority_sums = ", ".join(
+        f"SUM({priority} = '{name}'), "
+        f"SUM({priority} = '{name}' AND status = 'completed')"
+        for name in DAILY_STATS_PRIORITIES
+    )
+
+    def keep_max(columns):
+        return ", ".join(
+            f"{column} = MAX({column}, excluded.{column})" for column in columns
+        )
+
+    created_columns = ["created"] + priority_columns
+    await db.execute(
+        f"""
+        INSERT INTO user_daily_stats (user_id, day, {", ".join(created_columns)})
+        SELECT user_id, date(created_ts, 'unixepoch', 'localtime'),
+            COUNT(*), {priority_sums}
+        FROM tasks
+        WHERE is_deleted = 0 AND created_ts IS NOT NULL {user_filter}
+        GROUP BY 1, 2
+        ON CONFLICT (user_id, day) DO UPDATE SET {keep_max(created_columns)}
+        """,
+        params,
+    )
+    await db.execute(
+        f"""
+        INSERT INTO user_daily_stats (user_id, day, completed, overdue)
+        SELECT user_id, date(completed_ts, 'unixepoch', 'localtime'),
+            COUNT(*), SUM(due_ts IS NOT NULL AND completed_ts > due_ts)
+        FROM tasks
+        WHERE is_deleted = 0 AND status = 'completed'
+        AND completed_ts IS NOT NULL {user_filter}
+        GROUP BY 1, 2
+        ON CONFLICT (user_id, day) DO UPDATE SET {keep_max(["completed", "overdue"])}
+        """,
+        params,
+    )
+    await db.execute(
+        f"""
+        INSERT INTO user_daily_stats (user_id, day, mood, mood_score)
+        SELECT user_id, date, mood, {MOOD_SCORE_SQL.format(mood="mood")}
+        FROM moods
+        WHERE date IS NOT NULL {user_filter}
+        ORDER BY id
+        ON CONFLICT (user_id, day) DO UPDATE SET
+            mood = excluded.mood, mood_score = excluded.mood_score
+        """,
+        params,
+    )
+
+
+USER_DATA_VERSION_TRIGGERS = [
+    ("tasks_insert", "INSERT ON tasks", "NEW.user_id"),
+    (
+        "tasks_update",
+        "UPDATE OF content, priority, status, is_deleted, created_ts, completed_ts, "
+        "due_ts, recurrence, series_id ON tasks",
+        "NEW.user_id",
+    ),
+    ("tasks_delete", "DELETE ON tasks", "OLD.user_id"),
+    ("moods_insert", "INSERT ON moods", "NEW.user_id"),
+    ("moods_update", "UPDATE ON moods", "NEW.user_id"),
+    ("moods_delete", "DELETE ON moods", "OLD.user_id"),
+    ("tags_insert", "INSERT ON tags", "NEW.user_id"),
+    ("tags_update", "UPDATE OF name ON tags", "NEW.user_id"),
+    ("tags_delete", "DELETE ON tags", "OLD.user_id"),
+    (
+        "task_tags_insert",
+        "INSERT ON task_tags",
+        "(SELECT user_id FROM tasks WHERE id = NEW.task_id)",
+    ),
+    (
+        "task_tags_delete",
+        "DELETE ON task_tags",
+        "(SELECT user_id FROM tasks WHERE id = OLD.task_id)",
+    ),
+]
+
+
+async def add_user_data_versions(db):
+    """Счетчик изменений данных пользователя, по которому кэш аналитики проверяет свежесть"""
+    await db.execute(
+        """
+        CREATE TABLE IF NOT EXISTS user_data_versions (
+            user_id INTEGER PRIMARY KEY,
+            version INTEGER NOT NULL DEFAULT 0
+        )
+        """
+    )
+    for name, event, user_id in USER_DATA_VERSION_TRIGGERS:
+        await db.execute(
+            f"""
+            CREATE TRIGGER IF NOT EXISTS trg_{name}_data_version
+            AFTER {event}
+            BEGIN
+                INSERT INTO user_data_versions (user_id, version)
+                SELECT {user_id}, 1 WHERE {user_id} IS NOT NULL
+                ON CONFLICT (user_id) DO UPDATE SET version = version + 1;
+            END
+            """
+        )
+
+
+async def drop_superseded_indexes(db):
+    """Удаляет индексы по текстовым датам, замененные индексами по эпохе"""
+    for name in SUPERSEDED_INDEXES:
+        await db.execute(f"DROP INDEX IF EXISTS {name}")
+
+
+def create_index(index_sql: str):
+    """Создает шаг миграции, строящий один индекс"""
+
+    async def apply(db):
+        await db.execute(index_sql)
+
+    return apply
+
+
+def index_migration(version: int, name: str, index_sql: str) -> Migration:
+    """Онлайн-шаг, строящий индекс; замененные позже индексы новая база не строит"""
+    apply = skip_step if name in DROPPED_INDEXES else create_index(index_sql)
+    return Migration(
+        version, f"index {name}", apply, online=True, index=(name, index_sql)
+    )
+
+
+async def skip_step(db):
+    """Пустой шаг: версия записывается, схема не меняется"""
+
+
+def drop_index(name: str):
+    """Создает шаг миграции, удаляющий один индекс"""
+
+    async def apply(db):
+        await db.execute(f"DROP INDEX IF EXISTS {name}")
+
+    return apply
+
+
+MIGRATIONS = [
+    Migration(1, "baseline schema", baseline_schema),
+    Migration(2, "tasks.last_overdue_notification", add_last_overdue_notification),
+] + [
+    index_migration(3 + i, name, index_sql)
+    for i, (name, index_sql) in enumerate(INITIAL_INDEXES)
+]
+MIGRATIONS += [
+    Migration(13, "epoch timestamp columns", add_epoch_timestamps),
+] + [
+    index_migration(14 + i, name, index_sql)
+    for i, (name, index_sql) in enumerate(TIMESTAMP_INDEXES)
+]
+MIGRATIONS += [
+    Migration(19, "drop text date indexes", drop_superseded_indexes, online=True),
+    Migration(20, "daily digest schedule", add_daily_digest_schedule),
+] + [
+    index_migration(21 + i, name, index_sql)
+    for i, (name, index_sql) in enumerate(DIGEST_INDEXES)
+]
+MIGRATIONS += [
+    Migration(22, "user timezones", add_user_timezones),
+] + [
+    index_migration(23 + i, name, index_sql)
+    for i, (name, index_sql) in enumerate(TIMEZONE_INDEXES)
+]
+MIGRATIONS += [
+    Migration(
+        24,
+        "drop index idx_reminder_settings_daily_minute",
+        drop_index("idx_reminder_settings_daily_minute"),
+        online=True,
+    ),
+    Migration(25, "reminder retry state", add_reminder_retry_state),
+] + [
+    index_migration(26 + i, name, index_sql)
+    for i, (name, index_sql) in enumerate(RETRY_INDEXES)
+]
+MIGRATIONS += [
+    Migration(27, "leader leases", add_leases),
+    Migration(28, "reminder send claims", add_reminder_claims),
+] + [
+    index_migration(29 + i, name, index_sql)
+    for i, (name, index_sql) in enumerate(COALESCE_INDEXES)
+]
+MIGRATIONS += [
+    Migration(30, "reminder offsets", add_reminder_offsets),
+]
+MIGRATIONS += [
+    Migration(31, "recurring tasks", add_task_recurrence),
+] + [
+    index_migration(32 + i, name, index_sql)
+    for i, (name, index_sql) in enumerate(RECURRENCE_INDEXES)
+]
+MIGRATIONS += [
+    Migration(33, "user daily stats", add_user_daily_stats),
+    Migration(34, "user data versions", add_user_data_versions),
+]
+
+
+# Индексы итоговой схемы в порядке миграций (для бенчмарков)
+INDEXES = [
+    migration.index
+    for migration in MIGRATIONS
+    if migration.index and migration.index[0] not in DROPPED_INDEXES
+]
+
+
+class MigrationRunner:
+    """Применяет недостающие миграции через писателя базы данных"""
+
+    def __init__(self, pool, writer, migrations=None):
+        self.pool = pool
+        self.writer = writer
+        self.migrations = migrations if migrations is not None else MIGRATIONS
+        self._online_task = None
+
+    async def get_applied_versions(self) -> set:
+        """Возвращает номера уже примененных миграций"""
+        async with self.pool.acquire() as db:
+            try:
+                cursor = await db.execute("SELECT version FROM schema_version")
+            except sqlite3.OperationalError:
+                return set()
+            return {row[0] for row in await cursor.fetchall()}
+
+    async def _ensure_version_table(self):
+        async def _write(db):
+            await db.execute(
+                """
+                CREATE TABLE IF NOT EXISTS schema_version (
+                    version INTEGER PRIMARY KEY,
+                    description TEXT NOT NULL,
+                    applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+                """
+            )
+
+        await self.writer.submit(_write)
+
+    async def _apply(self, migration: Migration):
+        """Применяет шаг и записывает его версию в одной транзакции"""
+
+        async def _write(db):
+            await migration.apply(db)
+            await db.execute(
+                "INSERT OR IGNORE INTO schema_version (version, description) VALUES (?, ?)",
+                (migration.version, migration.description),
+            )
+
+        started = asyncio.get_running_loop().time()
+        await self.writer.submit(_write)
+        elapsed = asyncio.get_running_loop().time() - started
+        logger.info(
+            f"Migration {migration.version} applied: {migration.description} ({elapsed:.2f}s)"
+        )
+
+    async def migrate(self):
+        """Применяет блокирующие миграции и запускает онлайн-миграции в фоне"""
+        applied = await self.get_applied_versions()
+        pending = [m for m in self.migrations if m.version not in applied]
+
+        if not pending:
+            logger.info(f"Database schema is current (version {max(applied)})")
+            return
+
+        await self._ensure_version_table()
+
+        for migration in pending:
+            if not migration.online:
+                await self._apply(migration)
+
+        online = [m for m in pending if m.online]
+        if online:
+            self._online_task = asyncio.create_task(self._run_online(online))
+
+    async def _run_online(self, migrations):
+        """Применяет онлайн-миграции по одной, не задерживая запуск бота"""
+        # SQLite допускает одного писателя: пока строится индекс, записи
+        # пользователей ждут в очереди писателя и выполняются после шага.
+        for migration in migrations:
+            try:
+                await self._apply(migration)
+            except Exception as e:
+                logger.error(f"Online migration {migration.version} failed: {e}")
+                return
+
+    async def wait_online(self):
+        """Дожидается завершения онлайн-миграций"""
+        if self._online_task is not None:
+            await self._online_task
+
+    async def stop(self):
+        """Прерывает фоновые онлайн-миграции при остановке"""
+        if self._online_task is not None and not self._online_task.done():
+            self._online_task.cancel()
+            try:
+                await self._online_task
+            except asyncio.CancelledError:
+                pass
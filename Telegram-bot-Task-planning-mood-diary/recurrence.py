@@ -0,0 +1,124 @@
+import re
+from calendar import monthrange
+from datetime import datetime, timedelta
+
+# Правило повторения хранится в tasks.recurrence компактной строкой:
+# D:3 - каждые 3 дня, W:0,2,4 - по пн, ср, пт, M:15 - каждый месяц 15 числа
+RULE_PATTERN = re.compile(r"^(D|W|M):(\d+(?:,\d+)*)$")
+EVERY_DAYS_PATTERN = re.compile(r"^(?:каждые\s+)?(\d+)\s*(?:д|дн|дня|дней|d)$")
+MONTH_DAY_PATTERN = re.compile(
+    r"^(?:(?:ежемесячно|каждый месяц)\s+)?(\d{1,2})(?:\s+числа)?$"
+)
+MAX_EVERY_DAYS = 365
+
+WEEKDAYS = {
+    "пн": 0,
+    "вт": 1,
+    "ср": 2,
+    "чт": 3,
+    "пт": 4,
+    "сб": 5,
+    "вс": 6,
+}
+WEEKDAY_NAMES = {number: name for name, number in WEEKDAYS.items()}
+DAILY_WORDS = ("ежедневно", "каждый день", "daily")
+WEEKLY_WORDS = ("еженедельно", "каждую неделю", "weekly")
+MONTHLY_WORDS = ("ежемесячно", "каждый месяц", "monthly")
+WORKDAYS_WORDS = ("будни", "по будням")
+
+
+def normalize_rule(rule: str):
+    """Проверяет компактное правило и приводит его к каноническому виду или None"""
+    match = RULE_PATTERN.match((rule or "").strip().upper())
+    if not match:
+        return None
+
+    kind, args = match.group(1), [int(value) for value in match.group(2).split(",")]
+    if kind == "D" and len(args) == 1 and 1 <= args[0] <= MAX_EVERY_DAYS:
+        return f"D:{args[0]}"
+    if kind == "W" and all(0 <= day <= 6 for day in args):
+        return "W:" + ",".join(str(day) for day in sorted(set(args)))
+    if kind == "M" and len(args) == 1 and 1 <= args[0] <= 31:
+        return f"M:{args[0]}"
+    return None
+
+
+def parse_rule(value: str, due_date: datetime = None):
+    """Разбирает ввод пользователя (ежедневно, 3 дня, пн ср пт, 15 числа) в правило или None"""
+    value = (value or "").strip().lower()
+    if not value:
+        return None
+
+    if value in DAILY_WORDS:
+        return "D:1"
+    if value in WORKDAYS_WORDS:
+        return "W:0,1,2,3,4"
+    if value in WEEKLY_WORDS:
+        return f"W:{due_date.weekday()}" if due_date else None
+    if value in MONTHLY_WORDS:
+        return f"M:{due_date.day}" if due_date else None
+
+    match = EVERY_DAYS_PATTERN.match(value)
+    if match:
+        return normalize_rule(f"D:{match.group(1)}")
+
+    if "числ" in value or value.startswith(MONTHLY_WORDS):
+        match = MONTH_DAY_PATTERN.match(value)
+        return normalize_rule(f"M:{match.group(1)}") if match else None
+
+    days = [part for part in re.split(r"[\s,;]+", value) if part]
+    if days and all(day in WEEKDAYS for day in days):
+        return normalize_rule("W:" + ",".join(str(WEEKDAYS[day]) for day in days))
+
+    return normalize_rule(value)
+
+
+def describe_rule(rule: str) -> str:
+    """Правило повторения в читаемом виде"""
+    rule = normalize_rule(rule)
+    if rule is None:
+        return "без повтора"
+
+    kind, args = rule[0], [int(value) for value in rule[2:].split(",")]
+    if kind == "D":
+        return "каждый день" if args[0] == 1 else f"каждые {args[0]} дн."
+    if kind == "W":
+        if args == [0, 1, 2, 3, 4]:
+            return "по будням"
+        return "по " + ", ".join(WEEKDAY_NAMES[day] for day in args)
+    return f"каждый месяц {args[0]} числа"
+
+
+def _step(kind: str, args: list, current: datetime) -> datetime:
+    """Следующая после current дата по правилу; время суток сохраняется"""
+    if kind == "D":
+        return current + timedelta(days=args[0])
+
+    if kind == "W":
+        for shift in range(1, 8):
+            candidate = current + timedelta(days=shift)
+            if candidate.weekday() in args:
+                return candidate
+
+    year, month = current.year, current.month
+    for _ in range(2):
+        # В коротких месяцах 31 число переносится на последний день месяца
+        day = min(args[0], monthrange(year, month)[1])
+        candidate = current.replace(year=year, month=month, day=day)
+        if candidate > current:
+            return candidate
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+    return candidate
+
+
+def next_occurrence(rule: str, previous: datetime, now: datetime = None):
+    """Срок следующего повторения после previous; пропущенные повторения до now не создаются"""
+    rule = normalize_rule(rule)
+    if rule is None or previous is None:
+        return None
+
+    kind, args = rule[0], [int(value) for value in rule[2:].split(",")]
+    occurrence = _step(kind, args, previous)
+    while now is not None and occurrence <= now:
+        occurrence = _step(kind, args, occurrence)
+    return occurrence
@@ -0,0 +1,111 @@
+import asyncio
+import heapq
+
+from clock import get_clock
+
+MAX_SLEEP_SECONDS = 300
+
+
+class ReminderScheduler:
+    """Минимальная куча времени срабатывания неотправленных напоминаний"""
+
+    def __init__(self, max_sleep: float = MAX_SLEEP_SECONDS, clock=None):
+        self.max_sleep = max_sleep
+        self.clock = clock or get_clock()
+        self._heap = []
+        self._entries = {}
+        self._by_task = {}
+        self._wakeup = asyncio.Event()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, reminder_id):
+        return reminder_id in self._entries
+
+    def fire_ts(self, reminder_id: int):
+        """Запланированное время напоминания или None"""
+        entry = self._entries.get(reminder_id)
+        return entry[0] if entry is not None else None
+
+    def schedule(self, reminder_id: int, task_id: int, fire_ts: int):
+        """Добавляет или переносит напоминание"""
+        self.cancel(reminder_id)
+        self._entries[reminder_id] = (fire_ts, task_id)
+        self._by_task.setdefault(task_id, set()).add(reminder_id)
+        heapq.heappush(self._heap, (fire_ts, reminder_id))
+
+        if self._heap[0] == (fire_ts, reminder_id):
+            self._wakeup.set()
+
+    def cancel(self, reminder_id: int):
+        """Убирает напоминание; запись в куче удаляется лениво"""
+        entry = self._entries.pop(reminder_id, None)
+        if entry is None:
+            return False
+        task_reminders = self._by_task.get(entry[1])
+        if task_reminders is not None:
+            task_reminders.discard(reminder_id)
+            if not task_reminders:
+                del self._by_task[entry[1]]
+        return True
+
+    def cancel_task(self, task_id: int) -> list:
+        """Убирает все напоминания задачи и возвращает их id"""
+        reminder_ids = list(self._by_task.get(task_id, ()))
+        for reminder_id in reminder_ids:
+            self.cancel(reminder_id)
+        return reminder_ids
+
+    def clear(self):
+        """Очищает расписание"""
+        self._heap.clear()
+        self._entries.clear()
+        self._by_task.clear()
+        self._wakeup.set()
+
+    def _drop_stale(self):
+        """Снимает с вершины кучи отмененные и перенесенные записи"""
+        while self._heap:
+            fire_ts, reminder_id = self._heap[0]
+            entry = self._entries.get(reminder_id)
+            if entry is not None and entry[0] == fire_ts:
+                return
+            heapq.heappop(self._heap)
+
+    def next_fire_ts(self):
+        """Время ближайшего срабатывания или None"""
+        self._drop_stale()
+        return self._heap[0][0] if self._heap else None
+
+    def pop_due(self, now: float = None) -> list:
+        """Достает id всех напоминаний, время которых наступило"""
+        now = self.clock.time() if now is None else now
+        due = []
+        while True:
+            fire_ts = self.next_fire_ts()
+            if fire_ts is None or fire_ts > now:
+                break
+            _, reminder_id = heapq.heappop(self._heap)
+            self.cancel(reminder_id)
+            due.append(reminder_id)
+        return due
+
+    async def wait_next(self):
+        """Спит до ближайшего срабатывания или до изменения расписания"""
+        self._wakeup.clear()
+        fire_ts = self.next_fire_ts()
+        if fire_ts is None:
+            timeout = self.max_sleep
+        else:
+            timeout = min(max(0.0, fire_ts - self.clock.time()), self.max_sleep)
+        if timeout <= 0:
+            return
+        try:
+            await self.clock.wait_for(self._wakeup.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    def wake(self):
+        """Будит ожидающий цикл отправки"""
+        self._wakeup.set()
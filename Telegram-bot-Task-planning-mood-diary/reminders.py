@@ -1,80 +1,227 @@
 import asyncio
+import random
 from datetime import datetime, timedelta
-from aiogram import Bot, exceptions
-from database import db
+from aiogram import Bot
+from aiogram.exceptions import TelegramBadRequest, TelegramForbiddenError
+from clock import get_clock
+from config import Config
+from database import db, deadline_offsets, to_ts
+from leader_lease import make_holder_id
+from metrics import metrics
+from db_events import (
+    TASK_COMPLETED,
+    TASK_CREATED,
+    TASK_DELETED,
+    TASK_RESTORED,
+    REMINDERS_CHANGED,
+)
+from reminder_scheduler import ReminderScheduler
+from send_pipeline import SendPipeline, pack_message_parts
 import logging
-import aiosqlite
 
 logger = logging.getLogger(__name__)
 
+OVERDUE_REMINDER_TYPES = ("overdue_immediate", "overdue_repeat")
+TASK_REMINDER_TYPES = ("deadline",) + OVERDUE_REMINDER_TYPES
+
+
+def deadline_reminders(due_date: datetime, offsets, now: datetime) -> list:
+    """Будущие напоминания о дедлайне: (тип, отступ, время срабатывания)"""
+    return [
+        ("deadline", offset, due_date - timedelta(minutes=offset))
+        for offset in offsets
+        if due_date - timedelta(minutes=offset) > now
+    ]
+
+
+def retry_delay(attempt: int) -> float:
+    """Экспоненциальная задержка перед повтором с разбросом в половину интервала"""
+    delay = min(
+        Config.REMINDER_RETRY_MAX_SECONDS,
+        Config.REMINDER_RETRY_BASE_SECONDS * 2 ** (attempt - 1),
+    )
+    return delay / 2 + random.uniform(0, delay / 2)
+
 
 class ReminderManager:
-    def __init__(self, bot: Bot):
+    def __init__(self, bot: Bot, clock=None):
         self.bot = bot
+        self.clock = clock or get_clock()
         self.is_running = False
-        self.db_path = db.db_path
+        self.scheduler = ReminderScheduler(clock=self.clock)
+        self.sender = SendPipeline(
+            bot,
+            workers=Config.SEND_WORKERS,
+            global_rate=Config.SEND_GLOBAL_RATE,
+            per_chat_rate=Config.SEND_PER_CHAT_RATE,
+            max_retries=Config.SEND_MAX_RETRIES,
+            clock=self.clock,
+        )
+        self.worker_id = make_holder_id()
+        self._events = None
+        self._workers = []
+        self._inflight = set()
+
+        metrics.gauge("reminder_schedule_size", source=lambda: len(self.scheduler))
+        metrics.gauge("reminder_batches_inflight", source=lambda: len(self._inflight))
+        metrics.gauge("send_queue_depth", source=self.sender.queue_depth)
 
     async def start(self):
         """Запускает менеджер напоминаний"""
         self.is_running = True
-        asyncio.create_task(self._reminder_worker())
+        await self.sender.start()
+        self._events = db.events.subscribe()
+        await self._reconcile()
+        self._workers = [
+            asyncio.create_task(self._dispatch_worker()),
+            asyncio.create_task(self._event_worker()),
+            asyncio.create_task(self._digest_worker()),
+            asyncio.create_task(self._reminder_worker()),
+        ]
         logger.info("ReminderManager started")
 
     async def stop(self):
         """Останавливает менеджер напоминаний"""
         self.is_running = False
+        self.scheduler.wake()
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        # Незавершенные заявки остаются в базе и будут подхвачены по истечении срока
+        for batch in self._inflight:
+            batch.cancel()
+        await asyncio.gather(*self._inflight, return_exceptions=True)
+        self._inflight.clear()
+        if self._events is not None:
+            db.events.unsubscribe(self._events)
+            self._events = None
+        await self.sender.stop()
         logger.info("ReminderManager stopped")
 
+    async def _load_schedule(self):
+        """Дополняет расписание из базы и переносит напоминания с изменившимся временем"""
+        added = moved = 0
+        for reminder_id, task_id, scheduled_ts in await db.get_reminder_schedule():
+            scheduled_ts = scheduled_ts or 0
+            current = self.scheduler.fire_ts(reminder_id)
+            if current == scheduled_ts:
+                continue
+            self.scheduler.schedule(reminder_id, task_id, scheduled_ts)
+            if current is None:
+                added += 1
+            else:
+                moved += 1
+        logger.info(
+            f"Reminder schedule synced: {added} added, {moved} moved, "
+            f"{len(self.scheduler)} total"
+        )
+
+    async def _reconcile(self):
+        """Страховочная сверка: досоздает пропущенные напоминания и расписание"""
+        with metrics.timer("reminder_scan_seconds", scan="reconcile"):
+            await self._create_deadline_reminders()
+            await self._create_overdue_reminders()
+            await self._load_schedule()
+
+    async def _event_worker(self):
+        """Обрабатывает изменения задач по мере их поступления"""
+        while self.is_running:
+            event = await self._events.get()
+            try:
+                await self._handle_task_event(event)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"❌ Ошибка обработки события {event}: {e}")
+                logger.error(f"Error handling {event}: {e}")
+
+    async def _handle_task_event(self, event):
+        """Создает, переносит или снимает напоминания одной задачи"""
+        if event.kind == REMINDERS_CHANGED:
+            for reminder_id in event.cancelled:
+                self.scheduler.cancel(reminder_id)
+            for reminder_id, task_id, fire_ts in event.scheduled:
+                self.scheduler.schedule(reminder_id, task_id, fire_ts)
+            return
+
+        if event.kind in (TASK_COMPLETED, TASK_DELETED):
+            await self.cancel_task_reminders(event.task_id)
+            return
+
+        await self.sync_task_reminders(
+            event.user_id,
+            event.task_id,
+            event.due_date,
+            fresh=event.kind in (TASK_CREATED, TASK_RESTORED),
+        )
+
+    async def _dispatch_worker(self):
+        """Спит до ближайшего напоминания и отправляет все наступившие"""
+        while self.is_running:
+            try:
+                await self.scheduler.wait_next()
+                due_ids = self.scheduler.pop_due()
+                if due_ids:
+                    # Пачки уходят параллельно: от повторов защищает захват в базе
+                    batch = asyncio.create_task(self._send_reminders(due_ids))
+                    self._inflight.add(batch)
+                    batch.add_done_callback(self._inflight.discard)
+
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"❌ Ошибка в цикле отправки напоминаний: {e}")
+                logger.error(f"Error in reminder dispatch: {e}")
+                await self.clock.sleep(1)
+
     async def _reminder_worker(self):
         """Фоновая задача для обработки напоминаний"""
-        iteration = 0
+        next_reconcile = self.clock.monotonic() + Config.REMINDER_RECONCILE_INTERVAL
 
         while self.is_running:
             try:
-                iteration += 1
-                await self._create_deadline_reminders()
-                await self._create_overdue_reminders()
-                await self.check_daily_overdue_notifications()
-                await self._send_pending_reminders()
+                if self.clock.monotonic() >= next_reconcile:
+                    next_reconcile = (
+                        self.clock.monotonic() + Config.REMINDER_RECONCILE_INTERVAL
+                    )
+                    await self._reconcile()
                 await self._cleanup_old_reminders()
-                await asyncio.sleep(60)
+                await self.clock.sleep(60)
+
+            except asyncio.CancelledError:
+                raise
 
             except Exception as e:
                 print(f"❌ Ошибка в reminder worker: {e}")
                 logger.error(f"Error in reminder worker: {e}")
-                await asyncio.sleep(60)
-
-    def _parse_datetime(self, date_str: str) -> datetime:
-        """Универсальный парсер дат"""
-        try:
-            if "T" in date_str:
-                return datetime.fromisoformat(date_str)
-            elif " " in date_str:
-                return datetime.strptime(date_str, "%Y-%m-%d %H:%M:%S")
-            else:
-                return datetime.fromisoformat(date_str + "T00:00:00")
-        except Exception as e:
-            print(f"❌ Ошибка парсинга даты {date_str}: {e}")
-            raise
+                await self.clock.sleep(60)
 
     async def _create_deadline_reminders(self):
         """Создание напоминаний о приближающихся дедлайнах"""
         try:
             tasks_for_reminders = await db.get_tasks_for_deadline_reminders()
 
-            for task_id, user_id, due_date_str, reminder_hours in tasks_for_reminders:
+            for (
+                task_id,
+                user_id,
+                due_date,
+                reminder_hours,
+                reminder_offsets,
+            ) in tasks_for_reminders:
                 try:
-                    due_date = self._parse_datetime(due_date_str)
-                    reminder_time = due_date - timedelta(hours=reminder_hours)
-                    now = datetime.now()
-
-                    if reminder_time > now:
-                        await self.create_task_reminder(
-                            user_id=user_id,
-                            task_id=task_id,
-                            reminder_type="deadline",
-                            scheduled_time=reminder_time,
-                        )
+                    desired = deadline_reminders(
+                        due_date,
+                        deadline_offsets(reminder_offsets, reminder_hours),
+                        self.clock.now(),
+                    )
+                    if not desired:
+                        continue
+                    changed, _ = await db.sync_task_reminders(
+                        user_id, task_id, desired, ("deadline",)
+                    )
+                    for reminder_id, fire_ts in changed:
+                        self.scheduler.schedule(reminder_id, task_id, fire_ts)
 
                 except Exception as e:
                     print(
@@ -110,16 +257,15 @@ class ReminderManager:
     async def _create_overdue_reminders(self):
         """Создание одноразовых напоминаний о новых просроченных задачах"""
         try:
-            db_time = await db.get_database_local_time()
             new_overdue_tasks = await db.get_new_overdue_tasks_for_reminders()
             created_count = 0
-            for task_id, user_id, content, due_date_str in new_overdue_tasks:
+            for task_id, user_id, content, due_date in new_overdue_tasks:
                 try:
                     reminder_id = await self.create_task_reminder(
                         user_id=user_id,
                         task_id=task_id,
                         reminder_type="overdue_immediate",
-                        scheduled_time=datetime.now(),
+                        scheduled_time=self.clock.now(),
                     )
 
                     if reminder_id:
@@ -143,56 +289,46 @@ class ReminderManager:
 
             traceback.print_exc()
 
-    async def check_daily_overdue_notifications(self):
-        """Проверяет и отправляет ежедневные уведомления о просроченных задачах"""
-        try:
-            users_settings = await db.get_users_for_daily_overdue_notifications()
-            current_time = datetime.now().strftime("%H:%M")
-            sent_count = 0
-
-            for user_id, notification_time, enable_overdue in users_settings:
-                try:
-                    if not enable_overdue:
-                        continue
-
-                    if current_time == notification_time:
-
-                        overdue_tasks = await db.get_overdue_tasks_for_user_daily(
-                            user_id
-                        )
-
-                        if overdue_tasks:
-                            success = await self.send_daily_overdue_notification(
-                                user_id, overdue_tasks
-                            )
-                            if success:
-                                sent_count += 1
-                            else:
-                                print(
-                                    f"❌ [DAILY OVERDUE] Ошибка отправки пользователю {user_id}"
-                                )
-                        else:
-                            print(
-                                f"ℹ [DAILY OVERDUE] Нет просроченных задач для пользователя {user_id}"
-                            )
-                    else:
-                        print(
-                            f" [DAILY OVERDUE] Время не совпало для {user_id} ({current_time} != {notification_time})"
-                        )
+    async def _digest_worker(self):
+        """Раз в минуту рассылает ежедневные сводки о просроченных задачах"""
+        while self.is_running:
+            try:
+                await self.send_due_daily_digests()
+                await self.clock.sleep(60 - self.clock.time() % 60)
 
-                except Exception as e:
-                    print(
-                        f"❌ [DAILY OVERDUE] Ошибка обработки пользователя {user_id}: {e}"
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"❌ [DAILY OVERDUE] Ошибка рассылки ежедневных сводок: {e}")
+                logger.error(f"Error in daily digest worker: {e}")
+                await self.clock.sleep(60)
+
+    async def send_due_daily_digests(self):
+        """Отправляет наступившие сводки, включая пропущенные за время простоя"""
+        until = int(self.clock.time())
+        since = until - Config.DIGEST_MAX_CATCHUP_MINUTES * 60
+
+        sends = []
+        with metrics.timer("reminder_scan_seconds", scan="daily_digest"):
+            async for user_id, overdue_tasks in db.iter_daily_overdue_digests(
+                since, until
+            ):
+                sends.append(
+                    asyncio.create_task(
+                        self.send_daily_overdue_notification(user_id, overdue_tasks)
                     )
-                    continue
+                )
 
-        except Exception as e:
-            print(
-                f"❌ [DAILY OVERDUE] Критическая ошибка при проверке ежедневных уведомлений: {e}"
-            )
-            import traceback
+        sent_count = sum(await asyncio.gather(*sends)) if sends else 0
+        metrics.counter("daily_digests_sent_total").inc(sent_count)
+        advanced = await db.advance_daily_digests(until)
 
-            traceback.print_exc()
+        if sends:
+            logger.info(
+                f"Daily overdue digests: {sent_count} of {len(sends)} sent, "
+                f"{advanced} rescheduled"
+            )
+        return sent_count
 
     async def send_daily_overdue_notification(self, user_id: int, overdue_tasks):
         """Отправляет ежедневное уведомление о просроченных задачах"""
@@ -234,17 +370,13 @@ class ReminderManager:
                 high_priority, medium_priority, low_priority
             )
 
-            await self.bot.send_message(
-                chat_id=user_id, text=message, parse_mode="HTML"
-            )
+            await self.sender.send(user_id, message, parse_mode="HTML")
 
-            for task in overdue_tasks:
-                task_id = task[0]
-                await db.update_last_overdue_notification(task_id)
+            await db.mark_overdue_notified(task[0] for task in overdue_tasks)
 
             return 1
 
-        except exceptions.BotBlocked:
+        except TelegramForbiddenError:
             print(f"❌ Пользователь {user_id} заблокировал бота")
             return 0
         except Exception as e:
@@ -253,11 +385,10 @@ class ReminderManager:
             )
             return 0
 
-    def calculate_days_overdue(self, due_date_str):
+    def calculate_days_overdue(self, due_date: datetime):
         """Вычисляет количество дней просрочки"""
         try:
-            due_date = self._parse_datetime(due_date_str)
-            overdue_days = (datetime.now() - due_date).days
+            overdue_days = (self.clock.now() - due_date).days
             return max(1, overdue_days)
         except:
             return 1
@@ -302,77 +433,163 @@ class ReminderManager:
     async def create_task_reminder(
         self, user_id: int, task_id: int, reminder_type: str, scheduled_time: datetime
     ):
-        """Создает напоминание в базе данных"""
+        """Создает напоминание в базе данных и ставит его в расписание"""
         try:
-            await db.create_task_reminder(
+            reminder_id = await db.create_task_reminder(
                 user_id=user_id,
                 task_id=task_id,
                 reminder_type=reminder_type,
                 scheduled_time=scheduled_time,
             )
-            logger.info(f"Created {reminder_type} reminder for task {task_id}")
+            if reminder_id:
+                self.scheduler.schedule(reminder_id, task_id, to_ts(scheduled_time))
+                logger.info(f"Created {reminder_type} reminder for task {task_id}")
+            return reminder_id
 
         except Exception as e:
             print(f"❌ Ошибка при создании напоминания: {e}")
             logger.error(f"Error creating reminder: {e}")
 
-    async def _send_pending_reminders(self):
-        """Отправляет готовые напоминания"""
+    async def _send_reminders(self, reminder_ids):
+        """Отправляет наступившие напоминания, объединяя их по чатам"""
 
         try:
-            reminders = await db.get_pending_reminders()
-            sent_count = 0
+            with metrics.timer("reminder_scan_seconds", scan="claim"):
+                reminders = await db.claim_reminders(
+                    reminder_ids, self.worker_id, Config.REMINDER_CLAIM_TIMEOUT
+                )
+                if reminders and Config.REMINDER_COALESCE_WINDOW > 0:
+                    # Напоминания этих же чатов из ближайшего окна уходят тем же сообщением
+                    upcoming = await db.claim_upcoming_reminders(
+                        {reminder[1] for reminder in reminders},
+                        int(self.clock.time()) + Config.REMINDER_COALESCE_WINDOW,
+                        self.worker_id,
+                        Config.REMINDER_CLAIM_TIMEOUT,
+                    )
+                    reminders += upcoming
+            self._watch_claims(reminders)
 
+            by_chat = {}
             for reminder in reminders:
-                try:
-                    (
-                        reminder_id,
-                        user_id,
-                        task_id,
-                        reminder_type,
-                        scheduled_time,
-                        sent,
-                        created_at,
-                        sent_at,
-                        task_content,
-                        due_date,
-                        priority,
-                    ) = reminder
-
-                    if reminder_type == "deadline":
-                        message = await self._format_deadline_reminder(
-                            task_content, due_date, priority, task_id
-                        )
-                    else:
-                        message = await self._format_overdue_reminder(
-                            task_content, due_date, priority, task_id, reminder_type
-                        )
-
-                    await self.bot.send_message(
-                        chat_id=user_id, text=message, parse_mode="HTML"
-                    )
+                by_chat.setdefault(reminder[1], []).append(reminder)
+            results = await asyncio.gather(
+                *(
+                    self._send_chat_reminders(user_id, chat_reminders)
+                    for user_id, chat_reminders in by_chat.items()
+                )
+            )
+            return sum(results)
 
-                    await db.mark_reminder_sent(reminder_id)
-                    sent_count += 1
+        except Exception as e:
+            print(f"❌ Ошибка в _send_reminders: {e}")
+            return 0
 
-                    await asyncio.sleep(0.3)
+    def _watch_claims(self, reminders):
+        """Ставит захваченные напоминания в расписание на момент истечения захвата"""
+        # Если отправка оборвется, не записав результат, заявку подберут вовремя
+        expires_ts = int(self.clock.time()) + Config.REMINDER_CLAIM_TIMEOUT
+        for reminder in reminders:
+            self.scheduler.schedule(reminder[0], reminder[2], expires_ts)
+
+    async def _format_reminder(self, reminder) -> str:
+        """Текст одного напоминания"""
+        reminder_type, task_id = reminder[3], reminder[2]
+        task_content, due_date, priority = reminder[8], reminder[9], reminder[10]
+        if reminder_type == "deadline":
+            return await self._format_deadline_reminder(
+                task_content, due_date, priority, task_id
+            )
+        return await self._format_overdue_reminder(
+            task_content, due_date, priority, task_id, reminder_type
+        )
 
-                except exceptions.BotBlocked:
-                    print(f"❌ Пользователь {user_id} заблокировал бота")
-                    await db.mark_reminder_sent(reminder_id)
-                except Exception as e:
-                    print(f"❌ Ошибка при отправке напоминания {reminder[0]}: {e}")
+    async def _send_chat_reminders(self, user_id: int, reminders) -> int:
+        """Отправляет напоминания одного чата минимальным числом сообщений"""
+        parts = [await self._format_reminder(reminder) for reminder in reminders]
+        if len(parts) > 1:
+            parts[0] = f"🔔 <b>Напоминания: {len(parts)}</b>\n\n{parts[0]}"
 
+        delivered = set()
+        try:
+            for text, indices in pack_message_parts(parts, "\n\n➖➖➖➖➖\n\n"):
+                await self.sender.send(user_id, text, parse_mode="HTML")
+                metrics.counter("reminder_messages_total").inc()
+                sent_now = [reminders[index] for index in indices]
+                delivered.update(indices)
+                await self._record_delivered(sent_now)
+
+        except (TelegramForbiddenError, TelegramBadRequest) as e:
+            print(
+                f"❌ Напоминания пользователю {user_id} не могут быть доставлены: {e}"
+            )
+            metrics.counter("reminder_send_errors_total", error=type(e).__name__).inc()
+            for index, reminder in enumerate(reminders):
+                if index not in delivered:
+                    metrics.counter("reminders_dead_lettered_total").inc()
+                    await db.record_reminder_failure(reminder[0], str(e))
+                    self.scheduler.cancel(reminder[0])
         except Exception as e:
-            print(f"❌ Ошибка в _send_pending_reminders: {e}")
+            print(f"❌ Ошибка при отправке напоминаний пользователю {user_id}: {e}")
+            metrics.counter("reminder_send_errors_total", error=type(e).__name__).inc()
+            for index, reminder in enumerate(reminders):
+                if index not in delivered:
+                    await self._retry_later(
+                        reminder[0], reminder[2], reminder[11] + 1, e
+                    )
+        return len(delivered)
+
+    async def _record_delivered(self, reminders):
+        """Отмечает доставленные напоминания и записывает задержку доставки"""
+        now = self.clock.time()
+        for reminder in reminders:
+            reminder_type, scheduled_ts = reminder[3], reminder[12]
+            metrics.histogram(
+                "reminder_delivery_lag_seconds", type=reminder_type
+            ).observe(now - scheduled_ts)
+            metrics.counter("reminders_sent_total", type=reminder_type).inc()
+        await db.mark_reminders_sent(reminder[0] for reminder in reminders)
+        for reminder in reminders:
+            self.scheduler.cancel(reminder[0])
+
+        overdue_ids = [
+            reminder[0]
+            for reminder in reminders
+            if reminder[3] in OVERDUE_REMINDER_TYPES
+        ]
+        if overdue_ids:
+            for reminder_id, task_id, fire_ts in await db.create_overdue_repeats(
+                overdue_ids, int(now)
+            ):
+                self.scheduler.schedule(reminder_id, task_id, fire_ts)
+
+    async def _retry_later(self, reminder_id: int, task_id: int, attempt: int, error):
+        """Откладывает повтор отправки или переводит напоминание в dead-letter"""
+        if attempt >= Config.REMINDER_MAX_ATTEMPTS:
+            logger.warning(
+                f"Reminder {reminder_id} dead-lettered after {attempt} attempts: {error}"
+            )
+            metrics.counter("reminders_dead_lettered_total").inc()
+            await db.record_reminder_failure(reminder_id, str(error))
+            self.scheduler.cancel(reminder_id)
+            return
+
+        next_attempt_ts = int(self.clock.time() + retry_delay(attempt))
+        await db.record_reminder_failure(reminder_id, str(error), next_attempt_ts)
+        self.scheduler.schedule(reminder_id, task_id, next_attempt_ts)
+
+    async def requeue_dead_reminders(self, reminder_ids=None) -> int:
+        """Возвращает dead-letter напоминания в расписание"""
+        rows = await db.requeue_dead_reminders(reminder_ids)
+        for reminder_id, task_id, next_attempt_ts in rows:
+            self.scheduler.schedule(reminder_id, task_id, next_attempt_ts)
+        return len(rows)
 
     async def _format_deadline_reminder(
-        self, task_content: str, due_date_str: str, priority: str, task_id: int
+        self, task_content: str, due_date: datetime, priority: str, task_id: int
     ) -> str:
         """Форматирует сообщение о приближающемся дедлайне"""
         try:
-            due_date = self._parse_datetime(due_date_str)
-            time_left = due_date - datetime.now()
+            time_left = due_date - self.clock.now()
 
             priority_icons = {"high": "🔴", "medium": "🟡", "low": "🟢"}
             priority_icon = priority_icons.get(priority, "🟡")
@@ -412,15 +629,14 @@ class ReminderManager:
     async def _format_overdue_reminder(
         self,
         task_content: str,
-        due_date_str: str,
+        due_date: datetime,
         priority: str,
         task_id: int,
         reminder_type: str = "overdue",
     ) -> str:
         """Форматирует сообщение о просроченной задаче"""
         try:
-            due_date = self._parse_datetime(due_date_str)
-            overdue_time = datetime.now() - due_date
+            overdue_time = self.clock.now() - due_date
             overdue_days = overdue_time.days
 
             priority_icons = {"high": "🔴", "medium": "🟡", "low": "🟢"}
@@ -473,55 +689,59 @@ class ReminderManager:
     async def _cleanup_old_reminders(self):
         """Очищает старые отправленные напоминания"""
         try:
-            async with aiosqlite.connect(self.db_path) as conn:
-                cursor = await conn.execute(
-                    "DELETE FROM task_reminders WHERE sent = 1 AND sent_at < datetime('now', '-3 days')"
-                )
-                deleted_count = cursor.rowcount
-                await conn.commit()
+            await db.cleanup_old_reminders(3)
 
         except Exception as e:
             print(f"❌ Ошибка при очистке напоминаний: {e}")
 
-    async def create_reminder_for_new_task(
-        self, user_id: int, task_id: int, due_date: datetime
+    async def sync_task_reminders(
+        self, user_id: int, task_id: int, due_date: datetime, fresh: bool = False
     ):
-        """Создает напоминание для новой задачи с дедлайном"""
+        """Сверяет напоминания задачи с ее сроком; возвращает число напоминаний или None при ошибке"""
         try:
             settings = await db.get_reminder_settings(user_id)
+            now = self.clock.now()
+            overdue_now = due_date is not None and due_date <= now
 
-            if not settings or not settings[1]:
-                print(f"🔕 Напоминания выключены для пользователя {user_id}")
-                return
-
-            reminder_hours = settings[2] or 1
+            desired = []
+            if due_date and settings[1]:
+                desired += deadline_reminders(
+                    due_date, deadline_offsets(settings[11], settings[2]), now
+                )
+            if due_date and settings[3]:
+                desired.append(("overdue_immediate", None, max(due_date, now)))
 
-            reminder_time = due_date - timedelta(hours=reminder_hours)
-            now = datetime.now()
+            if overdue_now and not fresh:
+                # Уже просроченную задачу правят: цепочку повторов не перезапускаем
+                types = ("deadline", "overdue_immediate")
+                once_types = ("overdue_immediate",)
+            else:
+                types = TASK_REMINDER_TYPES
+                once_types = ()
 
-            if reminder_time > now:
-                await self.create_task_reminder(
-                    user_id=user_id,
-                    task_id=task_id,
-                    reminder_type="deadline",
-                    scheduled_time=reminder_time,
-                )
+            changed, removed = await db.sync_task_reminders(
+                user_id, task_id, desired, types, once_types
+            )
+            for reminder_id in removed:
+                self.scheduler.cancel(reminder_id)
+            for reminder_id, fire_ts in changed:
+                self.scheduler.schedule(reminder_id, task_id, fire_ts)
+            return len(desired)
 
         except Exception as e:
-            print(f"❌ Ошибка при создании напоминания для новой задачи: {e}")
-            logger.error(f"Error creating reminder for new task: {e}")
+            print(f"❌ Ошибка при создании напоминаний для задачи {task_id}: {e}")
+            logger.error(f"Error scheduling reminders for task {task_id}: {e}")
+            return None
 
-    async def update_reminders_for_edited_task(
-        self, user_id: int, task_id: int, new_due_date: datetime
-    ):
-        """Обновляет напоминания для отредактированной задачи"""
+    async def cancel_task_reminders(self, task_id: int):
+        """Снимает неотправленные напоминания выполненной или удаленной задачи"""
         try:
-            await db.delete_task_reminders(task_id)
-            await self.create_reminder_for_new_task(user_id, task_id, new_due_date)
+            self.scheduler.cancel_task(task_id)
+            await db.delete_unsent_task_reminders(task_id)
 
         except Exception as e:
-            print(f"ERROR: Failed to update reminders for task {task_id}: {e}")
-            raise
+            print(f"❌ Ошибка при отмене напоминаний задачи {task_id}: {e}")
+            logger.error(f"Error cancelling reminders for task {task_id}: {e}")
 
 
 reminder_manager = None
@@ -533,3 +753,11 @@ async def init_reminder_manager(bot: Bot):
     reminder_manager = ReminderManager(bot)
     await reminder_manager.start()
     return reminder_manager
+
+
+async def stop_reminder_manager():
+    """Останавливает менеджер напоминаний, если он запущен"""
+    global reminder_manager
+    if reminder_manager is not None:
+        manager, reminder_manager = reminder_manager, None
+        await manager.stop()
@@ -0,0 +1,251 @@
+import asyncio
+import logging
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramRetryAfter
+
+from clock import get_clock
+from metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+TELEGRAM_MESSAGE_LIMIT = 4096
+
+
+def html_cut_points(text: str):
+    """Позиции вне тегов и HTML-сущностей вместе с тегами, открытыми к этой позиции"""
+    opened = []
+    position = 0
+    while position < len(text):
+        yield position, tuple(opened)
+        char = text[position]
+        end = -1
+        if char == "<":
+            end = text.find(">", position)
+        elif char == "&":
+            end = text.find(";", position, position + 12)
+        if end == -1:
+            position += 1
+            continue
+        if char == "<":
+            tag = text[position : end + 1]
+            name = tag[1:-1].strip("/").split(" ", 1)[0].lower()
+            if tag.startswith("</"):
+                if opened and opened[-1][1] == name:
+                    opened.pop()
+            elif not tag.endswith("/>"):
+                opened.append((tag, name))
+        position = end + 1
+    yield len(text), tuple(opened)
+
+
+def split_message_part(part: str, limit: int = TELEGRAM_MESSAGE_LIMIT) -> list:
+    """Режет длинный HTML-текст по строкам, затем по пробелам, не разрывая теги"""
+    pieces = []
+    while len(part) > limit:
+        best = {}
+        has_text, previous_position = False, 0
+        for position, opened in html_cut_points(part):
+            # Кусок без текста (одни теги) ничего не продвигает
+            if position and part[previous_position] not in "< \n\t":
+                has_text = True
+            previous_position = position
+            closing = "".join(f"</{name}>" for _, name in reversed(opened))
+            if position + len(closing) > limit:
+                break
+            if not has_text:
+                continue
+            previous = part[position - 1]
+            kind = (
+                "line" if previous == "\n" else "space" if previous.isspace() else "any"
+            )
+            best[kind] = (position, opened, closing)
+
+        cut = best.get("line") or best.get("space") or best.get("any")
+        if cut is None:
+            pieces.append(part[:limit])
+            part = part[limit:]
+            continue
+        position, opened, closing = cut
+        pieces.append(part[:position].rstrip() + closing)
+        part = "".join(tag for tag, _ in opened) + part[position:].lstrip()
+    pieces.append(part)
+    return pieces
+
+
+def pack_message_parts(
+    parts, separator: str = "\n\n", limit: int = TELEGRAM_MESSAGE_LIMIT
+) -> list:
+    """Склеивает части в сообщения до limit символов: пары (текст, индексы частей)"""
+    messages = []
+    current, indices = "", []
+    for index, part in enumerate(parts):
+        if current and len(current) + len(separator) + len(part) > limit:
+            messages.append((current, indices))
+            current, indices = "", []
+        # Часть длиннее лимита уходит несколькими сообщениями с тем же индексом
+        if len(part) > limit:
+            *heads, part = split_message_part(part, limit)
+            messages.extend((head, [index]) for head in heads)
+        current = f"{current}{separator}{part}" if current else part
+        indices.append(index)
+    if current:
+        messages.append((current, indices))
+    return messages
+
+
+class TokenBucket:
+    """Ведро токенов: не больше rate операций в секунду со всплеском до capacity"""
+
+    def __init__(self, rate: float, capacity: float = None, clock=None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self.clock = clock or get_clock()
+        self.tokens = self.capacity
+        self.updated = self.clock.monotonic()
+
+    def _refill(self):
+        now = self.clock.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self) -> float:
+        """Забирает токен и возвращает, сколько секунд подождать до его появления"""
+        self._refill()
+        self.tokens -= 1
+        if self.tokens >= 0:
+            return 0.0
+        return -self.tokens / self.rate
+
+    async def acquire(self):
+        """Ждет, пока в ведре появится токен"""
+        delay = self.reserve()
+        if delay > 0:
+            await self.clock.sleep(delay)
+
+
+class SendPipeline:
+    """Очередь исходящих сообщений с пулом воркеров и лимитами Telegram"""
+
+    def __init__(
+        self,
+        bot: Bot,
+        workers: int = 16,
+        global_rate: float = 30.0,
+        per_chat_rate: float = 1.0,
+        max_retries: int = 3,
+        clock=None,
+    ):
+        self.bot = bot
+        self.clock = clock or get_clock()
+        self.workers = max(1, workers)
+        self.per_chat_rate = per_chat_rate
+        self.max_retries = max_retries
+
+        self._global = TokenBucket(global_rate, clock=self.clock)
+        self._chats = {}
+        self._paused_until = 0.0
+        self._queue = None
+        self._tasks = []
+
+    async def start(self):
+        """Запускает воркеров отправки"""
+        if self._tasks:
+            return
+        self._queue = asyncio.Queue()
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        logger.info(f"Send pipeline started: {self.workers} workers")
+
+    async def stop(self):
+        """Останавливает воркеров; неотправленные сообщения получают отмену"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+        while self._queue is not None and not self._queue.empty():
+            _, _, future = self._queue.get_nowait()
+            if not future.done():
+                future.cancel()
+        logger.info("Send pipeline stopped")
+
+    def submit(self, chat_id: int, text: str, **kwargs) -> asyncio.Future:
+        """Ставит сообщение в очередь и возвращает future с результатом отправки"""
+        if not self._tasks:
+            raise RuntimeError("Очередь отправки не запущена")
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((chat_id, dict(text=text, **kwargs), future))
+        return future
+
+    async def send(self, chat_id: int, text: str, **kwargs):
+        """Отправляет сообщение через очередь и ждет результата"""
+        return await self.submit(chat_id, text, **kwargs)
+
+    def queue_depth(self) -> int:
+        """Число сообщений, ожидающих отправки"""
+        return self._queue.qsize() if self._queue is not None else 0
+
+    def _chat_bucket(self, chat_id: int) -> TokenBucket:
+        bucket = self._chats.get(chat_id)
+        if bucket is None:
+            if len(self._chats) > 10000:
+                self._prune_chats()
+            bucket = TokenBucket(self.per_chat_rate, 1.0, self.clock)
+            self._chats[chat_id] = bucket
+        return bucket
+
+    def _prune_chats(self):
+        """Забывает ведра чатов, которые давно наполнились"""
+        now = self.clock.monotonic()
+        idle = [
+            chat_id
+            for chat_id, bucket in self._chats.items()
+            if now - bucket.updated > 1.0 / bucket.rate
+        ]
+        for chat_id in idle:
+            del self._chats[chat_id]
+
+    async def _wait_for_slot(self, chat_id: int):
+        """Ждет паузу после RetryAfter и токены общего и чатового лимитов"""
+        pause = self._paused_until - self.clock.monotonic()
+        if pause > 0:
+            await self.clock.sleep(pause)
+        await self._chat_bucket(chat_id).acquire()
+        await self._global.acquire()
+
+    async def _worker(self):
+        while True:
+            chat_id, message, future = await self._queue.get()
+            if future.done():
+                continue
+            try:
+                result = await self._deliver(chat_id, message)
+            except asyncio.CancelledError:
+                if not future.done():
+                    future.cancel()
+                raise
+            except Exception as e:
+                if not future.done():
+                    future.set_exception(e)
+            else:
+                if not future.done():
+                    future.set_result(result)
+
+    async def _deliver(self, chat_id: int, message: dict):
+        """Отправляет одно сообщение, соблюдая RetryAfter"""
+        attempt = 0
+        while True:
+            await self._wait_for_slot(chat_id)
+            try:
+                return await self.bot.send_message(chat_id=chat_id, **message)
+            except TelegramRetryAfter as e:
+                attempt += 1
+                metrics.counter("telegram_retry_after_total").inc()
+                if attempt > self.max_retries:
+                    raise
+                self._paused_until = max(
+                    self._paused_until, self.clock.monotonic() + e.retry_after
+                )
+                logger.warning(
+                    f"Telegram flood control: retry after {e.retry_after}s (chat {chat_id})"
+                )
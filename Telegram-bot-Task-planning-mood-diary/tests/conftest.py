@@ -0,0 +1,23 @@
+import os
+import sys
+from contextlib import asynccontextmanager
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import Config
+from database import Database
+
+
+@asynccontextmanager
+async def open_database(path):
+    """Открывает базу во временном файле с примененными миграциями"""
+    previous_url = Config.DATABASE_URL
+    Config.DATABASE_URL = f"sqlite:///{path}"
+    database = Database()
+    Config.DATABASE_URL = previous_url
+    await database.initialize()
+    await database.migrations.wait_online()
+    try:
+        yield database
+    finally:
+        await database.close()
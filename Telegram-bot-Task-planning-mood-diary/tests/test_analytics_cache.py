@@ -0,0 +1,52 @@
+import asyncio
+from datetime import datetime, timedelta
+
+from conftest import open_database
+
+
+def period():
+    today = datetime.combine(datetime.now().date(), datetime.min.time())
+    return today - timedelta(days=7), today + timedelta(days=1)
+
+
+def test_snapshot_is_reused_until_user_data_changes(tmp_path):
+    async def scenario():
+        async with open_database(tmp_path / "bot.db") as database:
+            await database.add_user(1, "user", "User")
+            await database.add_user(2, "other", "Other")
+            await database.add_task(1, "first", datetime.now() + timedelta(days=1))
+
+            first = await database.get_analytics_snapshot(1, *period())
+            again = await database.get_analytics_snapshot(1, *period())
+            await database.add_task(2, "other user", None)
+            unrelated = await database.get_analytics_snapshot(1, *period())
+            return first, again, unrelated
+
+    first, again, unrelated = asyncio.run(scenario())
+
+    assert first.tasks["total"] == 1
+    assert again is first
+    assert unrelated is first
+
+
+def test_snapshot_sees_writes_from_another_process(tmp_path):
+    path = tmp_path / "bot.db"
+
+    async def scenario():
+        async with open_database(path) as leader, open_database(path) as standby:
+            await leader.add_user(1, "user", "User")
+            before = await leader.get_analytics_snapshot(1, *period())
+
+            # Запись через другой экземпляр не публикует событий в этом процессе
+            task_id = await standby.add_task(1, "task", None)
+            after_add = await leader.get_analytics_snapshot(1, *period())
+            await standby.complete_task(task_id)
+            after_complete = await leader.get_analytics_snapshot(1, *period())
+            return before, after_add, after_complete
+
+    before, after_add, after_complete = asyncio.run(scenario())
+
+    assert before.tasks["total"] == 0
+    assert after_add.tasks["total"] == 1
+    assert after_add.tasks["completed"] == 0
+    assert after_complete.tasks["completed"] == 1
@@ -0,0 +1,53 @@
+import asyncio
+from datetime import datetime, timedelta
+
+from clock import SimulatedClock, set_clock
+from conftest import open_database
+
+
+def test_deleted_tasks_are_purged_by_the_process_clock(tmp_path):
+    async def scenario():
+        clock = SimulatedClock()
+        previous = set_clock(clock)
+        try:
+            async with open_database(tmp_path / "bot.db") as database:
+                await database.add_user(1, "user", "User")
+                task_id = await database.add_task(
+                    1, "old", datetime.now() + timedelta(days=1)
+                )
+                await database.delete_task(task_id)
+
+                clock.advance(30 * 86400 - 3600)
+                kept = await database.cleanup_old_deleted_tasks(30)
+                clock.advance(2 * 86400)
+                purged = await database.cleanup_old_deleted_tasks(30)
+                return kept, purged, await database.get_task(task_id)
+        finally:
+            set_clock(previous)
+
+    assert asyncio.run(scenario()) == (0, 1, None)
+
+
+def test_sent_reminders_are_purged_by_the_process_clock(tmp_path):
+    async def scenario():
+        clock = SimulatedClock()
+        previous = set_clock(clock)
+        try:
+            async with open_database(tmp_path / "bot.db") as database:
+                await database.add_user(1, "user", "User")
+                task_id = await database.add_task(
+                    1, "task", datetime.now() + timedelta(days=1)
+                )
+                reminder_id = await database.create_task_reminder(
+                    1, task_id, "deadline", datetime.now()
+                )
+                await database.mark_reminders_sent([reminder_id])
+
+                kept = await database.cleanup_old_reminders(3)
+                clock.advance(4 * 86400)
+                purged = await database.cleanup_old_reminders(3)
+                return kept, purged
+        finally:
+            set_clock(previous)
+
+    assert asyncio.run(scenario()) == (0, 1)
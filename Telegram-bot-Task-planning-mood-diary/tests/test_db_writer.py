@@ -0,0 +1,59 @@
+import asyncio
+
+import aiosqlite
+import pytest
+
+from db_writer import DatabaseWriter, WriterClosedError
+
+
+def test_failed_op_rolls_back_only_its_savepoint(tmp_path):
+    path = str(tmp_path / "writer.db")
+
+    async def insert(conn, value):
+        await conn.execute("INSERT INTO items (value) VALUES (?)", (value,))
+        return value
+
+    async def insert_then_fail(conn):
+        await conn.execute("INSERT INTO items (value) VALUES ('broken')")
+        raise ValueError("boom")
+
+    async def scenario():
+        writer = DatabaseWriter(path, max_batch=10, max_delay=0.05)
+        await writer.start()
+        try:
+            await writer.submit(
+                lambda conn: conn.execute(
+                    "CREATE TABLE items (id INTEGER PRIMARY KEY, value TEXT)"
+                )
+            )
+            results = await asyncio.gather(
+                writer.submit(lambda conn: insert(conn, "first")),
+                writer.submit(insert_then_fail),
+                writer.submit(lambda conn: insert(conn, "second")),
+                return_exceptions=True,
+            )
+        finally:
+            await writer.close()
+
+        async with aiosqlite.connect(path) as conn:
+            cursor = await conn.execute("SELECT value FROM items ORDER BY id")
+            values = [row[0] for row in await cursor.fetchall()]
+        return results, values
+
+    results, values = asyncio.run(scenario())
+
+    assert results[0] == "first"
+    assert isinstance(results[1], ValueError)
+    assert results[2] == "second"
+    assert values == ["first", "second"]
+
+
+def test_submit_after_close_is_rejected(tmp_path):
+    async def scenario():
+        writer = DatabaseWriter(str(tmp_path / "writer.db"))
+        await writer.start()
+        await writer.close()
+        with pytest.raises(WriterClosedError):
+            await writer.submit(lambda conn: conn.execute("SELECT 1"))
+
+    asyncio.run(scenario())
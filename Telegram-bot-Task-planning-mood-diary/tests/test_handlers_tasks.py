@@ -0,0 +1,62 @@
+import asyncio
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import handlers.tasks as tasks_handlers
+from conftest import open_database
+
+
+class FakeUser:
+    def __init__(self, user_id):
+        self.id = user_id
+
+
+class FakeMessage:
+    def __init__(self, user_id, text=""):
+        self.from_user = FakeUser(user_id)
+        self.text = text
+        self.answers = []
+
+    async def answer(self, text, **kwargs):
+        self.answers.append(text)
+
+
+def test_overdue_keyword_lists_overdue_task(tmp_path, monkeypatch):
+    async def scenario():
+        async with open_database(tmp_path / "bot.db") as database:
+            monkeypatch.setattr(tasks_handlers, "db", database)
+            await database.add_user(1, "user", "User")
+            due_date = (datetime.now() - timedelta(days=2)).replace(microsecond=0)
+            await database.add_task(1, "Сдать отчет", due_date)
+
+            message = FakeMessage(1, "просроченные")
+            await tasks_handlers.handle_overdue_keywords(message)
+            return message.answers, due_date
+
+    answers, due_date = asyncio.run(scenario())
+
+    assert len(answers) == 1
+    assert "Ошибка" not in answers[0]
+    assert "Сдать отчет" in answers[0]
+    assert due_date.strftime("%d.%m.%Y %H:%M") in answers[0]
+
+
+def test_repeat_rejects_completed_task(tmp_path, monkeypatch):
+    async def scenario():
+        async with open_database(tmp_path / "bot.db") as database:
+            monkeypatch.setattr(tasks_handlers, "db", database)
+            await database.add_user(1, "user", "User")
+            task_id = await database.add_task(
+                1, "Полить цветы", datetime.now() + timedelta(days=1)
+            )
+            await database.complete_task(task_id)
+
+            message = FakeMessage(1)
+            command = SimpleNamespace(args=f"{task_id} ежедневно")
+            await tasks_handlers.cmd_repeat(message, command)
+            return message.answers, (await database.get_task(task_id))[11]
+
+    answers, recurrence = asyncio.run(scenario())
+
+    assert "уже выполнена" in answers[0]
+    assert recurrence is None
@@ -0,0 +1,54 @@
+import asyncio
+
+from conftest import open_database
+from migrations import DROPPED_INDEXES, INDEXES, MIGRATIONS
+
+
+async def schema_versions(database):
+    async with database.pool.acquire() as conn:
+        cursor = await conn.execute("SELECT version FROM schema_version")
+        return sorted(row[0] for row in await cursor.fetchall())
+
+
+async def index_names(database):
+    async with database.pool.acquire() as conn:
+        cursor = await conn.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'index'"
+        )
+        return {row[0] for row in await cursor.fetchall()}
+
+
+def test_migrate_is_idempotent(tmp_path):
+    path = tmp_path / "bot.db"
+
+    async def scenario():
+        async with open_database(path) as database:
+            first = await schema_versions(database)
+
+        async with open_database(path) as database:
+            statements = []
+            await database.set_trace_callback(statements.append)
+            await database.migrations.migrate()
+            await database.migrations.wait_online()
+            await database.set_trace_callback(None)
+            second = await schema_versions(database)
+        return first, second, statements
+
+    first, second, statements = asyncio.run(scenario())
+
+    assert first == [migration.version for migration in MIGRATIONS]
+    assert second == first
+    assert all(
+        statement.lstrip().upper().startswith("SELECT") for statement in statements
+    )
+
+
+def test_fresh_database_builds_only_final_indexes(tmp_path):
+    async def scenario():
+        async with open_database(tmp_path / "bot.db") as database:
+            return await index_names(database)
+
+    indexes = asyncio.run(scenario())
+
+    assert {name for name, _ in INDEXES} <= indexes
+    assert not indexes & set(DROPPED_INDEXES)
@@ -0,0 +1,48 @@
+from datetime import datetime
+
+from recurrence import next_occurrence, normalize_rule, parse_rule
+
+
+def test_month_end_falls_back_to_last_day_of_short_month():
+    assert next_occurrence("M:31", datetime(2025, 1, 31, 9, 0)) == datetime(
+        2025, 2, 28, 9, 0
+    )
+    assert next_occurrence("M:31", datetime(2024, 1, 31, 9, 0)) == datetime(
+        2024, 2, 29, 9, 0
+    )
+
+
+def test_month_end_returns_to_requested_day_after_short_month():
+    assert next_occurrence("M:31", datetime(2025, 2, 28, 9, 0)) == datetime(
+        2025, 3, 31, 9, 0
+    )
+    assert next_occurrence("M:30", datetime(2025, 4, 30, 9, 0)) == datetime(
+        2025, 5, 30, 9, 0
+    )
+
+
+def test_month_rule_crosses_year_end():
+    assert next_occurrence("M:31", datetime(2025, 12, 31, 18, 30)) == datetime(
+        2026, 1, 31, 18, 30
+    )
+
+
+def test_missed_occurrences_are_skipped_up_to_now():
+    previous = datetime(2025, 1, 31, 9, 0)
+    now = datetime(2025, 4, 15, 12, 0)
+
+    assert next_occurrence("M:31", previous, now) == datetime(2025, 4, 30, 9, 0)
+    assert next_occurrence("D:1", previous, now) == datetime(2025, 4, 16, 9, 0)
+
+
+def test_weekly_rule_picks_next_listed_weekday():
+    friday = datetime(2025, 1, 31, 9, 0)
+
+    assert next_occurrence("W:0,2", friday) == datetime(2025, 2, 3, 9, 0)
+
+
+def test_invalid_rules_are_rejected():
+    assert normalize_rule("M:32") is None
+    assert normalize_rule("D:0") is None
+    assert next_occurrence("bogus", datetime(2025, 1, 1)) is None
+    assert parse_rule("31 числа") == "M:31"
@@ -0,0 +1,116 @@
+import asyncio
+from datetime import datetime, timedelta
+
+from conftest import open_database
+
+
+async def add_due_reminder(database, user_id, content):
+    """Задача с напоминанием, время которого уже наступило"""
+    due_date = datetime.now() + timedelta(hours=1)
+    task_id = await database.add_task(user_id, content, due_date)
+    reminder_id = await database.create_task_reminder(
+        user_id, task_id, "deadline", datetime.now() - timedelta(minutes=1)
+    )
+    return task_id, reminder_id
+
+
+async def reminder_ids(database):
+    async with database.pool.acquire() as conn:
+        cursor = await conn.execute("SELECT id FROM task_reminders ORDER BY id")
+        return [row[0] for row in await cursor.fetchall()]
+
+
+def test_claim_skips_completed_and_deleted_tasks(tmp_path):
+    async def scenario():
+        async with open_database(tmp_path / "bot.db") as database:
+            await database.add_user(1, "user", "User")
+            _, pending_id = await add_due_reminder(database, 1, "pending")
+            completed_task, completed_id = await add_due_reminder(database, 1, "done")
+            deleted_task, deleted_id = await add_due_reminder(database, 1, "deleted")
+            await database.complete_task(completed_task)
+            await database.delete_task(deleted_task)
+
+            claimed = await database.claim_reminders(
+                [pending_id, completed_id, deleted_id], "worker", 60
+            )
+            return pending_id, [row[0] for row in claimed], await reminder_ids(database)
+
+    pending_id, claimed, remaining = asyncio.run(scenario())
+
+    assert claimed == [pending_id]
+    assert remaining == [pending_id]
+
+
+def test_claim_ignores_reminder_moved_to_the_future(tmp_path):
+    async def scenario():
+        async with open_database(tmp_path / "bot.db") as database:
+            await database.add_user(1, "user", "User")
+            task_id = await database.add_task(
+                1, "later", datetime.now() + timedelta(days=1)
+            )
+            reminder_id = await database.create_task_reminder(
+                1, task_id, "deadline", datetime.now() + timedelta(hours=1)
+            )
+            return await database.claim_reminders([reminder_id], "worker", 60)
+
+    assert asyncio.run(scenario()) == []
+
+
+def test_reminder_is_claimed_only_once(tmp_path):
+    async def scenario():
+        async with open_database(tmp_path / "bot.db") as database:
+            await database.add_user(1, "user", "User")
+            _, first_id = await add_due_reminder(database, 1, "first")
+            _, second_id = await add_due_reminder(database, 1, "second")
+            ids = [first_id, second_id]
+
+            first, second = await asyncio.gather(
+                database.claim_reminders(ids, "worker-a", 60),
+                database.claim_reminders(ids, "worker-b", 60),
+            )
+            again = await database.claim_reminders(ids, "worker-b", 60)
+            return ids, first, second, again
+
+    ids, first, second, again = asyncio.run(scenario())
+
+    claimed = [row[0] for row in first] + [row[0] for row in second]
+    assert sorted(claimed) == ids
+    assert again == []
+
+
+def test_expired_claim_is_taken_over(tmp_path):
+    async def scenario():
+        async with open_database(tmp_path / "bot.db") as database:
+            await database.add_user(1, "user", "User")
+            _, reminder_id = await add_due_reminder(database, 1, "task")
+
+            await database.claim_reminders([reminder_id], "dead-worker", -1)
+            return await database.claim_reminders([reminder_id], "worker", 60)
+
+    rows = asyncio.run(scenario())
+
+    assert len(rows) == 1
+
+
+def test_upcoming_claim_leaves_overdue_reminders_of_tasks_not_yet_due(tmp_path):
+    async def scenario():
+        async with open_database(tmp_path / "bot.db") as database:
+            await database.add_user(1, "user", "User")
+            due_date = datetime.now() + timedelta(minutes=2)
+            task_id = await database.add_task(1, "soon", due_date)
+            deadline_id = await database.create_task_reminder(
+                1, task_id, "deadline", datetime.now() + timedelta(minutes=1)
+            )
+            overdue_id = await database.create_task_reminder(
+                1, task_id, "overdue_immediate", due_date
+            )
+            until_ts = int((datetime.now() + timedelta(minutes=5)).timestamp())
+            claimed = await database.claim_upcoming_reminders(
+                [1], until_ts, "worker", 60
+            )
+            return deadline_id, overdue_id, [row[0] for row in claimed]
+
+    deadline_id, overdue_id, claimed = asyncio.run(scenario())
+
+    assert claimed == [deadline_id]
+    assert overdue_id not in claimed
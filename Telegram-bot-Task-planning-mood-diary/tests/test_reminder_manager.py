@@ -0,0 +1,54 @@
+import asyncio
+
+import reminders
+from config import Config
+from conftest import open_database
+from reminders import ReminderManager
+from test_reminder_claims import add_due_reminder
+
+
+async def fail_send(chat_id, text, **kwargs):
+    raise RuntimeError("network down")
+
+
+async def fail_retry(reminder_id, task_id, attempt, error):
+    raise RuntimeError("database is locked")
+
+
+def test_claimed_reminder_is_rescheduled_at_claim_expiry(tmp_path, monkeypatch):
+    async def scenario():
+        async with open_database(tmp_path / "bot.db") as database:
+            monkeypatch.setattr(reminders, "db", database)
+            await database.add_user(1, "user", "User")
+            task_id, reminder_id = await add_due_reminder(database, 1, "lost")
+            manager = ReminderManager(None)
+            monkeypatch.setattr(manager.sender, "send", fail_send)
+            monkeypatch.setattr(manager, "_retry_later", fail_retry)
+
+            started = int(manager.clock.time())
+            await manager._send_reminders([reminder_id])
+            return started, manager.scheduler.fire_ts(reminder_id)
+
+    started, fire_ts = asyncio.run(scenario())
+
+    assert fire_ts is not None
+    assert fire_ts - started >= Config.REMINDER_CLAIM_TIMEOUT
+
+
+def test_delivered_reminder_leaves_the_schedule(tmp_path, monkeypatch):
+    async def scenario():
+        async with open_database(tmp_path / "bot.db") as database:
+            monkeypatch.setattr(reminders, "db", database)
+            await database.add_user(1, "user", "User")
+            _, reminder_id = await add_due_reminder(database, 1, "sent")
+            manager = ReminderManager(None)
+            sent = []
+
+            async def send(chat_id, text, **kwargs):
+                sent.append(chat_id)
+
+            monkeypatch.setattr(manager.sender, "send", send)
+            await manager._send_reminders([reminder_id])
+            return sent, reminder_id in manager.scheduler
+
+    assert asyncio.run(scenario()) == ([1], False)
@@ -0,0 +1,53 @@
+import re
+
+import pytest
+
+from clock import SimulatedClock
+from send_pipeline import TokenBucket, pack_message_parts, split_message_part
+
+
+def assert_balanced_html(text):
+    assert re.search(r"<[^>]*$", text) is None
+    assert re.search(r"&[#\w]*$", text) is None
+    for name in ("b", "i"):
+        assert text.count(f"<{name}>") == text.count(f"</{name}>")
+
+
+def test_long_part_is_split_on_line_breaks():
+    lines = [f"<b>#{i}</b> задача &amp; подзадача" for i in range(40)]
+    pieces = split_message_part("\n".join(lines), limit=200)
+
+    assert all(len(piece) <= 200 for piece in pieces)
+    assert "\n".join(pieces).split("\n") == lines
+
+
+def test_split_never_breaks_tags_or_entities():
+    text = "<b>" + "слово &amp; " * 300 + "</b>"
+    pieces = split_message_part(text, limit=100)
+
+    assert len(pieces) > 1
+    for piece in pieces:
+        assert len(piece) <= 100
+        assert_balanced_html(piece)
+
+
+def test_pack_keeps_part_index_for_split_part():
+    parts = ["short", "<i>" + "x " * 150 + "</i>"]
+    messages = pack_message_parts(parts, limit=100)
+
+    assert messages[0] == ("short", [0])
+    assert all(indices == [1] for _, indices in messages[1:])
+    for text, _ in messages:
+        assert len(text) <= 100
+        assert_balanced_html(text)
+
+
+def test_token_bucket_refills_by_injected_clock():
+    clock = SimulatedClock(start=0)
+    bucket = TokenBucket(rate=1.0, capacity=1.0, clock=clock)
+
+    assert bucket.reserve() == 0.0
+    assert bucket.reserve() == pytest.approx(1.0, abs=0.01)
+
+    clock.advance(2)
+    assert bucket.reserve() == 0.0
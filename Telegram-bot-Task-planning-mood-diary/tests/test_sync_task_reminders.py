@@ -0,0 +1,95 @@
+import asyncio
+from datetime import datetime, timedelta
+
+from conftest import open_database
+from database import to_ts
+
+TYPES = ("deadline", "overdue_immediate")
+
+
+async def unsent_reminders(database, task_id):
+    async with database.pool.acquire() as conn:
+        cursor = await conn.execute(
+            """
+            SELECT id, reminder_type, offset_minutes, scheduled_ts
+            FROM task_reminders WHERE task_id = ? AND sent = 0 ORDER BY id
+            """,
+            (task_id,),
+        )
+        return await cursor.fetchall()
+
+
+def test_sync_keeps_moves_removes_and_adds(tmp_path):
+    due_date = (datetime.now() + timedelta(days=2)).replace(microsecond=0)
+
+    async def scenario():
+        async with open_database(tmp_path / "bot.db") as database:
+            await database.add_user(1, "user", "User")
+            task_id = await database.add_task(1, "task", due_date)
+
+            first = [
+                ("deadline", 60, due_date - timedelta(minutes=60)),
+                ("deadline", 1440, due_date - timedelta(minutes=1440)),
+                ("overdue_immediate", None, due_date),
+            ]
+            created, removed = await database.sync_task_reminders(
+                1, task_id, first, TYPES
+            )
+            before = {
+                row[1:3]: row for row in await unsent_reminders(database, task_id)
+            }
+
+            moved_due = due_date + timedelta(hours=3)
+            second = [
+                ("deadline", 60, moved_due - timedelta(minutes=60)),
+                ("deadline", 15, moved_due - timedelta(minutes=15)),
+                ("overdue_immediate", None, due_date),
+            ]
+            changed, removed_again = await database.sync_task_reminders(
+                1, task_id, second, TYPES
+            )
+            after = {row[1:3]: row for row in await unsent_reminders(database, task_id)}
+            return created, removed, before, changed, removed_again, after, moved_due
+
+    created, removed, before, changed, removed_again, after, moved_due = asyncio.run(
+        scenario()
+    )
+
+    assert len(created) == 3 and removed == []
+
+    assert set(after) == {
+        ("deadline", 60),
+        ("deadline", 15),
+        ("overdue_immediate", None),
+    }
+    kept = after[("overdue_immediate", None)]
+    moved = after[("deadline", 60)]
+    added = after[("deadline", 15)]
+    assert kept == before[("overdue_immediate", None)]
+    assert moved[0] == before[("deadline", 60)][0]
+    assert moved[3] == to_ts(moved_due - timedelta(minutes=60))
+
+    assert removed_again == [before[("deadline", 1440)][0]]
+    assert sorted(changed) == sorted([(moved[0], moved[3]), (added[0], added[3])])
+
+
+def test_sync_does_not_recreate_sent_once_types(tmp_path):
+    due_date = (datetime.now() - timedelta(hours=1)).replace(microsecond=0)
+
+    async def scenario():
+        async with open_database(tmp_path / "bot.db") as database:
+            await database.add_user(1, "user", "User")
+            task_id = await database.add_task(1, "task", due_date)
+            desired = [("overdue_immediate", None, due_date)]
+            changed, _ = await database.sync_task_reminders(1, task_id, desired, TYPES)
+            await database.mark_reminders_sent([changed[0][0]])
+
+            again, _ = await database.sync_task_reminders(
+                1, task_id, desired, TYPES, once_types=("overdue_immediate",)
+            )
+            return again, await unsent_reminders(database, task_id)
+
+    again, unsent = asyncio.run(scenario())
+
+    assert again == []
+    assert unsent == []
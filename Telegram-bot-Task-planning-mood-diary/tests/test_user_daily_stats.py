@@ -0,0 +1,104 @@
+import asyncio
+from datetime import datetime, timedelta
+
+from conftest import open_database
+from database import today_key
+
+
+async def daily_stats(database, user_id):
+    async with database.pool.acquire() as conn:
+        cursor = await conn.execute(
+            """
+            SELECT day, created, completed, high, high_completed, low, mood,
+                overdue, mood_score
+            FROM user_daily_stats WHERE user_id = ? ORDER BY day
+            """,
+            (user_id,),
+        )
+        return await cursor.fetchall()
+
+
+def test_counts_follow_complete_and_delete(tmp_path):
+    due_date = datetime.now() + timedelta(days=1)
+
+    async def scenario():
+        async with open_database(tmp_path / "bot.db") as database:
+            await database.add_user(1, "user", "User")
+            high = await database.add_task_with_priority(1, "high", due_date, "high")
+            low = await database.add_task_with_priority(1, "low", due_date, "low")
+            await database.add_task_with_priority(1, "kept", due_date, "low")
+
+            await database.complete_task(high)
+            after_complete = await daily_stats(database, 1)
+
+            await database.delete_task(low)
+            after_delete = await daily_stats(database, 1)
+
+            await database.restore_task(low)
+            after_restore = await daily_stats(database, 1)
+            return after_complete, after_delete, after_restore
+
+    after_complete, after_delete, after_restore = asyncio.run(scenario())
+    today = today_key()
+
+    assert after_complete == [(today, 3, 1, 1, 1, 2, None, 0, None)]
+    assert after_delete == [(today, 2, 1, 1, 1, 1, None, 0, None)]
+    assert after_restore == after_complete
+
+
+def test_hard_delete_of_completed_task_keeps_history(tmp_path):
+    async def scenario():
+        async with open_database(tmp_path / "bot.db") as database:
+            await database.add_user(1, "user", "User")
+            task_id = await database.add_task(1, "task", None)
+            await database.complete_task(task_id)
+            before = await daily_stats(database, 1)
+
+            async def _write(db):
+                await db.execute("DELETE FROM tasks WHERE id = ?", (task_id,))
+
+            await database.writer.submit(_write)
+            return before, await daily_stats(database, 1)
+
+    before, after = asyncio.run(scenario())
+
+    assert before[0][1:3] == (1, 1)
+    assert after == before
+
+
+def test_mood_uses_the_same_day_as_tasks(tmp_path):
+    async def scenario():
+        async with open_database(tmp_path / "bot.db") as database:
+            await database.add_user(1, "user", "User")
+            await database.add_task(1, "task", None)
+            await database.add_mood_with_notes(1, "плохо")
+            await database.update_mood(1, "хорошо")
+            return await daily_stats(database, 1), await database.get_today_mood(1)
+
+    stats, mood = asyncio.run(scenario())
+
+    assert [(row[0], row[1], row[6], row[8]) for row in stats] == [
+        (today_key(), 1, "хорошо", 4)
+    ]
+    assert mood[2] == "хорошо"
+
+
+def test_late_completion_counts_as_overdue(tmp_path):
+    async def scenario():
+        async with open_database(tmp_path / "bot.db") as database:
+            await database.add_user(1, "user", "User")
+            task_id = await database.add_task(
+                1, "late", datetime.now() - timedelta(minutes=5)
+            )
+            await database.complete_task(task_id)
+            late = await daily_stats(database, 1)
+
+            await database.update_task_due_date(
+                task_id, datetime.now() + timedelta(days=1)
+            )
+            return late, await daily_stats(database, 1)
+
+    late, moved = asyncio.run(scenario())
+
+    assert [row[7] for row in late] == [1]
+    assert [row[7] for row in moved] == [0]
@@ -0,0 +1,133 @@
+import re
+from datetime import datetime, timedelta
+
+import pytz
+
+from clock import get_clock
+from config import Config
+
+UTC_OFFSET_PATTERN = re.compile(r"^(?:UTC|GMT)?\s*([+-])\s*(\d{1,2})$", re.IGNORECASE)
+DURATION_PATTERN = re.compile(r"(\d+)\s*([a-zа-я]*)", re.IGNORECASE)
+DURATION_UNITS = {
+    "д": 1440,
+    "дн": 1440,
+    "день": 1440,
+    "дня": 1440,
+    "дней": 1440,
+    "d": 1440,
+    "ч": 60,
+    "час": 60,
+    "часа": 60,
+    "часов": 60,
+    "h": 60,
+    "": 60,
+    "м": 1,
+    "мин": 1,
+    "минут": 1,
+    "m": 1,
+    "min": 1,
+}
+MAX_REMINDER_OFFSETS = 5
+MAX_REMINDER_OFFSET_MINUTES = 7 * 1440
+
+
+def get_timezone(name: str = None):
+    """Часовой пояс по имени IANA; неизвестное имя заменяется поясом по умолчанию"""
+    try:
+        return pytz.timezone(name or Config.DEFAULT_TIMEZONE)
+    except pytz.UnknownTimeZoneError:
+        return pytz.timezone(Config.DEFAULT_TIMEZONE)
+
+
+def normalize_timezone(value: str):
+    """Приводит ввод пользователя (Europe/Moscow, UTC+3, +5) к имени IANA или None"""
+    value = (value or "").strip()
+    if not value:
+        return None
+
+    match = UTC_OFFSET_PATTERN.match(value)
+    if match:
+        sign, hours = match.groups()
+        hours = int(hours)
+        if hours > 14:
+            return None
+        if hours == 0:
+            return "UTC"
+        # В зонах Etc/GMT знак инвертирован: UTC+3 это Etc/GMT-3
+        return f"Etc/GMT{'-' if sign == '+' else '+'}{hours}"
+
+    for name in pytz.all_timezones:
+        if name.lower() == value.lower():
+            return name
+    return None
+
+
+def parse_reminder_offsets(value: str):
+    """Разбирает отступы вида "1д, 1ч, 10м" в минуты по убыванию; None при ошибке"""
+    value = (value or "").strip().lower()
+    matches = DURATION_PATTERN.findall(value)
+    if not matches or DURATION_PATTERN.sub("", value).strip(" ,;"):
+        return None
+
+    offsets = set()
+    for amount, unit in matches:
+        if unit not in DURATION_UNITS:
+            return None
+        minutes = int(amount) * DURATION_UNITS[unit]
+        if minutes <= 0 or minutes > MAX_REMINDER_OFFSET_MINUTES:
+            return None
+        offsets.add(minutes)
+
+    if len(offsets) > MAX_REMINDER_OFFSETS:
+        return None
+    return sorted(offsets, reverse=True)
+
+
+def format_reminder_offsets(offsets) -> str:
+    """Отступы в минутах в читаемом виде: 1 д, 1 ч, 10 мин"""
+    parts = []
+    for minutes in offsets:
+        days, rest = divmod(minutes, 1440)
+        hours, minutes = divmod(rest, 60)
+        text = " ".join(
+            f"{amount} {unit}"
+            for amount, unit in ((days, "д"), (hours, "ч"), (minutes, "мин"))
+            if amount
+        )
+        parts.append(text)
+    return ", ".join(parts)
+
+
+def localize_ts(naive: datetime, tz) -> int:
+    """Переводит локальное время пояса tz в секунды эпохи с учетом перехода на летнее время"""
+    try:
+        aware = tz.localize(naive, is_dst=None)
+    except pytz.AmbiguousTimeError:
+        # Час повторяется при переводе часов назад: берем первое наступление
+        aware = tz.localize(naive, is_dst=True)
+    except pytz.NonExistentTimeError:
+        # Час пропущен при переводе часов вперед: срабатываем сразу после перехода
+        aware = tz.normalize(tz.localize(naive, is_dst=False))
+    return int(aware.timestamp())
+
+
+def next_daily_ts(minute_of_day: int, tz_name: str = None, after_ts: float = None):
+    """Ближайший после after_ts момент, когда в поясе пользователя наступает minute_of_day"""
+    tz = get_timezone(tz_name)
+    after_ts = get_clock().time() if after_ts is None else after_ts
+    local_day = datetime.fromtimestamp(after_ts, tz).date()
+    hour, minute = divmod(minute_of_day, 60)
+
+    for offset in range(3):
+        naive = datetime.combine(
+            local_day + timedelta(days=offset), datetime.min.time()
+        )
+        fire_ts = localize_ts(naive.replace(hour=hour, minute=minute), tz)
+        if fire_ts > after_ts:
+            return fire_ts
+    return None
+
+
+def local_now(tz_name: str = None) -> datetime:
+    """Текущее время в поясе пользователя"""
+    return datetime.fromtimestamp(get_clock().time(), get_timezone(tz_name))